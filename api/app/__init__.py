@@ -1,19 +1,36 @@
 from flask import Flask
-from flask_session import Session
 import os
+import threading
 from dotenv import load_dotenv
 from flask_cors import CORS
+from .metrics import instrument_app
 
 
 
-def create_app():
+# process-wide background helpers (graph warm-up, campus watcher), started
+# by the first create_app() that enables them
+_background = {}
+_background_lock = threading.Lock()
+
+
+def create_app(test_config=None):
     load_dotenv()
     app = Flask(__name__)
     CORS(app)
     
-    # Configure Flask-Session
-    app.config['SESSION_TYPE'] = 'filesystem'
-    Session(app)
+    # server-side sessions, in memory by default; SESSION_BACKEND=redis shares them between workers
+    from .session_store import create_session_interface
+
+    app.config['SESSION_BACKEND'] = os.getenv('SESSION_BACKEND', 'memory')
+    app.config['SESSION_REDIS_URL'] = os.getenv('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+    app.config['CAMPUS_WARM_UP'] = os.getenv('CAMPUS_WARM_UP', 'true').lower() == 'true'
+    app.config['CAMPUS_HOT_RELOAD'] = os.getenv('CAMPUS_HOT_RELOAD', 'true').lower() == 'true'
+    if test_config:
+        app.config.update(test_config)
+    app.session_interface = create_session_interface(app.config)
+    
+    # per-endpoint request counts and latencies, served with the stage timings at /metrics
+    instrument_app(app)
     
     # Register blueprints
     from .navigation import navigation_routes
@@ -21,5 +38,44 @@ def create_app():
     
     app.register_blueprint(navigation_routes)
     app.register_blueprint(api)
+
+    # load every campus graph in the background; /ready reports when done
+    if app.config['CAMPUS_WARM_UP'] and not app.testing:
+        start_graph_warm_up(app)
+
+    # rebuild campus graphs in the background when their JSON maps change
+    if app.config['CAMPUS_HOT_RELOAD'] and not app.testing:
+        start_campus_watcher(app)
     
     return app
+
+
+def _start_once(name, start):
+    """The process's `name` helper, started with start() on first use"""
+    with _background_lock:
+        if name not in _background:
+            _background[name] = start()
+        return _background[name]
+
+
+def start_graph_warm_up(app):
+    from .navigation import start_warm_up
+
+    thread = _start_once('graph_warm_up', start_warm_up)
+    app.extensions['graph_warm_up'] = thread
+    return thread
+
+
+def start_campus_watcher(app):
+    from .campus_watcher import CampusWatcher
+    from .graph_registry import registry
+    from .navigation import reload_campus
+
+    def start():
+        watcher = CampusWatcher(registry.base_path, reload_campus)
+        watcher.start()
+        return watcher
+
+    watcher = _start_once('campus_watcher', start)
+    app.extensions['campus_watcher'] = watcher
+    return watcher
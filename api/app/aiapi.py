@@ -1,9 +1,11 @@
 from typing import Dict, List, Optional, Annotated, Any
 import enum
 import logging
-from pathlib import Path
-import os
 from .graph.Graph2 import Graph
+from .graph.buildings import BuildingNetwork, building_of, load_connectors
+from .graph_registry import GraphRegistry, registry
+from . import metrics
+from .route_cache import RouteCache, route_tags
 
 logger = logging.getLogger("navigation")
 logger.setLevel(logging.INFO)
@@ -16,10 +18,20 @@ class NavigationDetails(enum.Enum):
     PATH = "path"
     DISTANCE = "distance"
 
+# path_info dicts keyed by (campus, start, end, profile, graph_version),
+# shared by every AINavigationAPI since they share the campus graphs
+route_cache = RouteCache(maxsize=512, ttl=600)
+registry.on_swap(lambda campus, graph: route_cache.invalidate_campus(campus, keep_version=graph.version))
+metrics.track_cache("chat_navigation", route_cache)
+registry.on_closure(
+    lambda campus, element, closed: route_cache.invalidate_tag(("route" if closed else "closed", campus, element)))
+
+
 class AINavigationAPI:
-    def __init__(self):
-        self.graphs = {}
-        self.accessibility_graphs = {}
+    def __init__(self, graphs: GraphRegistry = registry):
+        # campus graphs, loaded the first time a query touches the campus
+        self.graphs = graphs
+        self.route_cache = route_cache
         self._navigation_details = {
             NavigationDetails.START_ID: "",
             NavigationDetails.END_ID: "",
@@ -28,20 +40,11 @@ class AINavigationAPI:
             NavigationDetails.PATH: [],
             NavigationDetails.DISTANCE: 0.0
         }
-        self._initialize_graphs()
+        self.network = BuildingNetwork(self._graph, load_connectors(graphs.base_path))
 
-    def _initialize_graphs(self):
-        """Initialize graphs for all campuses"""
-        current_dir = Path(os.getcwd())
-        if 'api' not in current_dir.parts:
-            current_dir = current_dir / 'api'
-        
-        base_path = current_dir / 'app/data/campus_jsons'
-        for campus in ['hall', 'mb', 'cc']:
-            campus_path = base_path / campus
-            if campus_path.exists():
-                self.graphs[campus] = Graph()
-                self.graphs[campus].load_from_json_folder(str(campus_path))
+    def _graph(self, campus: str) -> Optional[Graph]:
+        """The campus graph, loaded on first use (None for an unknown campus)"""
+        return self.graphs.get(campus)
 
     def get_path_details(self) -> str:
         """Get current navigation details in human-readable format"""
@@ -93,55 +96,65 @@ class AINavigationAPI:
             return f"{building}-{room_num}_{floor}"
         return room
 
-    def find_shortest_path(self, start_room: str, end_room: str, campus: str = 'hall', accessibility: bool = False) -> dict:
-        """Find the shortest path between two rooms"""
-        if campus not in self.graphs:
+    def find_shortest_path(self, start_room: str, end_room: str, campus: Optional[str] = None, accessibility: bool = False) -> dict:
+        """
+        Find the shortest path between two rooms. The campus defaults to the
+        start room's building; rooms in different buildings are routed
+        through the connectors between them.
+        """
+        campus = campus or building_of(start_room) or 'hall'
+        graph = self._graph(campus)
+        if graph is None:
             return {"error": f"Campus {campus} not found"}
         
-        graph = self.graphs[campus]
-        if accessibility:
-            if campus not in self.accessibility_graphs:
-                self.accessibility_graphs[campus] = Graph()
-                self.accessibility_graphs[campus].graph = self._get_sub_graph(graph)
-            graph = self.accessibility_graphs[campus]
+        # accessibility routes never use stairs or escalators
+        profile = "elevator_only" if accessibility else "default"
+        end_campus = building_of(end_room)
         
         try:
-            path_info = graph.find_shortest_path(start_room, end_room)
-            if not path_info:
-                return {"error": "No path found between the specified rooms"}
-            
-            # Store navigation details
-            self._navigation_details = {
-                NavigationDetails.START_ID: start_room,
-                NavigationDetails.END_ID: end_room,
-                NavigationDetails.CAMPUS: campus,
-                NavigationDetails.ACCESSIBILITY: accessibility,
-                NavigationDetails.PATH: path_info["path"],
-                NavigationDetails.DISTANCE: path_info["distance"]
-            }
+            if end_campus not in (None, campus):
+                # cross-building routes span several graph versions; not cached
+                path_info = self.network.find_shortest_path(start_room, end_room, profile=profile)
+                if not path_info:
+                    return {"error": "No path found between the specified rooms"}
+                path_info["eta_seconds"] = self.network.eta(path_info["path"], profile)
+                return self._set_navigation(start_room, end_room, campus, accessibility, path_info)
+
+            cache_key = (campus, start_room, end_room, profile, graph.version)
+            path_info = self.route_cache.get(cache_key)
+            if path_info is None:
+                path_info = graph.find_shortest_path(start_room, end_room, profile=profile)
+                if not path_info:
+                    return {"error": "No path found between the specified rooms"}
+                self.route_cache.put(cache_key, path_info,
+                                     route_tags(campus, [path_info["path"]], graph.closures()))
             
-            return path_info
+            # the ETA follows the time of day, so it is not part of the cached route
+            path_info = {**path_info, "eta_seconds": graph.eta(path_info["path"], profile)}
+            return self._set_navigation(start_room, end_room, campus, accessibility, path_info)
         except Exception as e:
             return {"error": str(e)}
 
-    def _get_sub_graph(self, graph):
-        """Create a subgraph excluding stairs and escalators for accessibility"""
-        import networkx as nx
-        allowed_edges = set(graph.graph.edges())
-        
-        for edge in graph.graph.edges():
-            if any(x in edge[0] or x in edge[1] for x in ['escalator', 'stairs']):
-                allowed_edges.remove(edge)
-        
-        return graph.graph.edge_subgraph(allowed_edges).copy()
+    def _set_navigation(self, start_room: str, end_room: str, campus: str, accessibility: bool, path_info: dict) -> dict:
+        """Store navigation details and return path_info"""
+        self._navigation_details = {
+            NavigationDetails.START_ID: start_room,
+            NavigationDetails.END_ID: end_room,
+            NavigationDetails.CAMPUS: campus,
+            NavigationDetails.ACCESSIBILITY: accessibility,
+            NavigationDetails.PATH: path_info["path"],
+            NavigationDetails.DISTANCE: path_info["distance"]
+        }
+        return path_info
 
-    def find_multiple_destinations(self, start_room: str, destinations: List[str], campus: str = "hall") -> Dict:
+    def find_multiple_destinations(self, start_room: str, destinations: List[str], campus: Optional[str] = None) -> Dict:
         """Find path through multiple destinations"""
         logger.info(f"Finding path from {start_room} through destinations: {destinations}")
         
         try:
             # Get paths
-            result = self.graphs[campus].find_paths_to_multiple_destinations(start_room, destinations)
+            campus = campus or building_of(start_room) or "hall"
+            result = self._graph(campus).find_paths_to_multiple_destinations(start_room, destinations)
             if not result["paths"]:
                 return {"error": "No valid paths found"}
             
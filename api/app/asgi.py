@@ -0,0 +1,192 @@
+"""
+Asyncio serving mode. Run it with an ASGI server from the api directory,
+e.g. `uvicorn run_asgi:app`.
+
+/chat/tasks and /chat/navigation are served on the event loop: the OpenAI
+call is awaited with one shared AsyncOpenAI client, and graph queries run
+in a small bounded executor, so slow LLM calls no longer hold a worker
+thread each. Every other route is the Flask app behind asgiref's
+WsgiToAsgi, each request in its own thread and at most WSGI_WORKERS at a
+time; a burst of chat requests cannot use those slots, which keeps
+/indoorNavigation fast.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+
+from .chat import async_openai_client, handle_task_query_async, interpret_path, is_task_query
+from .metrics import REQUEST_SECONDS, REQUESTS, stage
+from .navigation import (NAVIGATION_CHAT, NAVIGATION_CHAT_NO_ROOMS, TASK_CHAT, TASK_CHAT_HINT, ai_nav,
+                         navigation_chat_rooms)
+
+logger = logging.getLogger("navigation")
+
+# threads for CPU-bound graph queries made by the async handlers
+GRAPH_WORKERS = int(os.getenv('GRAPH_WORKERS', '4'))
+# Flask (WSGI) requests running at once
+WSGI_WORKERS = int(os.getenv('WSGI_WORKERS', '16'))
+
+CORS_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-methods", b"POST, OPTIONS"),
+    (b"access-control-allow-headers", b"Content-Type"),
+]
+
+Response = Tuple[int, Dict[str, Any]]
+
+# async routes -> the Flask endpoint they stand in for, so their metrics line up
+ENDPOINTS = {"/chat/tasks": TASK_CHAT, "/chat/navigation": NAVIGATION_CHAT}
+
+
+class AsyncApp:
+    """ASGI application: async chat handlers in front of the Flask app"""
+
+    def __init__(self, wsgi_app: Callable, graph_workers: int = GRAPH_WORKERS, wsgi_workers: int = WSGI_WORKERS,
+                 llm_client: Any = None):
+        self.wsgi_app = wsgi_app
+        self.flask = WsgiToAsgi(wsgi_app)
+        self.graph_executor = ThreadPoolExecutor(max_workers=graph_workers, thread_name_prefix="graph")
+        self.wsgi_workers = wsgi_workers
+        # created on the serving loop by the first Flask request
+        self.wsgi_slots = None
+        # AsyncOpenAI client for the task chat; None opens one from the environment on first use,
+        # closed at lifespan shutdown
+        self.llm_client = llm_client
+        self._owns_llm_client = llm_client is None
+        self.routes: Dict[str, Callable[[Dict[str, Any]], Awaitable[Response]]] = {
+            "/chat/tasks": self.chat_tasks,
+            "/chat/navigation": self.chat_navigation,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        handler = self.routes.get(scope["path"])
+        if handler is not None and scope["method"] == "OPTIONS":
+            await _respond(send, 204, CORS_HEADERS, b"")
+            return
+        if handler is None or scope["method"] != "POST":
+            await self._call_flask(scope, receive, send)
+            return
+
+        endpoint = ENDPOINTS[scope["path"]]
+        started = time.perf_counter()
+        body = await _read_body(receive)
+        try:
+            data = json.loads(body) if body else None
+        except ValueError:
+            data = None
+        status, payload = await handler(data)
+        headers = [(b"content-type", b"application/json")] + CORS_HEADERS
+        with stage(endpoint, "serialization"):
+            content = json.dumps(payload).encode()
+        await _respond(send, status, headers, content)
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, method="POST")
+        REQUESTS.inc(endpoint=endpoint, method="POST", status=status)
+
+    async def chat_tasks(self, data: Optional[Dict[str, Any]]) -> Response:
+        query, error = _query(data)
+        if error:
+            return error
+        with stage(TASK_CHAT, "intent_detection"):
+            task_query = is_task_query(query)
+        if not task_query:
+            return 200, {"response": TASK_CHAT_HINT}
+        try:
+            client = self._llm()
+        except Exception as e:
+            # e.g. no OPENAI_API_KEY; handle_task_query_async answers with its error message
+            logger.warning(f"Could not create the OpenAI client: {e}")
+            client = None
+        with stage(TASK_CHAT, "llm_call"):
+            response = await handle_task_query_async(query, data.get('tasks', []), client)
+        return 200, {"response": response}
+
+    async def chat_navigation(self, data: Optional[Dict[str, Any]]) -> Response:
+        query, error = _query(data)
+        if error:
+            return error
+        with stage(NAVIGATION_CHAT, "extract_rooms"):
+            start_room, end_room = navigation_chat_rooms(query)
+        if not start_room or not end_room:
+            return 200, {"response": NAVIGATION_CHAT_NO_ROOMS}
+
+        loop = asyncio.get_running_loop()
+        try:
+            with stage(NAVIGATION_CHAT, "graph_search"):
+                path_info = await loop.run_in_executor(self.graph_executor, ai_nav.find_shortest_path, start_room,
+                                                       end_room)
+            with stage(NAVIGATION_CHAT, "interpret_path"):
+                response = interpret_path(path_info)
+        except Exception as e:
+            logger.exception("Error in chat_navigation")
+            return 500, {"error": "Failed to process navigation request", "details": str(e)}
+        return 200, {"response": response}
+
+    async def _call_flask(self, scope, receive, send):
+        # WsgiToAsgi runs the app in the thread of the current ThreadSensitiveContext:
+        # a new one per request, so requests do not queue behind one shared thread
+        if self.wsgi_slots is None:
+            self.wsgi_slots = asyncio.Semaphore(self.wsgi_workers)
+        async with self.wsgi_slots, ThreadSensitiveContext():
+            await self.flask(scope, receive, send)
+
+    def _llm(self) -> Any:
+        if self.llm_client is None:
+            self.llm_client = async_openai_client()
+        return self.llm_client
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.graph_executor.shutdown(wait=False)
+                if self._owns_llm_client and self.llm_client is not None:
+                    await self.llm_client.close()
+                    self.llm_client = None
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def _query(data: Optional[Dict[str, Any]]) -> Tuple[Optional[str], Optional[Response]]:
+    """Same checks as navigation.validate_query, without a Flask request"""
+    if not data:
+        return None, (400, {"error": "No data provided"})
+    if not data.get('query'):
+        return None, (400, {"error": "No query provided"})
+    return data['query'], None
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _respond(send, status: int, headers: List[Tuple[bytes, bytes]], content: bytes):
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": content})
+
+
+def create_asgi_app(wsgi_app: Callable = None) -> AsyncApp:
+    """The ASGI app over `wsgi_app` (by default a new create_app())"""
+    if wsgi_app is None:
+        from . import create_app
+        wsgi_app = create_app()
+    return AsyncApp(wsgi_app)
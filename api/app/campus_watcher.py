@@ -0,0 +1,78 @@
+import logging
+import os
+import threading
+from typing import Callable, Dict, List
+
+logger = logging.getLogger("navigation")
+
+# seconds between scans of campus_jsons
+POLL_INTERVAL = 2.0
+
+
+class CampusWatcher:
+    """
+    Polls campus_jsons/<campus>/ for JSON changes (added, removed, or a new
+    mtime/size) and calls on_change(campus) for every campus that changed.
+    Polling keeps it dependency-free and works the same on every platform
+    and on network mounts.
+    """
+
+    def __init__(self, base_path: str, on_change: Callable[[str], None], interval: float = POLL_INTERVAL):
+        self.base_path = str(base_path)
+        self.on_change = on_change
+        self.interval = interval
+        self._signatures = self.scan()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def scan(self) -> Dict[str, tuple]:
+        """campus -> sorted (file, mtime_ns, size) of every JSON under its folder"""
+        signatures = {}
+        if not os.path.isdir(self.base_path):
+            return signatures
+        for campus in sorted(os.listdir(self.base_path)):
+            folder = os.path.join(self.base_path, campus)
+            if not os.path.isdir(folder):
+                continue
+            files = []
+            for root, _, names in os.walk(folder):
+                for name in names:
+                    if name.endswith('.json'):
+                        path = os.path.join(root, name)
+                        try:
+                            stat = os.stat(path)
+                        except FileNotFoundError:
+                            # removed mid-scan; the next poll sees the final state
+                            continue
+                        files.append((os.path.relpath(path, folder), stat.st_mtime_ns, stat.st_size))
+            signatures[campus] = tuple(sorted(files))
+        return signatures
+
+    def poll(self) -> List[str]:
+        """Rescan once and notify on_change for each changed campus; returns them"""
+        signatures = self.scan()
+        changed = [campus for campus, signature in signatures.items()
+                   if self._signatures.get(campus) != signature]
+        self._signatures = signatures
+        for campus in changed:
+            try:
+                self.on_change(campus)
+            except Exception as e:
+                # a half-written or invalid map keeps the previous graph in service
+                logger.error(f"Reloading campus {campus} failed: {e}")
+        return changed
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="campus-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
@@ -1,9 +1,17 @@
+import logging
 import os
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
 from .aiapi import AINavigationAPI
+from .graph.timing import TimeModel
 import re
 
+logger = logging.getLogger("navigation")
+
+# seconds before an OpenAI call is abandoned, and retries after a failure
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '20'))
+OPENAI_MAX_RETRIES = 1
+
 class NavigationContext:
     def __init__(self):
         self.last_navigation = None
@@ -13,6 +21,22 @@ class NavigationContext:
 # Initialize global context
 nav_context = NavigationContext()
 
+# room mentions per building, with the node id each one names; the first
+# digit of a Hall room number is its floor, MB rooms are "MB <floor>.<room>"
+ROOM_PATTERNS = [
+    (re.compile(r'h\s*[-_ ]?\s*(\d{3})'), lambda m: f"h{m.group(1)[0]}_{m.group(1)}"),
+    (re.compile(r'\bmb\s*[-_ ]?\s*(s2|\d)\s*[._ -]\s*(\d{3})'), lambda m: f"mb_{m.group(1)}_{m.group(2)}"),
+    (re.compile(r'\bcc\s*[-_ ]?\s*(\d{3})'), lambda m: f"cc_{m.group(1)}"),
+]
+
+
+def find_rooms(query_lower: str) -> list:
+    """Node ids of every room mentioned in a lowercased query, in order of appearance"""
+    found = [(match.start(), node_id(match)) for pattern, node_id in ROOM_PATTERNS
+             for match in pattern.finditer(query_lower)]
+    return [room for _, room in sorted(found)]
+
+
 def is_navigation_query(query: str) -> bool:
     """Check if the query is asking for directions"""
     navigation_keywords = [
@@ -22,40 +46,31 @@ def is_navigation_query(query: str) -> bool:
     ]
     query_lower = query.lower()
     
-    # Debug output
-    print(f"CHAT.PY: Checking navigation query: '{query_lower}'")
-    
     # Check for direct patterns like "how to go from H 109 to H 110"
     direct_pattern = r'how to go from h\s*\d{3} to h\s*\d{3}'
     is_direct_match = bool(re.search(direct_pattern, query_lower))
-    print(f"CHAT.PY: Direct match: {is_direct_match}")
     
-    # Check for room numbers (H-109, H 110, etc.)
-    room_pattern = r'h\s*[-_ ]?\s*\d{3}'
-    room_matches = re.findall(room_pattern, query_lower)
+    # Check for room numbers (H-109, H 110, MB 1.338, CC-119, etc.)
+    room_matches = find_rooms(query_lower)
     has_room_numbers = len(room_matches) > 0
     multiple_rooms = len(room_matches) >= 2
-    print(f"CHAT.PY: Room matches: {room_matches}")
-    print(f"CHAT.PY: Has room numbers: {has_room_numbers}")
-    print(f"CHAT.PY: Multiple rooms: {multiple_rooms}")
     
     # Check for navigation keywords
     has_nav_keywords = any(keyword in query_lower for keyword in navigation_keywords)
-    print(f"CHAT.PY: Has navigation keywords: {has_nav_keywords}")
     
     # The query is a navigation query if:
     # 1. It directly matches our pattern, OR
     # 2. It mentions multiple rooms, OR
     # 3. It has room numbers AND navigation keywords
     is_nav_query = is_direct_match or multiple_rooms or (has_room_numbers and has_nav_keywords)
-    print(f"CHAT.PY: Final decision - Is navigation query: {is_nav_query}")
+    logger.debug("Navigation query %r: direct match %s, rooms %s, keywords %s -> %s",
+                 query_lower, is_direct_match, room_matches, has_nav_keywords, is_nav_query)
     
     return is_nav_query
 
 def extract_rooms(query: str) -> tuple:
     """Extract room numbers from the query"""
     query_lower = query.lower()
-    print(f"CHAT.PY: Extracting rooms from: '{query_lower}'")
     
     # Try different patterns
     
@@ -75,7 +90,7 @@ def extract_rooms(query: str) -> tuple:
         start_room = f"h{start_floor}_{start_room_num}"
         end_room = f"h{end_floor}_{end_room_num}"
         
-        print(f"CHAT.PY: Extracted rooms (direct pattern): {start_room} to {end_room}")
+        logger.debug("Extracted rooms (direct pattern): %s to %s", start_room, end_room)
         return start_room, end_room
     
     # Pattern 2: "How to go from H 109 to H 110" pattern
@@ -94,39 +109,38 @@ def extract_rooms(query: str) -> tuple:
         start_room = f"h{start_floor}_{start_room_num}"
         end_room = f"h{end_floor}_{end_room_num}"
         
-        print(f"CHAT.PY: Extracted rooms (go pattern): {start_room} to {end_room}")
+        logger.debug("Extracted rooms (go pattern): %s to %s", start_room, end_room)
         return start_room, end_room
     
-    # Pattern 3: Just find all room numbers and use the first two
-    room_pattern = r'h\s*[-_ ]?\s*(\d{3})'
-    rooms = re.findall(room_pattern, query_lower)
+    # Pattern 3: Just find all room numbers (in any building) and use the first two
+    rooms = find_rooms(query_lower)
     
     if len(rooms) >= 2:
-        # Get floor numbers from room numbers
-        start_floor = rooms[0][0]  # First digit is floor number
-        end_floor = rooms[1][0]    # First digit is floor number
-        
-        # Format room IDs for the navigation system
-        start_room = f"h{start_floor}_{rooms[0]}"
-        end_room = f"h{end_floor}_{rooms[1]}"
-        
-        print(f"CHAT.PY: Extracted rooms (generic pattern): {start_room} to {end_room}")
+        start_room, end_room = rooms[0], rooms[1]
+        logger.debug("Extracted rooms (generic pattern): %s to %s", start_room, end_room)
         return start_room, end_room
     
-    print("CHAT.PY: Could not extract rooms from query")
+    logger.debug("Could not extract rooms from %r", query_lower)
     return None, None
 
 
 def parse_node(node):
     parts = node.split('_')
-    building = parts[0][0].upper()
-    floor = parts[0][1]
+    building = re.match(r'[a-z]*', parts[0]).group()
+    # Hall ids carry the floor in their prefix (h8_803), MB ids as their
+    # second part (mb_s2_273); CC has a single floor (cc_119)
+    if parts[0] != building:
+        floor, rest = parts[0][len(building):], parts[1:]
+    elif building == "mb" and len(parts) > 2:
+        floor, rest = parts[1].upper(), parts[2:]
+    else:
+        floor, rest = "1", parts[1:]
     room_or_type = parts[-1]
     return {
-        "building": building,
+        "building": building.upper(),
         "floor": floor,
         "room": room_or_type,
-        "is_hallway": len(parts) > 1 and parts[1].startswith('hw'),
+        "is_hallway": bool(rest) and rest[0].startswith('hw'),
         "is_elevator": 'elevator' in node,
         "is_stairs": 'stairs' in node,
         "is_escalator": 'escalator' in node
@@ -174,6 +188,10 @@ def handle_connector_to_room(c, n):
 
 
 def describe_transition(c, n):
+    # Connector between buildings (e.g. the Hall-MB tunnel)
+    if c["building"] != n["building"]:
+        return f"Follow the connection to the {n['building']} building (floor {n['floor']})"
+
     # Same connector (elevator → elevator, etc.)
     same = handle_same_connector(c, n)
     if same:
@@ -233,8 +251,10 @@ def handle_follow_up(query: str, context: NavigationContext) -> str:
     
     if any(word in query_lower for word in ["how long", "time", "distance"]):
         distance = context.last_navigation.get("distance", 0)
-        # Assuming average walking speed of 1.4 m/s
-        time_minutes = (distance / 1.4) / 60
+        seconds = context.last_navigation.get("eta_seconds")
+        if not isinstance(seconds, (int, float)):
+            seconds = distance / TimeModel().walking_speed()
+        time_minutes = seconds / 60
         return f"The distance is {distance:.1f} meters, which should take about {time_minutes:.1f} minutes to walk."
     
     return "I'm not sure what you're asking about. Could you please rephrase your question?"
@@ -248,12 +268,8 @@ def is_task_query(query: str) -> bool:
     query_lower = query.lower()
     return any(keyword in query_lower for keyword in task_keywords)
 
-def handle_task_query(query, tasks):
-    """Handle any query with the given tasks context."""
-    # Load environment variables and initialize OpenAI client
-    load_dotenv()
-    client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-
+def task_query_messages(query, tasks):
+    """Chat messages asking OpenAI to answer `query` about `tasks`"""
     # Format tasks for OpenAI
     tasks_description = "Here are the user's current tasks:\n"
     for task in tasks:
@@ -279,20 +295,62 @@ Just answer directly and conversationally as if continuing a chat.
 If they're asking about tasks, provide relevant information about times, locations, and details.
 If they ask something unrelated to tasks, still give a helpful response while being aware of their schedule context."""
 
+    return [
+        {"role": "system", "content": "You are a helpful AI assistant focused on task and schedule management. Respond directly without introductory phrases."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def handle_task_query(query, tasks):
+    """Handle any query with the given tasks context."""
+    # Load environment variables and initialize OpenAI client
+    load_dotenv()
+    client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'), timeout=OPENAI_TIMEOUT, max_retries=OPENAI_MAX_RETRIES)
+
     try:
         response = client.chat.completions.create(
             model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful AI assistant focused on task and schedule management. Respond directly without introductory phrases."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=task_query_messages(query, tasks),
             max_tokens=300
         )
         return response.choices[0].message.content
     except Exception as e:
-        print(f"Error in OpenAI call: {e}")
+        logger.warning(f"Error in OpenAI call: {e}")
+        return "I encountered an error while processing your request. Please try again."
+
+
+def async_openai_client():
+    """AsyncOpenAI client configured from the environment; share one and close() it when done"""
+    load_dotenv()
+    return AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'), timeout=OPENAI_TIMEOUT, max_retries=OPENAI_MAX_RETRIES)
+
+
+async def handle_task_query_async(query, tasks, client=None):
+    """
+    handle_task_query for the asyncio serving mode (see asgi.py): the
+    request waits on the event loop instead of holding a worker thread.
+    `client` is the caller's shared AsyncOpenAI client; without one a
+    client is opened and closed for this call.
+    """
+    try:
+        if client is None:
+            async with async_openai_client() as own_client:
+                return await _task_completion(own_client, query, tasks)
+        return await _task_completion(client, query, tasks)
+    except Exception as e:
+        logger.warning(f"Error in OpenAI call: {e}")
         return "I encountered an error while processing your request. Please try again."
 
+
+async def _task_completion(client, query, tasks):
+    response = await client.chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=task_query_messages(query, tasks),
+        max_tokens=300
+    )
+    return response.choices[0].message.content
+
+
 def get_tasks_from_storage():
     """Get tasks from AsyncStorage or filesystem"""
     try:
@@ -312,15 +370,15 @@ def get_tasks_from_storage():
 
         for storage_file in possible_paths:
             if storage_file.exists():
-                print(f"Found tasks at: {storage_file}")  # Debug print
+                logger.debug(f"Found tasks at: {storage_file}")
                 with open(storage_file, 'r') as f:
                     tasks = json.load(f)
                     return tasks
 
-        print("No tasks file found in any location")  # Debug print
+        logger.debug("No tasks file found in any location")
         return []
     except Exception as e:
-        print(f"Error reading tasks from storage: {e}")
+        logger.warning(f"Error reading tasks from storage: {e}")
         return []
 
 SAMPLE_TASKS = [
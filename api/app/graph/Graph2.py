@@ -1,16 +1,132 @@
 import networkx as nx
 import json
 import os
-from typing import Dict, Any, List
+import threading
+from typing import Dict, Any, List, Sequence
+from .compiled import CompiledGraph
+from .all_pairs import AllPairsTable
+from .hierarchy import FloorPortalRouter
+from .facilities import FacilityIndex
+from .spatial import FloorSpatialIndex
+from .snapshot import snapshot_path, source_key, load_snapshot, save_snapshot, publish_lock
+from .tour import solve_visit_order, path_cost
+from .timing import TimeModel
+from itertools import count
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# process-wide, so a freshly loaded Graph never reuses an older graph's version
+_graph_versions = count(1)
+
+# threads parsing floor files in load_from_json_folder
+LOAD_WORKERS = 8
+
+# largest campus given all-pairs tables: they hold n x n entries per profile
+# (12 MB and about a second per profile at 1000 nodes); larger campuses are
+# routed by searching the CSR arrays instead
+ALL_PAIRS_MAX_NODES = int(os.getenv('ALL_PAIRS_MAX_NODES', '1000'))
 
 class Graph:
-    def __init__(self, scale_factor=0.05):
+    def __init__(self, scale_factor=0.05, time_model: TimeModel = None):
         self.graph_var = nx.Graph()
         self.scale_factor = scale_factor
+        self.time_model = time_model if time_model is not None else TimeModel()
+        # runtime closures, kept across reloads: node ids and sorted id pairs
+        self.closed_nodes = set()
+        self.closed_edges = set()
+        # bumped by every closure change; a table built before the change is not kept
+        self._closure_generation = 0
+        self._closure_lock = threading.RLock()
+        self.frozen = False
+        self._invalidate()
+
+    @property
+    def graph_var(self) -> nx.Graph:
+        """The networkx graph; after a snapshot restore it is only rebuilt when first used"""
+        if self._pending_snapshot is not None:
+            self._graph_var = self._networkx_from_snapshot(self._pending_snapshot)
+            self._pending_snapshot = None
+        return self._graph_var
+
+    @graph_var.setter
+    def graph_var(self, graph_var: nx.Graph):
+        self._graph_var = graph_var
+        self._pending_snapshot = None
+
+    def _invalidate(self):
+        """Bump the version and drop every structure derived from graph_var"""
+        if self.frozen:
+            raise RuntimeError("Graph is frozen; build a new one and swap it in")
+        self.version = next(_graph_versions)
+        self.compiled = None
+        self._reset_derived()
+
+    def _reset_derived(self):
+        """Precomputed structures, keyed by routing profile name"""
+        self.all_pairs = {}
+        self.portal_routers = {}
+        self.facility_indexes = {}
+        self.spatial_indexes = {}
+        self._routing_views = {}
+        # (profile, elevator wait band) -> routing view weighted in seconds
+        self._time_views = {}
+
+    def freeze(self):
+        """
+        Forbid further node/edge changes, so the graph can be shared between
+        threads. Closures stay allowed: they only swap routing views.
+        """
+        self.frozen = True
+
+    def memory_footprint(self) -> Dict[str, int]:
+        """
+        Node and edge counts, and the bytes held in numpy arrays by the
+        compiled graph, its routing views and every precomputed index:
+        "array_bytes" are private to this process, "mapped_bytes" are the
+        snapshot file pages shared by every process attached to it.
+        Arrays shared between views count once.
+        """
+        seen = set()
+        pending = [self.compiled, self._routing_views, self._time_views, self.all_pairs,
+                   self.portal_routers, self.facility_indexes, self.spatial_indexes]
+        array_bytes = mapped_bytes = 0
+        while pending:
+            value = pending.pop()
+            if isinstance(value, np.ndarray):
+                # views count through the array owning their buffer
+                while isinstance(value.base, np.ndarray):
+                    value = value.base
+                if id(value) in seen:
+                    continue
+                seen.add(id(value))
+                if isinstance(value, np.memmap):
+                    mapped_bytes += value.nbytes
+                else:
+                    array_bytes += value.nbytes
+            elif id(value) in seen or isinstance(value, (str, int, float, memoryview)) or value is None:
+                continue
+            elif isinstance(value, dict):
+                seen.add(id(value))
+                pending.extend(value.values())
+            elif isinstance(value, (list, tuple)):
+                seen.add(id(value))
+                # node id lists and the like hold no arrays
+                if value and not isinstance(value[0], (str, int, float)):
+                    pending.extend(value)
+            elif hasattr(value, "__dict__"):
+                seen.add(id(value))
+                pending.extend(vars(value).values())
+        if self.compiled is not None:
+            nodes, edges = self.compiled.num_nodes, len(self.compiled.neighbors) // 2
+        else:
+            nodes, edges = self.graph_var.number_of_nodes(), self.graph_var.number_of_edges()
+        return {"nodes": nodes, "edges": edges, "array_bytes": array_bytes, "mapped_bytes": mapped_bytes}
 
     def add_node(self, node_data: Dict[str, Any]):
         node_id = node_data["id"]
         self.graph_var.add_node(node_id, **node_data)
+        self._invalidate()
 
     def get_neighbors(self, node_id: str) -> List[str]:
         return list(self.graph_var.neighbors(node_id))
@@ -22,6 +138,200 @@ class Graph:
         weight = self._calculate_weight(node1, node2)
         distance = self._calculate_distance(node1, node2)
         self.graph_var.add_edge(node1_id, node2_id, weight=weight, distance=distance)
+        self._invalidate()
+
+    def compile(self) -> CompiledGraph:
+        """
+        Freeze the loaded graph into CSR arrays. Queries run on the compiled
+        arrays until the graph is modified again through add_node/add_edge.
+        """
+        self._reset_derived()
+        self.compiled = CompiledGraph.from_networkx(self.graph_var, self.scale_factor)
+        return self.compiled
+
+    def routing_graph(self, profile: str = "default") -> CompiledGraph:
+        """
+        Compiled arrays as seen by a routing profile (see ROUTING_PROFILES)
+        with the current closures applied, compiling first if needed.
+        Raises ValueError for an unknown profile.
+        """
+        view = self._routing_views.get(profile)
+        if view is None:
+            generation = self._closure_generation
+            view = self._closure_view(profile, self.closed_nodes, self.closed_edges)
+            self._install(self._routing_views, profile, view, generation)
+        return view
+
+    def _closure_view(self, profile: str, closed_nodes, closed_edges) -> CompiledGraph:
+        compiled = self.compiled if self.compiled is not None else self.compile()
+        view = compiled.profile(profile)
+        if closed_nodes or closed_edges:
+            view = view.without(compiled.closure_mask(closed_nodes, closed_edges))
+        return view
+
+    def _install(self, store: Dict, key, value, generation: int):
+        """Keep a structure built from the closures as of `generation`, unless they changed meanwhile"""
+        with self._closure_lock:
+            if generation == self._closure_generation:
+                store[key] = value
+        return value
+
+    def time_graph(self, profile: str = "default", hour: int = None) -> CompiledGraph:
+        """
+        The profile's routing view weighted by estimated seconds at `hour`
+        (default: now). The per-slot seconds are computed once per profile
+        and elevator-wait band, then reused by every query.
+        """
+        hour = datetime.now().hour if hour is None else hour
+        key = (profile, self.time_model.band(hour))
+        view = self._time_views.get(key)
+        if view is None:
+            generation = self._closure_generation
+            routing = self.routing_graph(profile)
+            view = routing.reweighted(self.time_model.edge_seconds(routing, profile, hour))
+            self._install(self._time_views, key, view, generation)
+        return view
+
+    def eta(self, path: List[str], profile: str = "default", hour: int = None) -> float:
+        """Estimated seconds to walk a node path at `hour` (default: now)"""
+        compiled = self.time_graph(profile, hour)
+        return compiled.path_weight([compiled.index[node_id] for node_id in path])
+
+    def close_node(self, node_id: str) -> bool:
+        """Stop routing through node_id (e.g. an elevator outage); False if already closed"""
+        return self._set_closed(node_id, True)
+
+    def reopen_node(self, node_id: str) -> bool:
+        return self._set_closed(node_id, False)
+
+    def close_edge(self, node1_id: str, node2_id: str) -> bool:
+        """Stop routing over one edge (e.g. a blocked hallway); False if already closed"""
+        return self._set_closed(self.edge_key(node1_id, node2_id), True)
+
+    def reopen_edge(self, node1_id: str, node2_id: str) -> bool:
+        return self._set_closed(self.edge_key(node1_id, node2_id), False)
+
+    @staticmethod
+    def edge_key(node1_id: str, node2_id: str) -> tuple:
+        """Order-independent key of an undirected edge"""
+        return tuple(sorted((node1_id, node2_id)))
+
+    def closures(self) -> List[Any]:
+        """Every closed element: node ids, then edge keys"""
+        return sorted(self.closed_nodes) + sorted(self.closed_edges)
+
+    def _set_closed(self, element, closed: bool) -> bool:
+        """
+        Close or reopen a node id or edge key. The graph version is kept, so
+        cached routes stay addressable and callers invalidate only those the
+        change affects. Profiles the change does not touch keep every
+        precomputed structure; for the others the all-pairs tables are
+        patched in place of a rebuild and the cheaper indexes rebuilt on
+        next use.
+        """
+        if isinstance(element, tuple):
+            if not self.graph_var.has_edge(*element):
+                raise ValueError(f"Unknown edge: {element[0]} - {element[1]}")
+            closed_set = self.closed_edges
+        else:
+            if element not in self.graph_var:
+                raise ValueError(f"Unknown node: {element}")
+            closed_set = self.closed_nodes
+
+        with self._closure_lock:
+            if (element in closed_set) == closed:
+                return False
+            before = (set(self.closed_nodes), set(self.closed_edges))
+            if closed:
+                closed_set.add(element)
+            else:
+                closed_set.remove(element)
+            self._closure_generation += 1
+            if self.compiled is not None:
+                self._apply_closure(element, closed, before)
+            else:
+                self._reset_derived()
+        return True
+
+    def _apply_closure(self, element, closed: bool, before: tuple):
+        """Bring each profile's precomputed structures up to date with one closure change"""
+        profiles = set(self._routing_views) | set(self.all_pairs) | set(self.portal_routers) | \
+            set(self.facility_indexes) | set(self.spatial_indexes) | {profile for profile, _ in self._time_views}
+        for profile in profiles:
+            old_view = self._routing_views.get(profile) or self._closure_view(profile, *before)
+            view = self._closure_view(profile, self.closed_nodes, self.closed_edges)
+            if np.array_equal(old_view.weights, view.weights):
+                # e.g. closing stairs the profile already avoids
+                continue
+            table = self.all_pairs.get(profile)
+            if table is not None:
+                self.all_pairs[profile] = self._patched_table(table, view, element, closed)
+            self._routing_views[profile] = view
+            for store in (self.portal_routers, self.facility_indexes, self.spatial_indexes):
+                store.pop(profile, None)
+            for key in [key for key in self._time_views if key[0] == profile]:
+                del self._time_views[key]
+
+    @staticmethod
+    def _patched_table(table: AllPairsTable, view: CompiledGraph, element, closed: bool) -> AllPairsTable:
+        if isinstance(element, tuple):
+            u, v = view.index[element[0]], view.index[element[1]]
+            return table.with_edge_closed(view, u, v) if closed else table.with_edge_reopened(view, u, v)
+        node = view.index[element]
+        return table.with_node_closed(view, node) if closed else table.with_node_reopened(view, node)
+
+    def tables_fit(self) -> bool:
+        """True if the campus is small enough for all-pairs tables (see ALL_PAIRS_MAX_NODES)"""
+        compiled = self.compiled if self.compiled is not None else self.compile()
+        return compiled.num_nodes <= ALL_PAIRS_MAX_NODES
+
+    def precompute_all_pairs(self, profile: str = "default") -> AllPairsTable:
+        """
+        Build the all-pairs weight/distance and next-hop tables for this campus.
+        Afterwards find_shortest_path walks next-hops instead of searching and
+        shortest_distance is a plain table lookup, for that profile.
+        """
+        generation = self._closure_generation
+        table = AllPairsTable(self.routing_graph(profile))
+        return self._install(self.all_pairs, profile, table, generation)
+
+    def build_portal_router(self, profile: str = "default") -> FloorPortalRouter:
+        """
+        Build the two-level floor/portal router. Used by
+        find_shortest_path(method="portals").
+        """
+        generation = self._closure_generation
+        router = FloorPortalRouter(self.routing_graph(profile))
+        return self._install(self.portal_routers, profile, router, generation)
+
+    def build_facility_index(self, profile: str = "default") -> FacilityIndex:
+        """Precompute nearest bathroom/water/elevator/stairs for every node"""
+        generation = self._closure_generation
+        index = FacilityIndex(self.routing_graph(profile))
+        return self._install(self.facility_indexes, profile, index, generation)
+
+    def find_nearest_facility(self, start_id: str, poi_type: str, profile: str = "default") -> Dict[str, Any]:
+        """Closest node of the given facility type and the path to it, or None"""
+        index = self.facility_indexes.get(profile)
+        if index is None:
+            index = self.build_facility_index(profile)
+        return index.nearest(start_id, poi_type)
+
+    def build_spatial_index(self, profile: str = "default") -> FloorSpatialIndex:
+        """Per-floor KD-trees over node x/y for snapping raw map points"""
+        generation = self._closure_generation
+        index = FloorSpatialIndex(self.routing_graph(profile))
+        return self._install(self.spatial_indexes, profile, index, generation)
+
+    def snap_to_node(self, x: float, y: float, floor: str, profile: str = "default") -> Dict[str, Any]:
+        """
+        Nearest routable node to a map point on a floor, as
+        {"id": node_id, "offset": meters from the point}, or None.
+        """
+        index = self.spatial_indexes.get(profile)
+        if index is None:
+            index = self.build_spatial_index(profile)
+        return index.snap(x, y, floor)
 
     def _calculate_weight(self, node1: Dict[str, Any], node2: Dict[str, Any]) -> float:
         if(node1["poi_type"] == "elevator" and node2["poi_type"] == "elevator"):#if both are elevators
@@ -57,51 +367,233 @@ class Graph:
                     json_files.append(os.path.join(root, file))
         return json_files
 
-    def _load_nodes_from_file(self, file_path: str):
-        """Load and add nodes from a single JSON file"""
+    def _parse_file(self, file_path: str) -> tuple:
+        """Read a floor JSON once and return its (nodes, edge pairs)"""
         with open(file_path) as f:
             data = json.load(f)
-            for node_data in data.get("nodes", []):
-                self.add_node(node_data)
+        edges = [edge_pair for edge_pair in data.get("edges", []) if len(edge_pair) == 2]
+        return data.get("nodes", []), edges
 
-    def _load_edges_from_file(self, file_path: str):
-        """Load and add edges from a single JSON file"""
-        with open(file_path) as f:
-            data = json.load(f)
-            for edge_pair in data.get("edges", []):
-                if len(edge_pair) == 2:
-                    self.add_edge(edge_pair[0], edge_pair[1])
+    def _add_nodes(self, nodes: List[Dict[str, Any]]):
+        self.graph_var.add_nodes_from((node_data["id"], node_data) for node_data in nodes)
+        self._invalidate()
+
+    def _add_edges(self, edges: List[List[str]]):
+        """Add a batch of edges; every endpoint must already be loaded"""
+        nodes = self.graph_var.nodes
+        batch = []
+        for node1_id, node2_id in edges:
+            node1, node2 = nodes[node1_id], nodes[node2_id]
+            batch.append((node1_id, node2_id, {
+                "weight": self._calculate_weight(node1, node2),
+                "distance": self._calculate_distance(node1, node2)
+            }))
+        self.graph_var.add_edges_from(batch)
+        self._invalidate()
+
+    def _parse_files(self, json_files: List[str]) -> List[tuple]:
+        """Parse all floor files concurrently, keeping the walk order"""
+        if len(json_files) <= 1:
+            return [self._parse_file(file_path) for file_path in json_files]
+        with ThreadPoolExecutor(max_workers=min(LOAD_WORKERS, len(json_files))) as pool:
+            return list(pool.map(self._parse_file, json_files))
 
 
-    def load_from_json_folder(self, folder_path: str):
+    def load_from_json_folder(self, folder_path: str, snapshot: bool = False, tables: Sequence[str] = (),
+                              snapshot_dir: str = None):
+        """
+        Load every floor JSON under folder_path. With snapshot=True an empty
+        graph is attached to the compiled snapshot (in snapshot_dir, or next
+        to the folder) when the source files' mtimes and sizes still match,
+        and the snapshot is (re)published after a full load otherwise. The
+        graph ends up compiled. `tables` names the routing profiles whose
+        facility index, and all-pairs tables if tables_fit(), are kept in
+        the snapshot too. Attached arrays are read-only memory maps shared
+        by every process using the same snapshot, and graph_var is rebuilt
+        lazily.
+        """
         if not os.path.exists(folder_path):
             raise FileNotFoundError(f"Folder not found: {folder_path}")
 
         json_files = self._collect_json_files(folder_path)
 
-        for file_path in json_files:
-            self._load_nodes_from_file(file_path)
+        if not snapshot or self.graph_var.number_of_nodes() != 0:
+            self._load_json_files(json_files)
+            return
+
+        path = snapshot_path(folder_path, snapshot_dir)
+        key = source_key(json_files, self.scale_factor, f"{','.join(tables)}:{ALL_PAIRS_MAX_NODES}")
+        arrays = load_snapshot(path, key)
+        if arrays is None:
+            # one process rebuilds a stale snapshot; the others wait and attach to it
+            with publish_lock(path):
+                arrays = load_snapshot(path, key)
+                if arrays is None:
+                    self._load_json_files(json_files)
+                    self.compile()
+                    for profile in tables:
+                        if self.tables_fit():
+                            self.precompute_all_pairs(profile)
+                        self.build_facility_index(profile)
+                    save_snapshot(path, key, self._snapshot_arrays())
+                    arrays = load_snapshot(path, key)
+        if arrays is not None:
+            self._restore_snapshot(arrays)
+
+    def _load_json_files(self, json_files: List[str]):
+        # each file is parsed exactly once; edges are resolved only after every
+        # floor's nodes are in, so cross-floor edges can point anywhere
+        parsed = self._parse_files(json_files)
+        for nodes, _ in parsed:
+            self._add_nodes(nodes)
+        for _, edges in parsed:
+            self._add_edges(edges)
+
+    def _snapshot_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Node table, edge list and CSR arrays of the compiled graph, plus the
+        all-pairs tables and facility indexes built so far (keyed
+        "all_pairs/<profile>/<array>" and "facilities/<profile>/<array>")
+        unless closures are applied.
+        """
+        compiled = self.compiled
+        tables = {}
+        if not self.closures():
+            for prefix, store in (("all_pairs", self.all_pairs), ("facilities", self.facility_indexes)):
+                for profile, structure in store.items():
+                    tables.update({f"{prefix}/{profile}/{name}": array for name, array in structure.arrays().items()})
+        nodes = [self.graph_var.nodes[node_id] for node_id in compiled.node_ids]
+        edges = list(self.graph_var.edges(data=True))
+        index = compiled.index
+        return {
+            "node_ids": np.array(compiled.node_ids, dtype=str),
+            "node_x": np.array([node.get("x", 0.0) for node in nodes], dtype=np.float64),
+            "node_y": np.array([node.get("y", 0.0) for node in nodes], dtype=np.float64),
+            "floor_numbers": np.array([str(node.get("floor_number", "")) for node in nodes], dtype=str),
+            "poi_types": np.array([str(node.get("poi_type", "")) for node in nodes], dtype=str),
+            "edge_u": np.array([index[u] for u, _, _ in edges], dtype=np.int32),
+            "edge_v": np.array([index[v] for _, v, _ in edges], dtype=np.int32),
+            "edge_weight": np.array([data["weight"] for _, _, data in edges], dtype=np.float64),
+            "edge_distance": np.array([data["distance"] for _, _, data in edges], dtype=np.float64),
+            "offsets": compiled.offsets,
+            "neighbors": compiled.neighbors,
+            "weights": compiled.weights,
+            "distances": compiled.distances,
+            "floor_of": compiled.floor_of,
+            "floors": np.array(compiled.floors, dtype=str),
+            "poi_of": compiled.poi_of,
+            "poi_names": np.array(compiled.poi_names, dtype=str),
+            "xs": compiled.xs,
+            "ys": compiled.ys,
+            **tables
+        }
+
+    def _restore_snapshot(self, arrays: Dict[str, np.ndarray]):
+        """Attach the compiled arrays (and tables) without parsing any JSON; graph_var waits until used"""
+        self._invalidate()
+        self.graph_var = nx.Graph()
+        self._pending_snapshot = arrays
+        self.compiled = CompiledGraph(
+            arrays["node_ids"].tolist(), arrays["offsets"], arrays["neighbors"], arrays["weights"],
+            arrays["distances"], arrays["xs"], arrays["ys"], arrays["floor_of"], arrays["floors"].tolist(),
+            self.scale_factor, arrays["poi_of"], arrays["poi_names"].tolist()
+        )
+        # "<kind>/<profile>/<array>" -> {kind: {profile: {array: ...}}}
+        tables = {}
+        for name, array in arrays.items():
+            if name.count("/") >= 2:
+                kind, profile, array_name = name.split("/", 2)
+                tables.setdefault(kind, {}).setdefault(profile, {})[array_name] = array
+        for profile, table in tables.get("all_pairs", {}).items():
+            self.all_pairs[profile] = AllPairsTable.from_arrays(self.routing_graph(profile), **table)
+        for profile, index in tables.get("facilities", {}).items():
+            self.facility_indexes[profile] = FacilityIndex.from_arrays(self.routing_graph(profile), index)
 
-        for file_path in json_files:
-            self._load_edges_from_file(file_path)
+    @staticmethod
+    def _networkx_from_snapshot(arrays: Dict[str, np.ndarray]) -> nx.Graph:
+        node_ids = arrays["node_ids"].tolist()
+        graph_var = nx.Graph()
+        graph_var.add_nodes_from(
+            (node_id, {"id": node_id, "x": x, "y": y, "floor_number": floor, "poi_type": poi_type})
+            for node_id, x, y, floor, poi_type in zip(
+                node_ids, arrays["node_x"].tolist(), arrays["node_y"].tolist(),
+                arrays["floor_numbers"].tolist(), arrays["poi_types"].tolist())
+        )
+        graph_var.add_edges_from(
+            (node_ids[u], node_ids[v], {"weight": weight, "distance": distance})
+            for u, v, weight, distance in zip(
+                arrays["edge_u"].tolist(), arrays["edge_v"].tolist(),
+                arrays["edge_weight"].tolist(), arrays["edge_distance"].tolist())
+        )
+        return graph_var
 
 
-    def find_shortest_path(self, start_id: str, end_id: str) -> Dict[str, Any]:
+    def find_shortest_path(self, start_id: str, end_id: str, method: str = "dijkstra",
+                           profile: str = "default", hour: int = None) -> Dict[str, Any]:
+        """
+        Shortest path by 'weight'. method="dijkstra" is answered from the
+        profile's all-pairs tables when they exist. method="astar" always
+        searches with the floor-aware A* heuristic, which needs the compiled
+        arrays (compiled on first use), and method="portals" always routes
+        through the floor/portal hierarchy. method="time" returns the
+        fastest path by estimated seconds at `hour` instead, with its
+        "eta_seconds".
+        A non-default profile masks the connectors it excludes and closed
+        nodes/edges are never used (both compile on first use as well).
+        """
+        if method == "time":
+            return self._fastest_path(start_id, end_id, profile, hour)
+        table = self.all_pairs.get(profile) if method == "dijkstra" else None
+        if table is not None:
+            return table.find_shortest_path(start_id, end_id)
+        if method == "portals":
+            router = self.portal_routers.get(profile)
+            if router is None:
+                router = self.build_portal_router(profile)
+            return router.find_shortest_path(start_id, end_id)
+        if self.compiled is not None or method == "astar" or profile != "default" or \
+                self.closed_nodes or self.closed_edges:
+            return self.routing_graph(profile).find_shortest_path(start_id, end_id, method)
         try:
-            shortest_path = nx.dijkstra_path(self.graph_var, start_id, end_id, weight='weight')
+            weight, shortest_path = nx.single_source_dijkstra(self.graph_var, start_id, end_id, weight='weight')
             distance = nx.path_weight(self.graph_var,shortest_path,weight='distance')
             return {
                 "path": shortest_path,
-                "distance": distance
+                "distance": distance,
+                "weight": weight
             }
         except (nx.NetworkXNoPath, nx.NodeNotFound):
             return None
 
+    def _fastest_path(self, start_id: str, end_id: str, profile: str, hour: int) -> Dict[str, Any]:
+        timed = self.time_graph(profile, hour)
+        result = timed.find_shortest_path(start_id, end_id)
+        if result is None:
+            return None
+        routing = self.routing_graph(profile)
+        return {
+            "path": result["path"],
+            "distance": result["distance"],
+            "weight": routing.path_weight([routing.index[node_id] for node_id in result["path"]]),
+            "eta_seconds": result["weight"]
+        }
+
+    def shortest_distance(self, start_id: str, end_id: str, profile: str = "default") -> Dict[str, float]:
+        """Weight and distance totals only; no path is built when the tables exist"""
+        table = self.all_pairs.get(profile)
+        if table is not None:
+            return table.distance(start_id, end_id)
+        result = self.find_shortest_path(start_id, end_id, profile=profile)
+        if result is None:
+            return None
+        return {"distance": result["distance"], "weight": result["weight"]}
+
     def yen_k_shortest_paths(self, start_id: str, end_id: str, num=3) -> List[Dict[str, Any]]:
         from networkx.algorithms.simple_paths import shortest_simple_paths
         paths = []
         try:
-            generator = shortest_simple_paths(self.graph_var, start_id, end_id, weight='weight')
+            open_graph = nx.restricted_view(self.graph_var, self.closed_nodes, self.closed_edges)
+            generator = shortest_simple_paths(open_graph, start_id, end_id, weight='weight')
             for _, path in zip(range(num), generator):
                 distance = sum(
                     self.graph_var[u][v]['weight'] for u, v in zip(path[:-1], path[1:])
@@ -114,37 +606,174 @@ class Graph:
         except (nx.NetworkXNoPath, nx.NodeNotFound):
             return []
 
-    def find_paths_to_multiple_destinations(self, start_id: str, destination_ids: List[str]) -> Dict[str, Any]:
+    def reachable_within(self, start_id: str, max_distance: float, profile: str = "default",
+                         by: str = "distance", hour: int = None) -> Dict[str, Any]:
+        """
+        Every node reachable from start_id within a budget, grouped by floor
+        and sorted by cost: {floor: [{"id", "poi_type", "distance", "weight"}, ...]}.
+        by="distance" budgets meters walked; by="weight" budgets the routing
+        cost, which also counts the fixed connector penalties; by="time"
+        budgets estimated seconds at `hour`, reported as "seconds".
+        Returns None for an unknown start.
+        """
+        compiled = self.time_graph(profile, hour) if by == "time" else self.routing_graph(profile)
+        start = compiled.index.get(start_id)
+        if start is None:
+            return None
+
+        reached = compiled.within(start, max_distance, "distance" if by == "distance" else "weight")
+        cost_key = "seconds" if by == "time" else "weight"
+        ranked = sorted(reached.items(), key=lambda item: (item[1][0 if by == "distance" else 1], item[0]))
+        floors = {}
+        for node, (distance, weight) in ranked:
+            floors.setdefault(compiled.floors[compiled.floor_of[node]], []).append({
+                "id": compiled.node_ids[node],
+                "poi_type": compiled.poi_names[compiled.poi_of[node]],
+                "distance": distance,
+                cost_key: weight
+            })
+        return floors
+
+    def find_paths_to_multiple_destinations(self, start_id: str, destination_ids: List[str], method: str = "dijkstra",
+                                            optimize_order: bool = False, profile: str = "default",
+                                            hour: int = None) -> Dict[str, Any]:
         """
         Find shortest paths sequentially through multiple destinations in the specified order.
         Returns paths and distances for each segment, plus total distance.
+        With optimize_order=True the destinations are first reordered to minimise
+        the total distance (estimated seconds for method="time"), and both
+        orders plus the distance (or seconds) saved are reported.
         """
         paths_info = []
         total_distance = 0
         current_position = start_id
+        find_leg = lambda source_id, target_id: self.find_shortest_path(source_id, target_id, method, profile, hour)
+        order_summary = {}
+        if optimize_order:
+            destination_ids, order_summary, find_leg = self._optimize_visit_order(start_id, destination_ids, profile,
+                                                                                 method, hour)
 
         for dest_id in destination_ids:
-            try:
-                # Find path from current position to next destination
-                path = nx.dijkstra_path(self.graph_var, current_position, dest_id, weight='weight')
-                distance = nx.path_weight(self.graph_var, path, weight='distance')
-                
-                paths_info.append({
-                    "destination": dest_id,
-                    "path": path,
-                    "distance": distance
-                })
-                
-                total_distance += distance
-                current_position = dest_id  # Update current position for next destination
-                
-            except (nx.NetworkXNoPath, nx.NodeNotFound):
+            # Find path from current position to next destination
+            leg = find_leg(current_position, dest_id)
+            if leg is None:
                 paths_info.append({
                     "destination": dest_id,
                     "error": "No path found or invalid destination"
                 })
+                continue
+
+            paths_info.append({
+                "destination": dest_id,
+                "path": leg["path"],
+                "distance": leg["distance"]
+            })
+
+            total_distance += leg["distance"]
+            current_position = dest_id  # Update current position for next destination
 
         return {
             "paths": paths_info,
-            "total_distance": total_distance
+            "total_distance": total_distance,
+            **order_summary
+        }
+
+    def _batch_legs(self, point_ids: List[str], profile: str = "default", method: str = "dijkstra", hour: int = None):
+        """
+        Distance matrix over point_ids from one single-source run per point
+        (or the all-pairs tables), plus a leg finder answered from those runs.
+        For method="time" the runs are on the time graph at `hour`, the
+        matrix holds estimated seconds and legs are the fastest paths.
+        """
+        by_time = method == "time"
+        compiled = self.time_graph(profile, hour) if by_time else self.routing_graph(profile)
+        size = len(point_ids)
+        matrix = np.full((size, size), np.inf)
+        table = None if by_time else self.all_pairs.get(profile)
+        if table is not None:
+            for i, source_id in enumerate(point_ids):
+                for j, target_id in enumerate(point_ids):
+                    costs = table.distance(source_id, target_id)
+                    if costs is not None:
+                        matrix[i, j] = costs["distance"]
+            return matrix, table.find_shortest_path
+
+        trees = {}
+        for point_id in point_ids:
+            if point_id in compiled.index and point_id not in trees:
+                trees[point_id] = compiled.single_source(compiled.index[point_id])
+        for i, source_id in enumerate(point_ids):
+            if source_id not in trees:
+                continue
+            dist, walked, _ = trees[source_id]
+            for j, target_id in enumerate(point_ids):
+                target = compiled.index.get(target_id)
+                if target is not None and dist[target] < float("inf"):
+                    matrix[i, j] = dist[target] if by_time else walked[target]
+
+        def find_leg(source_id: str, target_id: str):
+            if source_id not in trees:
+                return None
+            leg = compiled.tree_path(trees[source_id], target_id)
+            if leg is None or not by_time:
+                return leg
+            routing = self.routing_graph(profile)
+            return {**leg, "weight": routing.path_weight([routing.index[node_id] for node_id in leg["path"]]),
+                    "eta_seconds": leg["weight"]}
+
+        return matrix, find_leg
+
+    def find_paths_batch(self, pairs: List[tuple], profile: str = "default") -> List[Dict[str, Any]]:
+        """
+        Shortest paths for many (start_id, end_id) pairs. Pairs are grouped by
+        start, so each distinct start costs one single-source run and every
+        pair sharing it is read off the same tree. None marks a missing path.
+        """
+        table = self.all_pairs.get(profile)
+        if table is not None:
+            return [table.find_shortest_path(start_id, end_id) for start_id, end_id in pairs]
+
+        compiled = self.routing_graph(profile)
+        by_start = {}
+        for position, (start_id, end_id) in enumerate(pairs):
+            by_start.setdefault(start_id, []).append((position, end_id))
+
+        results = [None] * len(pairs)
+        for start_id, targets in by_start.items():
+            if start_id not in compiled.index:
+                continue
+            tree = compiled.single_source(compiled.index[start_id])
+            for position, end_id in targets:
+                results[position] = compiled.tree_path(tree, end_id)
+        return results
+
+    def _optimize_visit_order(self, start_id: str, destination_ids: List[str], profile: str = "default",
+                              method: str = "dijkstra", hour: int = None):
+        """
+        Reorder destinations to minimise total distance, or estimated seconds
+        at `hour` for method="time": Held-Karp for small sets,
+        nearest-neighbour + 2-opt beyond that. Unreachable destinations keep
+        their relative order at the end.
+        """
+        cost = "seconds" if method == "time" else "distance"
+        matrix, find_leg = self._batch_legs([start_id] + list(destination_ids), profile, method, hour)
+        reachable = [i for i in range(1, len(matrix)) if np.isfinite(matrix[0, i])]
+        unreachable = [i for i in range(1, len(matrix)) if not np.isfinite(matrix[0, i])]
+
+        sub = matrix[np.ix_([0] + reachable, [0] + reachable)]
+        order, optimized_cost = solve_visit_order(sub)
+        given_cost = path_cost(sub, list(range(1, len(sub))))
+
+        optimized_ids = [destination_ids[reachable[i - 1] - 1] for i in order] + \
+                        [destination_ids[i - 1] for i in unreachable]
+        summary = {
+            "given_order": list(destination_ids),
+            "optimized_order": optimized_ids,
+            f"given_{cost}": given_cost,
+            f"optimized_{cost}": optimized_cost,
+            f"{cost}_saved": given_cost - optimized_cost
         }
+        if method in ("astar", "portals"):
+            # the matrix only orders the stops; legs still use the requested search
+            find_leg = lambda source_id, target_id: self.find_shortest_path(source_id, target_id, method, profile)
+        return optimized_ids, summary, find_leg
@@ -0,0 +1,158 @@
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from .compiled import CompiledGraph
+
+
+class AllPairsTable:
+    """
+    Dense all-pairs 'weight'/'distance' matrices and a next-hop matrix for one
+    compiled campus graph, built from one single-source run per node.
+
+    Row t is the shortest-path tree rooted at t, so next_hop[t, s] is the
+    neighbour of s on its way to t. Campus graphs are undirected, which makes
+    that tree a valid s -> t route, and walking a single row keeps the path
+    consistent with the stored totals even when several routes tie.
+    """
+
+    def __init__(self, compiled: CompiledGraph):
+        n = compiled.num_nodes
+        self.compiled = compiled
+        self.weights = np.full((n, n), np.inf, dtype=np.float32)
+        self.distances = np.full((n, n), np.inf, dtype=np.float32)
+        self.next_hop = np.full((n, n), -1, dtype=np.int32)
+
+        for target in range(n):
+            self._fill_row(target)
+
+    def _fill_row(self, target: int):
+        dist, walked, pred = self.compiled.single_source(target)
+        row = np.asarray(dist, dtype=np.float32)
+        self.weights[target] = row
+        self.distances[target] = np.where(np.isinf(row), np.inf, walked)
+        self.next_hop[target] = pred
+
+    @classmethod
+    def from_arrays(cls, compiled: CompiledGraph, weights: np.ndarray, distances: np.ndarray,
+                    next_hop: np.ndarray) -> "AllPairsTable":
+        """Tables built earlier for `compiled` (e.g. mapped from a snapshot), used as they are"""
+        table = cls.__new__(cls)
+        table.compiled = compiled
+        table.weights = weights
+        table.distances = distances
+        table.next_hop = next_hop
+        return table
+
+    def _patched(self, compiled: CompiledGraph, rows: np.ndarray) -> "AllPairsTable":
+        """A private copy of these tables on `compiled`, with the trees rooted at `rows` searched again"""
+        table = AllPairsTable.from_arrays(compiled, np.array(self.weights), np.array(self.distances),
+                                          np.array(self.next_hop))
+        for target in np.flatnonzero(rows):
+            table._fill_row(int(target))
+        return table
+
+    def with_node_closed(self, compiled: CompiledGraph, node: int) -> "AllPairsTable":
+        """
+        The tables once `node` is closed on `compiled`: only the trees that
+        route through it are searched again; every other tree just loses
+        the node itself. Returns self when nothing changes.
+        """
+        rows = (self.next_hop == node).any(axis=1)
+        rows[node] = True
+        reached = np.isfinite(self.weights[:, node])
+        reached[node] = False
+        if not rows.any() and not reached.any():
+            return self
+        table = self._patched(compiled, rows)
+        kept = reached & ~rows
+        table.weights[kept, node] = np.inf
+        table.distances[kept, node] = np.inf
+        table.next_hop[kept, node] = -1
+        return table
+
+    def with_edge_closed(self, compiled: CompiledGraph, u: int, v: int) -> "AllPairsTable":
+        """The tables once edge u-v is closed on `compiled`: only the trees using the edge are searched again"""
+        rows = (self.next_hop[:, u] == v) | (self.next_hop[:, v] == u)
+        return self._patched(compiled, rows) if rows.any() else self
+
+    def with_node_reopened(self, compiled: CompiledGraph, node: int) -> "AllPairsTable":
+        """
+        The tables once `node` is reopened on `compiled`. Every new route
+        goes through the node, so only the trees where going through it is
+        now cheaper are searched again; the others just gain the route from
+        the node, its first hop read off the node's own tree.
+        """
+        dist, walked, pred = compiled.single_source(node)
+        dist = np.asarray(dist, dtype=np.float32)
+        through = dist[:, None] + dist[None, :]
+        # the route to the node itself is filled in below
+        through[:, node] = np.inf
+        rows = (through < self.weights * (1 - 1e-6)).any(axis=1)
+        rows[node] = True
+        table = self._patched(compiled, rows)
+
+        first_hop = np.full(len(dist), -1, dtype=np.int64)
+        for target in np.argsort(dist, kind="stable"):
+            if not np.isfinite(dist[target]) or target == node:
+                continue
+            first_hop[target] = target if pred[target] == node else first_hop[pred[target]]
+        kept = np.flatnonzero(np.isfinite(dist) & ~rows)
+        hops = first_hop[kept]
+        # first step plus the tree's own route from the hop, so walking next-hops matches the totals
+        for target, hop, step, walk in zip(kept, hops, dist[hops], np.asarray(walked)[hops]):
+            table.weights[target, node] = step + table.weights[target, hop]
+            table.distances[target, node] = walk + table.distances[target, hop]
+            table.next_hop[target, node] = hop
+        return table
+
+    def with_edge_reopened(self, compiled: CompiledGraph, u: int, v: int) -> "AllPairsTable":
+        """The tables once edge u-v is reopened on `compiled`: only the trees it now shortens are searched again"""
+        step = compiled.path_weight([u, v])
+        if not np.isfinite(step):
+            return self
+        via_edge = self.weights[:, u][:, None] + step + self.weights[v, :][None, :]
+        through = np.minimum(via_edge, via_edge.T)
+        rows = (through < self.weights * (1 - 1e-6)).any(axis=1)
+        return self._patched(compiled, rows) if rows.any() else self
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {"weights": self.weights, "distances": self.distances, "next_hop": self.next_hop}
+
+    def nbytes(self) -> int:
+        return self.weights.nbytes + self.distances.nbytes + self.next_hop.nbytes
+
+    def distance(self, start_id: str, end_id: str) -> Optional[Dict[str, float]]:
+        """Table lookup of both cost totals, without reconstructing the path"""
+        source = self.compiled.index.get(start_id)
+        target = self.compiled.index.get(end_id)
+        if source is None or target is None or np.isinf(self.weights[target, source]):
+            return None
+        return {
+            "distance": float(self.distances[target, source]),
+            "weight": float(self.weights[target, source])
+        }
+
+    def path(self, source: int, target: int) -> Optional[List[int]]:
+        """Walk next-hops from source to target in O(path length)"""
+        if np.isinf(self.weights[target, source]):
+            return None
+        hops = self.next_hop[target]
+        path = [source]
+        while path[-1] != target:
+            path.append(int(hops[path[-1]]))
+        return path
+
+    def find_shortest_path(self, start_id: str, end_id: str) -> Optional[Dict[str, Any]]:
+        """Same shape as Graph.find_shortest_path, answered from the tables"""
+        costs = self.distance(start_id, end_id)
+        if costs is None:
+            return None
+
+        index = self.compiled.index
+        path = self.path(index[start_id], index[end_id])
+        return {
+            "path": [self.compiled.node_ids[i] for i in path],
+            "distance": costs["distance"],
+            "weight": costs["weight"]
+        }
@@ -0,0 +1,228 @@
+import heapq
+import json
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .compiled import ROUTING_PROFILES
+
+# leading letters of a node id -> building folder under campus_jsons
+BUILDING_PREFIXES = {
+    "h": "hall",
+    "mb": "mb",
+    "cc": "cc",
+}
+
+# inter-building edges, stored next to the building folders. A connector
+# names its "from" and "to" nodes and the segments it is made of:
+# {"type": "escalator" | "elevator" | "stairs", "floors": n} rides and
+# {"type": "walk", "length_m": m} walks.
+CONNECTORS_FILE = "connectors.json"
+
+# connector segment type -> (weight, distance): the fixed costs Graph gives an
+# edge between two connector nodes of that type. A "walk" segment costs its
+# length_m for both.
+SEGMENT_COSTS = {
+    "elevator": (15.0, 0.0),
+    "escalator": (15.0, 5.0),
+    "stairs": (20.0, 10.0),
+}
+
+
+def building_of(node_id: str) -> Optional[str]:
+    """Building a node id belongs to, from its prefix: h8_803 -> hall, mb_s2_metro -> mb"""
+    match = re.match(r"[a-z]+", str(node_id).lower())
+    return BUILDING_PREFIXES.get(match.group()) if match else None
+
+
+def load_connectors(base_path: str) -> List[Dict[str, Any]]:
+    """Connector edges from campus_jsons/connectors.json ([] if there is none)"""
+    path = os.path.join(str(base_path), CONNECTORS_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f).get("connectors", [])
+
+
+def connector_costs(connector: Dict[str, Any]) -> Tuple[float, float]:
+    """
+    (weight, distance) of a connector: the sum of its segments (see
+    SEGMENT_COSTS), or its explicit "weight" and "distance" if it has them.
+    """
+    if "weight" in connector:
+        return float(connector["weight"]), float(connector["distance"])
+    weight = distance = 0.0
+    for segment in connector["segments"]:
+        if segment["type"] == "walk":
+            segment_weight = segment_distance = float(segment["length_m"])
+        else:
+            segment_weight, segment_distance = SEGMENT_COSTS[segment["type"]]
+            floors = segment.get("floors", 1)
+            segment_weight, segment_distance = segment_weight * floors, segment_distance * floors
+        weight += segment_weight
+        distance += segment_distance
+    return weight, distance
+
+
+def connector_seconds(connector: Dict[str, Any], time_model, profile: str = "default") -> float:
+    """
+    Estimated seconds to take a connector: rides at the time model's
+    per-floor seconds and walks at the profile's speed. A connector without
+    segments is walked over its distance.
+    """
+    speed = time_model.walking_speed(profile)
+    if "segments" not in connector:
+        return connector_costs(connector)[1] / speed
+    per_floor = time_model.config["seconds_per_floor"]
+    seconds = 0.0
+    for segment in connector["segments"]:
+        if segment["type"] == "walk":
+            seconds += float(segment["length_m"]) / speed
+        else:
+            seconds += float(per_floor[segment["type"]]) * segment.get("floors", 1)
+    return seconds
+
+
+class BuildingNetwork:
+    """
+    One routing space over every building, joined by connector edges
+    (e.g. the Hall escalator down to the metro tunnel and MB S2).
+
+    Each building stays its own Graph, fetched through `graph_for(building)`
+    (None if the building does not exist), so a building is only loaded when
+    a query first reaches it. Cross-building queries run Dijkstra over the
+    start, the end and the connector endpoints: hops inside a building are
+    that building's shortest distances (estimated seconds for method="time"),
+    hops between buildings are the connector edges. The legs are then
+    expanded into one node path.
+    """
+
+    def __init__(self, graph_for: Callable[[str], Any], connectors: List[Dict[str, Any]]):
+        self.graph_for = graph_for
+        # building -> connector endpoints inside it
+        self._gateways: Dict[str, List[str]] = {}
+        # endpoint -> [(other endpoint, weight, distance, connector)]
+        self._links: Dict[str, List[tuple]] = {}
+        for connector in connectors:
+            weight, distance = connector_costs(connector)
+            ends = (connector["from"], connector["to"])
+            for node_id, other_id in (ends, ends[::-1]):
+                self._gateways.setdefault(building_of(node_id), []).append(node_id)
+                self._links.setdefault(node_id, []).append((other_id, weight, distance, connector))
+
+    def find_shortest_path(self, start_id: str, end_id: str, method: str = "dijkstra",
+                           profile: str = "default", hour: int = None) -> Optional[Dict[str, Any]]:
+        """Same shape as Graph.find_shortest_path, across buildings"""
+        start_building, end_building = building_of(start_id), building_of(end_id)
+        if start_building is None or end_building is None:
+            return None
+        if start_building == end_building:
+            graph = self.graph_for(start_building)
+            return graph.find_shortest_path(start_id, end_id, method, profile, hour) if graph is not None else None
+
+        dist = {start_id: 0.0}
+        # node -> (previous node, connector or None for an in-building leg)
+        previous = {}
+        done = set()
+        heap = [(0.0, start_id)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if u in done:
+                continue
+            done.add(u)
+            if u == end_id:
+                break
+
+            building = building_of(u)
+            graph = self.graph_for(building)
+            if graph is None:
+                continue
+            targets = self._gateways.get(building, []) + ([end_id] if building == end_building else [])
+            hops = []
+            for v in targets:
+                if v != u and v not in done:
+                    cost = self._leg_cost(graph, u, v, method, profile, hour)
+                    if cost is not None:
+                        hops.append((v, cost, None))
+            for v, weight, _, connector in self._links.get(u, []):
+                if self._usable(connector, profile):
+                    cost = connector_seconds(connector, graph.time_model, profile) if method == "time" else weight
+                    hops.append((v, cost, connector))
+
+            for v, cost, connector in hops:
+                if d + cost < dist.get(v, float("inf")):
+                    dist[v] = d + cost
+                    previous[v] = (u, connector)
+                    heapq.heappush(heap, (d + cost, v))
+
+        if end_id not in done:
+            return None
+        return self._assemble(start_id, end_id, previous, method, profile, hour)
+
+    def eta(self, path: List[str], profile: str = "default", hour: int = None) -> float:
+        """Estimated seconds to walk a node path that may cross buildings (see Graph.eta)"""
+        runs = self.split(path)
+        seconds = 0.0
+        for (building, run), (_, next_run) in zip(runs, runs[1:]):
+            graph = self.graph_for(building)
+            connector = next(link[3] for link in self._links[run[-1]] if link[0] == next_run[0])
+            seconds += graph.eta(run, profile, hour) + connector_seconds(connector, graph.time_model, profile)
+        building, run = runs[-1]
+        return seconds + self.graph_for(building).eta(run, profile, hour)
+
+    @staticmethod
+    def split(path: List[str]) -> List[Tuple[str, List[str]]]:
+        """A node path as (building, node ids) runs, in order"""
+        runs = []
+        for node_id in path:
+            building = building_of(node_id)
+            if runs and runs[-1][0] == building:
+                runs[-1][1].append(node_id)
+            else:
+                runs.append((building, [node_id]))
+        return runs
+
+    @staticmethod
+    def _usable(connector: Dict[str, Any], profile: str) -> bool:
+        """False if the profile excludes one of the connector's ride types"""
+        excluded = ROUTING_PROFILES.get(profile, ())
+        return not any(segment["type"] in excluded for segment in connector.get("segments", ()))
+
+    @staticmethod
+    def _leg_cost(graph, u: str, v: str, method: str, profile: str, hour: int) -> Optional[float]:
+        if method == "time":
+            leg = graph.find_shortest_path(u, v, "time", profile, hour)
+            return leg["eta_seconds"] if leg is not None else None
+        costs = graph.shortest_distance(u, v, profile)
+        return costs["weight"] if costs is not None else None
+
+    def _assemble(self, start_id: str, end_id: str, previous: Dict[str, tuple],
+                  method: str, profile: str, hour: int) -> Optional[Dict[str, Any]]:
+        hops = []
+        node = end_id
+        while node != start_id:
+            prev, connector = previous[node]
+            hops.append((prev, node, connector))
+            node = prev
+        hops.reverse()
+
+        path = [start_id]
+        weight = distance = seconds = 0.0
+        for u, v, connector in hops:
+            graph = self.graph_for(building_of(u))
+            if connector is not None:
+                connector_weight, connector_distance = connector_costs(connector)
+                leg = {"path": [u, v], "weight": connector_weight, "distance": connector_distance,
+                       "eta_seconds": connector_seconds(connector, graph.time_model, profile)}
+            else:
+                leg = graph.find_shortest_path(u, v, method, profile, hour)
+                if leg is None:
+                    return None
+            path.extend(leg["path"][1:])
+            weight += leg["weight"]
+            distance += leg["distance"]
+            seconds += leg.get("eta_seconds", 0.0)
+        result = {"path": path, "distance": distance, "weight": weight}
+        if method == "time":
+            result["eta_seconds"] = seconds
+        return result
@@ -0,0 +1,107 @@
+from typing import Any, Dict, List, Tuple
+
+from .compiled import CompiledGraph
+
+# polyline x/y are encoded in hundredths of a map unit
+POLYLINE_PRECISION = 100
+
+
+def encode_polyline(points: List[Tuple[float, float, int]], precision: int = POLYLINE_PRECISION) -> List[int]:
+    """
+    Flatten (x, y, floor index) points into [x0, y0, f0, dx1, dy1, df1, ...]:
+    the first point absolute, every later one as the integer delta from the
+    previous. Consecutive route points are close, so most deltas are small.
+    """
+    encoded = []
+    last = (0, 0, 0)
+    for x, y, floor in points:
+        current = (round(x * precision), round(y * precision), int(floor))
+        encoded.extend(c - p for c, p in zip(current, last))
+        last = current
+    return encoded
+
+
+def decode_polyline(encoded: List[int], precision: int = POLYLINE_PRECISION) -> List[Tuple[float, float, int]]:
+    """Inverse of encode_polyline"""
+    points = []
+    x = y = floor = 0
+    for i in range(0, len(encoded), 3):
+        x += encoded[i]
+        y += encoded[i + 1]
+        floor += encoded[i + 2]
+        points.append((x / precision, y / precision, floor))
+    return points
+
+
+def compact_payload(compiled: CompiledGraph, version: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compact form of an /indoorNavigation payload ({"path": ...} or the
+    multi-destination {"paths": [...]}). The legs are joined into one list
+    of node indices with its delta-encoded polyline; each leg records its
+    distance and the position in `nodes` where it ends. `floors` maps the
+    polyline's floor indices to floor labels, and `layout` identifies the
+    node indexing, so clients can keep per-layout lookup tables.
+    """
+    if "path" in payload:
+        route = payload["path"]
+        legs = [{"destination": route["path"][-1], "path": route["path"], "distance": route["distance"]}]
+        extra = {"total_distance": route["distance"], "weight": route["weight"]}
+        if "eta_seconds" in route:
+            legs[0]["eta_seconds"] = extra["total_eta_seconds"] = route["eta_seconds"]
+    else:
+        legs = payload["paths"]
+        extra = {key: value for key, value in payload.items() if key != "paths"}
+
+    index = compiled.index
+    nodes = []
+    compact_legs = []
+    for leg in legs:
+        if "path" not in leg:
+            compact_legs.append({"destination": leg["destination"], "error": leg["error"]})
+            continue
+        leg_nodes = [index[node_id] for node_id in leg["path"]]
+        # consecutive legs share their joining node
+        nodes.extend(leg_nodes[1:] if nodes and nodes[-1] == leg_nodes[0] else leg_nodes)
+        compact_leg = {"destination": leg["destination"], "distance": leg["distance"], "end": len(nodes) - 1}
+        if "eta_seconds" in leg:
+            compact_leg["eta_seconds"] = leg["eta_seconds"]
+        compact_legs.append(compact_leg)
+
+    points = [(float(compiled.xs[i]), float(compiled.ys[i]), int(compiled.floor_of[i])) for i in nodes]
+    return {
+        "format": "compact",
+        "version": version,
+        "layout": compiled.layout_tag(),
+        "floors": compiled.floors,
+        "nodes": nodes,
+        "polyline": encode_polyline(points),
+        "legs": compact_legs,
+        **extra
+    }
+
+
+def compact_cross_building(parts: List[Tuple[str, CompiledGraph, int, List[str]]],
+                           route: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compact form of a route crossing buildings. Node indices are per
+    building graph, so the route is split into one compact path per
+    building it passes through, in order; `parts` holds each one's
+    (building, compiled graph, graph version, node ids).
+    """
+    segments = []
+    for building, compiled, version, node_ids in parts:
+        nodes = [compiled.index[node_id] for node_id in node_ids]
+        points = [(float(compiled.xs[i]), float(compiled.ys[i]), int(compiled.floor_of[i])) for i in nodes]
+        segments.append({
+            "building": building,
+            "version": version,
+            "layout": compiled.layout_tag(),
+            "floors": compiled.floors,
+            "nodes": nodes,
+            "polyline": encode_polyline(points)
+        })
+    payload = {"format": "compact", "segments": segments, "total_distance": route["distance"],
+               "weight": route["weight"]}
+    if "eta_seconds" in route:
+        payload["total_eta_seconds"] = route["eta_seconds"]
+    return payload
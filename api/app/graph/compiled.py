@@ -0,0 +1,437 @@
+import copy
+import hashlib
+import heapq
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+INF = float("inf")
+# float32 rounding slack when comparing stored weights with planar distances
+PLANAR_TOLERANCE = 1e-5
+
+# routing profile -> connector poi_types it never steps onto or off
+ROUTING_PROFILES = {
+    "default": (),
+    "no_stairs": ("stairs",),
+    "no_escalator": ("escalator",),
+    "elevator_only": ("stairs", "escalator"),
+}
+
+
+class CompiledGraph:
+    """
+    Frozen, integer-indexed CSR view of a Graph2.Graph.
+
+    Node i owns the adjacency slots offsets[i]:offsets[i + 1] of the
+    neighbors/weights/distances arrays. Every undirected edge is stored
+    once in each direction. Node geometry (x, y, floor) is kept alongside
+    for the A* heuristic, and each node's poi_type for routing profiles.
+    """
+
+    def __init__(self, node_ids: List[str], offsets: np.ndarray, neighbors: np.ndarray,
+                 weights: np.ndarray, distances: np.ndarray, xs: np.ndarray = None,
+                 ys: np.ndarray = None, floor_of: np.ndarray = None, floors: List[str] = None,
+                 scale_factor: float = 0.05, poi_of: np.ndarray = None, poi_names: List[str] = None):
+        self.node_ids = list(node_ids)
+        self.index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.weights = weights
+        self.distances = distances
+        self.scale_factor = scale_factor
+
+        n = len(self.node_ids)
+        self.xs = xs if xs is not None else np.zeros(n, dtype=np.float32)
+        self.ys = ys if ys is not None else np.zeros(n, dtype=np.float32)
+        self.floor_of = floor_of if floor_of is not None else np.zeros(n, dtype=np.int16)
+        self.floors = list(floors) if floors is not None else [""]
+        self.poi_of = poi_of if poi_of is not None else np.zeros(n, dtype=np.int16)
+        self.poi_names = list(poi_names) if poi_names is not None else [""]
+        self.profile_name = "default"
+        # every slot is usable in the default profile
+        self.edge_mask = None
+        self._base = self
+        self._profiles = {}
+        self._layout_tag = None
+
+        # memoryviews give fast scalar reads in the search loops without
+        # copying the arrays into Python lists
+        self._offsets = memoryview(offsets)
+        self._neighbors = memoryview(neighbors)
+        self._distances = memoryview(distances)
+        self._set_weights(weights)
+
+    def _set_weights(self, weights: np.ndarray):
+        self.weights = weights
+        self._weights = memoryview(weights)
+        self._index_teleports()
+
+    @classmethod
+    def from_networkx(cls, nx_graph, scale_factor: float = 0.05) -> "CompiledGraph":
+        """Freeze a networkx graph with 'weight' and 'distance' edge attributes"""
+        node_ids = list(nx_graph.nodes)
+        index = {node_id: i for i, node_id in enumerate(node_ids)}
+
+        floors = []
+        floor_index = {}
+        poi_names = []
+        poi_index = {}
+        floor_of = np.zeros(len(node_ids), dtype=np.int16)
+        poi_of = np.zeros(len(node_ids), dtype=np.int16)
+        xs = np.zeros(len(node_ids), dtype=np.float32)
+        ys = np.zeros(len(node_ids), dtype=np.float32)
+        for i, node_id in enumerate(node_ids):
+            data = nx_graph.nodes[node_id]
+            floor = str(data.get("floor_number", ""))
+            if floor not in floor_index:
+                floor_index[floor] = len(floors)
+                floors.append(floor)
+            floor_of[i] = floor_index[floor]
+            poi_type = str(data.get("poi_type", ""))
+            if poi_type not in poi_index:
+                poi_index[poi_type] = len(poi_names)
+                poi_names.append(poi_type)
+            poi_of[i] = poi_index[poi_type]
+            xs[i] = data.get("x", 0.0)
+            ys[i] = data.get("y", 0.0)
+
+        offsets = np.zeros(len(node_ids) + 1, dtype=np.int32)
+        neighbors = []
+        weights = []
+        distances = []
+        for i, node_id in enumerate(node_ids):
+            for neighbor_id, attrs in nx_graph.adj[node_id].items():
+                neighbors.append(index[neighbor_id])
+                weights.append(attrs.get("weight", 1.0))
+                distances.append(attrs.get("distance", 0.0))
+            offsets[i + 1] = len(neighbors)
+
+        return cls(
+            node_ids,
+            offsets,
+            np.asarray(neighbors, dtype=np.int32),
+            np.asarray(weights, dtype=np.float32),
+            np.asarray(distances, dtype=np.float32),
+            xs, ys, floor_of, floors, scale_factor, poi_of, poi_names
+        )
+
+    def profile(self, name: str) -> "CompiledGraph":
+        """
+        This graph as seen by a routing profile. The view shares every array
+        with the base graph except `weights`, where slots touching a node of
+        an excluded poi_type are inf, so the searches never relax them.
+        Views are built once per profile and cached on the base graph.
+        """
+        base = self._base
+        if name == "default":
+            return base
+        if name not in ROUTING_PROFILES:
+            raise ValueError(f"Unknown routing profile: {name}")
+        view = base._profiles.get(name)
+        if view is None:
+            view = base._masked(base.slot_mask(ROUTING_PROFILES[name]))
+            view.profile_name = name
+            base._profiles[name] = view
+        return view
+
+    def without(self, blocked: np.ndarray) -> "CompiledGraph":
+        """
+        This view with the `blocked` slots (see closure_mask) also set to inf.
+        Returns self when nothing is blocked.
+        """
+        if not blocked.any():
+            return self
+        usable = ~blocked if self.edge_mask is None else self.edge_mask & ~blocked
+        return self._masked(usable)
+
+    def reweighted(self, weights: np.ndarray) -> "CompiledGraph":
+        """
+        This view searched by other per-slot costs (e.g. seconds), keeping
+        its masked slots at inf. The floor heuristic assumes 'weight' is at
+        least the scaled planar distance, so use Dijkstra on the result.
+        """
+        view = copy.copy(self)
+        view._set_weights(np.where(np.isfinite(self.weights), weights, np.float32(INF)).astype(np.float32))
+        return view
+
+    def path_weight(self, path: List[int]) -> float:
+        """Sum of this view's slot weights along a node path (inf if a hop is missing)"""
+        total = 0.0
+        for u, v in zip(path, path[1:]):
+            start, end = self.offsets[u], self.offsets[u + 1]
+            slots = np.flatnonzero(self.neighbors[start:end] == v)
+            if not len(slots):
+                return INF
+            total += float(np.min(self.weights[start + slots]))
+        return total
+
+    def _masked(self, usable: np.ndarray) -> "CompiledGraph":
+        view = copy.copy(self)
+        view.edge_mask = usable
+        view._set_weights(np.where(usable, self._base.weights, np.float32(INF)).astype(np.float32))
+        return view
+
+    def closure_mask(self, closed_nodes: List[str], closed_edges: List[Tuple[str, str]]) -> np.ndarray:
+        """True for every slot touching a closed node or lying on a closed edge"""
+        blocked = np.zeros(len(self.neighbors), dtype=bool)
+        nodes = np.zeros(self.num_nodes, dtype=bool)
+        nodes[[self.index[node_id] for node_id in closed_nodes if node_id in self.index]] = True
+        sources = np.repeat(np.arange(self.num_nodes, dtype=np.int32), np.diff(self.offsets))
+        blocked |= nodes[sources] | nodes[self.neighbors]
+        for node1_id, node2_id in closed_edges:
+            u, v = self.index.get(node1_id), self.index.get(node2_id)
+            if u is None or v is None:
+                continue
+            for a, b in ((u, v), (v, u)):
+                start, end = self.offsets[a], self.offsets[a + 1]
+                blocked[start + np.flatnonzero(self.neighbors[start:end] == b)] = True
+        return blocked
+
+    def slot_mask(self, excluded_poi_types) -> np.ndarray:
+        """True for every adjacency slot whose endpoints avoid excluded_poi_types"""
+        codes = [code for code, name in enumerate(self.poi_names) if name in excluded_poi_types]
+        excluded = np.isin(self.poi_of, codes)
+        sources = np.repeat(np.arange(self.num_nodes, dtype=np.int32), np.diff(self.offsets))
+        return ~(excluded[sources] | excluded[self.neighbors])
+
+    def is_routable(self) -> np.ndarray:
+        """True for nodes with at least one usable slot in this profile"""
+        sources = np.repeat(np.arange(self.num_nodes, dtype=np.int32), np.diff(self.offsets))
+        return np.bincount(sources[np.isfinite(self.weights)], minlength=self.num_nodes) > 0
+
+    def induced(self, nodes: np.ndarray) -> "CompiledGraph":
+        """
+        CSR subgraph over `nodes` (global indices, ascending). Local index i of
+        the result is global node nodes[i]; slots leaving the set are dropped.
+        """
+        local = np.full(self.num_nodes, -1, dtype=np.int32)
+        local[nodes] = np.arange(len(nodes), dtype=np.int32)
+
+        degrees = np.diff(self.offsets)
+        sources = np.repeat(np.arange(self.num_nodes, dtype=np.int32), degrees)
+        keep = (local[sources] >= 0) & (local[self.neighbors] >= 0)
+
+        offsets = np.zeros(len(nodes) + 1, dtype=np.int32)
+        offsets[1:] = np.cumsum(np.bincount(local[sources[keep]], minlength=len(nodes)))
+        return CompiledGraph(
+            [self.node_ids[i] for i in nodes],
+            offsets,
+            local[self.neighbors[keep]],
+            self.weights[keep],
+            self.distances[keep],
+            self.xs[nodes], self.ys[nodes], self.floor_of[nodes], self.floors,
+            self.scale_factor, self.poi_of[nodes], self.poi_names
+        )
+
+    def _index_teleports(self):
+        """
+        Collect the "teleport" slots: edges that change floor, or whose fixed
+        connector weight (elevator/escalator/stairs) is shorter than the planar
+        gap between their endpoints. Every other edge costs at least the scaled
+        Euclidean distance it spans, which is what keeps the A* bound admissible.
+        """
+        degrees = np.diff(self.offsets)
+        sources = np.repeat(np.arange(len(self.node_ids), dtype=np.int32), degrees)
+        planar = self.scale_factor * np.hypot(
+            self.xs[sources] - self.xs[self.neighbors],
+            self.ys[sources] - self.ys[self.neighbors]
+        )
+        teleport = ((self.floor_of[sources] != self.floor_of[self.neighbors]) |
+                    (self.weights < planar * (1 - PLANAR_TOLERANCE))) & np.isfinite(self.weights)
+        self._teleport_heads = self.neighbors[teleport]
+        self._teleport_weights = self.weights[teleport].astype(np.float64)
+
+    def layout_tag(self) -> str:
+        """Short hash of the node order and floor labels; equal tags mean equal node indices"""
+        base = self._base
+        if base._layout_tag is None:
+            digest = hashlib.sha1("\n".join(base.node_ids).encode())
+            digest.update("\n".join(base.floors).encode())
+            base._layout_tag = digest.hexdigest()[:12]
+        return base._layout_tag
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.neighbors) // 2
+
+    def nbytes(self) -> int:
+        return self.offsets.nbytes + self.neighbors.nbytes + self.weights.nbytes + self.distances.nbytes
+
+    def floor_heuristic(self, target: int) -> np.ndarray:
+        """
+        Lower bound on the 'weight' from every node to `target`.
+
+        A path that ends with only planar edges must already be on the target's
+        floor and costs at least the scaled straight-line distance. Any other
+        path crosses a teleport slot (u, v) last, with v on the target floor,
+        so it costs at least weight(u, v) plus the planar distance from v.
+        Connector costs therefore act as the floor-change lower bound, and the
+        bound stays admissible and consistent with the fixed 15/20 weights.
+        """
+        target_floor = self.floor_of[target]
+        planar = self.scale_factor * np.hypot(
+            self.xs.astype(np.float64) - self.xs[target],
+            self.ys.astype(np.float64) - self.ys[target]
+        )
+
+        heads = self._teleport_heads
+        entering = self.floor_of[heads] == target_floor
+        if entering.any():
+            entry = float(np.min(self._teleport_weights[entering] + planar[heads[entering]]))
+        else:
+            entry = INF
+
+        bound = np.where(self.floor_of == target_floor, np.minimum(planar, entry), entry)
+        return bound * (1 - PLANAR_TOLERANCE)
+
+    def _search(self, sources: List[int], target: int = -1, heuristic=None):
+        """
+        Dijkstra on the CSR arrays, ordered by 'weight', or A* when a
+        consistent `heuristic` array (see floor_heuristic) is given. The
+        'distance' totals are accumulated along the same relaxations.
+        Every node in `sources` starts at cost 0 (multi-source search).
+        Stops once `target` is settled; target=-1 settles the whole component.
+        Returns the (dist, walked, pred, settled) arrays.
+        """
+        offsets, neighbors = self._offsets, self._neighbors
+        weights, distances = self._weights, self._distances
+        h = memoryview(heuristic) if heuristic is not None else None
+
+        n = len(self.node_ids)
+        dist = [INF] * n
+        walked = [0.0] * n
+        pred = [-1] * n
+        settled = bytearray(n)
+        heap = []
+        for source in sources:
+            dist[source] = 0.0
+            heap.append((0.0, source))
+
+        while heap:
+            _, u = heapq.heappop(heap)
+            if settled[u]:
+                continue
+            settled[u] = 1
+            if u == target:
+                break
+            d = dist[u]
+            walked_u = walked[u]
+            for slot in range(offsets[u], offsets[u + 1]):
+                v = neighbors[slot]
+                nd = d + weights[slot]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    walked[v] = walked_u + distances[slot]
+                    pred[v] = u
+                    if h is None:
+                        heapq.heappush(heap, (nd, v))
+                    elif h[v] < INF:
+                        heapq.heappush(heap, (nd + h[v], v))
+
+        return dist, walked, pred, settled
+
+    def shortest_path(self, source: int, target: int, heuristic=None) -> Optional[Tuple[List[int], float, float]]:
+        """
+        Single-pair search; see _search.
+        Returns (path, total weight, total distance) or None if unreachable.
+        """
+        dist, walked, pred, settled = self._search([source], target, heuristic)
+        if not settled[target]:
+            return None
+        return self._trace(pred, target), dist[target], walked[target]
+
+    def single_source(self, source: int) -> Tuple[List[float], List[float], List[int]]:
+        """Full shortest-path tree from `source`: (weight, distance, predecessor) per node"""
+        dist, walked, pred, _ = self._search([source])
+        return dist, walked, pred
+
+    def multi_source(self, sources: List[int]) -> Tuple[List[float], List[float], List[int]]:
+        """
+        Shortest-path forest grown from all `sources` at once: each node gets
+        the cost to its nearest source, and pred points one hop towards it.
+        """
+        dist, walked, pred, _ = self._search(sources)
+        return dist, walked, pred
+
+    def within(self, source: int, budget: float, by: str = "distance") -> Dict[int, Tuple[float, float]]:
+        """
+        Every node whose cheapest route from `source` costs at most `budget`,
+        ordered by 'distance' or 'weight' (by=...). Bounded Dijkstra: it
+        stops at the first settled node over budget instead of exploring the
+        whole component. Returns {node: (distance, weight)} along that route.
+        Slots masked by the profile (inf weight) are never used.
+        """
+        offsets, neighbors = self._offsets, self._neighbors
+        weights, distances = self._weights, self._distances
+        by_distance = by == "distance"
+
+        cost = {source: 0.0}
+        other = {source: 0.0}
+        reached = {}
+        heap = [(0.0, source)]
+        while heap:
+            c, u = heapq.heappop(heap)
+            if u in reached:
+                continue
+            if c > budget:
+                break
+            reached[u] = (c, other[u]) if by_distance else (other[u], c)
+            for slot in range(offsets[u], offsets[u + 1]):
+                w = weights[slot]
+                if w == INF:
+                    continue
+                v = neighbors[slot]
+                step, other_step = (distances[slot], w) if by_distance else (w, distances[slot])
+                nc = c + step
+                if nc <= budget and nc < cost.get(v, INF):
+                    cost[v] = nc
+                    other[v] = other[u] + other_step
+                    heapq.heappush(heap, (nc, v))
+        return reached
+
+    def tree_path(self, tree: Tuple[List[float], List[float], List[int]], end_id: str) -> Optional[Dict[str, Any]]:
+        """Read the route to end_id off a single_source tree, same shape as find_shortest_path"""
+        target = self.index.get(end_id)
+        if target is None:
+            return None
+        dist, walked, pred = tree
+        if dist[target] == INF:
+            return None
+        return {
+            "path": [self.node_ids[i] for i in self._trace(pred, target)],
+            "distance": walked[target],
+            "weight": dist[target]
+        }
+
+    @staticmethod
+    def _trace(pred: List[int], target: int) -> List[int]:
+        path = []
+        node = target
+        while node != -1:
+            path.append(node)
+            node = pred[node]
+        path.reverse()
+        return path
+
+    def find_shortest_path(self, start_id: str, end_id: str, method: str = "dijkstra") -> Optional[Dict[str, Any]]:
+        """String-ID wrapper returning the same shape as Graph.find_shortest_path"""
+        source = self.index.get(start_id)
+        target = self.index.get(end_id)
+        if source is None or target is None:
+            return None
+
+        heuristic = self.floor_heuristic(target) if method == "astar" else None
+        result = self.shortest_path(source, target, heuristic)
+        if result is None:
+            return None
+
+        path, weight, distance = result
+        return {
+            "path": [self.node_ids[i] for i in path],
+            "distance": distance,
+            "weight": weight
+        }
@@ -0,0 +1,92 @@
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from .compiled import CompiledGraph
+
+# poi_type query values and the node poi_types that satisfy them
+FACILITY_TYPES = {
+    "bathroom": ("bathroom", "accessibility_bathroom"),
+    "water": ("water",),
+    "elevator": ("elevator",),
+    "stairs": ("stairs",),
+}
+
+
+class FacilityIndex:
+    """
+    Nearest-facility lookup per facility type, built with one multi-source
+    search from every facility of that type. For each node it stores the
+    cost to the nearest facility, which facility that is, and the next hop
+    towards it, so a lookup is O(1) and the path costs O(path length).
+    """
+
+    # per facility type: search cost, walked distance, next hop and nearest facility of every node
+    _FIELDS = ("dist", "walked", "pred", "origin")
+
+    def __init__(self, compiled: CompiledGraph):
+        self.compiled = compiled
+        self._by_type = {}
+        for name, matching in FACILITY_TYPES.items():
+            codes = [code for code, poi_type in enumerate(compiled.poi_names) if poi_type in matching]
+            sources = np.flatnonzero(np.isin(compiled.poi_of, codes)).tolist()
+            if not sources:
+                continue
+            dist, walked, pred = compiled.multi_source(sources)
+            self._by_type[name] = (
+                np.asarray(dist, dtype=np.float64),
+                np.asarray(walked, dtype=np.float64),
+                np.asarray(pred, dtype=np.int32),
+                self._origins(pred, sources)
+            )
+
+    @classmethod
+    def from_arrays(cls, compiled: CompiledGraph, arrays: Dict[str, np.ndarray]) -> "FacilityIndex":
+        """An index built earlier for `compiled` (e.g. mapped from a snapshot), from its arrays()"""
+        index = cls.__new__(cls)
+        index.compiled = compiled
+        index._by_type = {}
+        for name in FACILITY_TYPES:
+            if f"{name}/dist" in arrays:
+                index._by_type[name] = tuple(arrays[f"{name}/{field}"] for field in cls._FIELDS)
+        return index
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Every array of the index, keyed "<facility type>/<field>" """
+        return {f"{name}/{field}": array for name, entry in self._by_type.items()
+                for field, array in zip(self._FIELDS, entry)}
+
+    @staticmethod
+    def _origins(pred: List[int], sources: List[int]) -> np.ndarray:
+        """Facility each node's forest branch grows from (-1 if unreachable)"""
+        origin = np.full(len(pred), -1, dtype=np.int32)
+        origin[sources] = sources
+        for node in range(len(pred)):
+            chain = []
+            current = node
+            while origin[current] == -1 and pred[current] != -1:
+                chain.append(current)
+                current = pred[current]
+            origin[chain] = origin[current]
+        return origin
+
+    def nearest(self, start_id: str, poi_type: str) -> Optional[Dict[str, Any]]:
+        """Closest facility of `poi_type` from start_id, with the path to it"""
+        start = self.compiled.index.get(start_id)
+        if start is None or poi_type not in self._by_type:
+            return None
+
+        dist, walked, pred, origin = self._by_type[poi_type]
+        if origin[start] == -1:
+            return None
+
+        path = [start]
+        while pred[path[-1]] != -1:
+            path.append(int(pred[path[-1]]))
+        node_ids = self.compiled.node_ids
+        return {
+            "facility": node_ids[origin[start]],
+            "path": [node_ids[i] for i in path],
+            "distance": float(walked[start]),
+            "weight": float(dist[start])
+        }
@@ -1,5 +1,5 @@
 import pytest
-from Graph2 import Graph
+from api.app.graph.Graph2 import Graph
 from pathlib import Path
 import os
 
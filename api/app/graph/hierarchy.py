@@ -0,0 +1,160 @@
+import heapq
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from .compiled import CompiledGraph, INF
+
+CONNECTOR_TYPES = ("elevator", "stairs", "escalator")
+
+
+class FloorPortalRouter:
+    """
+    Two-level router over a compiled multi-floor campus graph.
+
+    Lower level: one CSR subgraph per floor, plus the precomputed costs and
+    paths between every pair of portals on that floor. Portals are the
+    vertical connectors (elevator/stairs/escalator nodes) and any node with
+    an edge to another floor.
+
+    Upper level: a small graph over the portals, made of those intra-floor
+    portal-to-portal hops and the cross-floor edges. A query only expands
+    the start and end floors in full; every floor in between is crossed
+    through its precomputed portal hops.
+    """
+
+    def __init__(self, compiled: CompiledGraph):
+        self.compiled = compiled
+        n = compiled.num_nodes
+        floor_of = compiled.floor_of
+
+        self.floor_graphs = {}
+        self._local = np.full(n, -1, dtype=np.int32)
+        for floor in range(len(compiled.floors)):
+            nodes = np.flatnonzero(floor_of == floor).astype(np.int32)
+            if len(nodes):
+                self.floor_graphs[floor] = (compiled.induced(nodes), nodes)
+                self._local[nodes] = np.arange(len(nodes), dtype=np.int32)
+
+        degrees = np.diff(compiled.offsets)
+        sources = np.repeat(np.arange(n, dtype=np.int32), degrees)
+        crossing = (floor_of[sources] != floor_of[compiled.neighbors]) & np.isfinite(compiled.weights)
+
+        is_portal = np.zeros(n, dtype=bool)
+        is_portal[sources[crossing]] = True
+        connector_codes = [code for code, name in enumerate(compiled.poi_names) if name in CONNECTOR_TYPES]
+        is_portal[np.isin(compiled.poi_of, connector_codes)] = True
+        self.portals = np.flatnonzero(is_portal)
+
+        # upper level: portal -> [(portal, weight, distance, path or None)]
+        self._upper = {int(p): [] for p in self.portals}
+        for slot in np.flatnonzero(crossing):
+            self._upper[int(sources[slot])].append(
+                (int(compiled.neighbors[slot]), float(compiled.weights[slot]),
+                 float(compiled.distances[slot]), None)
+            )
+        for floor, (sub, nodes) in self.floor_graphs.items():
+            floor_portals = [int(p) for p in self.portals if floor_of[p] == floor]
+            for p in floor_portals:
+                dist, walked, pred = sub.single_source(int(self._local[p]))
+                for q in floor_portals:
+                    q_local = int(self._local[q])
+                    if q == p or dist[q_local] == INF:
+                        continue
+                    path = [int(nodes[i]) for i in sub._trace(pred, q_local)]
+                    self._upper[p].append((q, dist[q_local], walked[q_local], path))
+
+    def num_upper_edges(self) -> int:
+        return sum(len(hops) for hops in self._upper.values())
+
+    def find_shortest_path(self, start_id: str, end_id: str) -> Optional[Dict[str, Any]]:
+        """Same shape as Graph.find_shortest_path"""
+        index = self.compiled.index
+        if start_id not in index or end_id not in index:
+            return None
+        source, target = index[start_id], index[end_id]
+        floor_of = self.compiled.floor_of
+        start_floor, end_floor = int(floor_of[source]), int(floor_of[target])
+
+        start_sub, start_nodes = self.floor_graphs[start_floor]
+        end_sub, end_nodes = self.floor_graphs[end_floor]
+        out_dist, out_walked, out_pred = start_sub.single_source(int(self._local[source]))
+        in_dist, in_walked, in_pred = end_sub.single_source(int(self._local[target]))
+
+        best, best_walked, best_portal = INF, 0.0, None
+        if start_floor == end_floor:
+            best = out_dist[self._local[target]]
+            best_walked = out_walked[self._local[target]]
+
+        # upper-level Dijkstra, seeded with the start floor's portals
+        dist, walked, pred = {}, {}, {}
+        heap = []
+        for p in self._upper:
+            if floor_of[p] == start_floor and out_dist[self._local[p]] < INF:
+                dist[p] = out_dist[self._local[p]]
+                walked[p] = out_walked[self._local[p]]
+                pred[p] = (None, None)
+                heap.append((dist[p], p))
+        heapq.heapify(heap)
+
+        settled = set()
+        while heap:
+            d, p = heapq.heappop(heap)
+            if d >= best:
+                break
+            if p in settled:
+                continue
+            settled.add(p)
+            if floor_of[p] == end_floor and in_dist[self._local[p]] < INF:
+                candidate = d + in_dist[self._local[p]]
+                if candidate < best:
+                    best = candidate
+                    best_walked = walked[p] + in_walked[self._local[p]]
+                    best_portal = p
+            for q, weight, distance, path in self._upper[p]:
+                nd = d + weight
+                if nd < dist.get(q, INF):
+                    dist[q] = nd
+                    walked[q] = walked[p] + distance
+                    pred[q] = (p, path)
+                    heapq.heappush(heap, (nd, q))
+
+        if best == INF:
+            return None
+        return {
+            "path": [self.compiled.node_ids[i] for i in
+                     self._assemble(source, target, best_portal, pred, out_pred, in_pred)],
+            "distance": best_walked,
+            "weight": best
+        }
+
+    def _assemble(self, source: int, target: int, last_portal: Optional[int], pred: dict,
+                  out_pred: List[int], in_pred: List[int]) -> List[int]:
+        """Stitch start-floor segment, portal hops and end-floor segment"""
+        floor_of = self.compiled.floor_of
+        start_sub, start_nodes = self.floor_graphs[int(floor_of[source])]
+        _, end_nodes = self.floor_graphs[int(floor_of[target])]
+
+        if last_portal is None:
+            local_path = start_sub._trace(out_pred, int(self._local[target]))
+            return [int(start_nodes[i]) for i in local_path]
+
+        hops = []
+        portal = last_portal
+        while True:
+            previous, path = pred[portal]
+            if previous is None:
+                break
+            hops.append(path if path is not None else [previous, portal])
+            portal = previous
+        hops.reverse()
+
+        route = [int(start_nodes[i]) for i in start_sub._trace(out_pred, int(self._local[portal]))]
+        for hop in hops:
+            route.extend(hop[1:])
+
+        node = int(in_pred[self._local[last_portal]])
+        while node != -1:
+            route.append(int(end_nodes[node]))
+            node = in_pred[node]
+        return route
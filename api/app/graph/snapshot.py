@@ -0,0 +1,135 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: concurrent builders just race harmlessly
+    fcntl = None
+
+logger = logging.getLogger("navigation")
+
+# bump when the array layout below changes so old snapshots are ignored
+SNAPSHOT_FORMAT = 4
+SNAPSHOT_SUFFIX = ".snapshot.graph"
+
+# File layout: MAGIC, little-endian u64 header length, a JSON header
+# {"key", "arrays": {name: {"dtype", "shape", "offset"}}}, then every array's
+# raw bytes at an ALIGNMENT-aligned offset. Arrays are read back as views of
+# one read-only memory map, so processes attaching to the same file share its
+# pages through the OS page cache instead of each holding a copy.
+MAGIC = b"FMCGRAPH"
+ALIGNMENT = 64
+
+
+def snapshot_path(folder_path: str, directory: Optional[str] = None) -> str:
+    """
+    Snapshot file for a campus folder: <directory>/hall.snapshot.graph, or
+    next to the folder without a directory.
+    """
+    folder_path = os.path.normpath(str(folder_path))
+    if directory is None:
+        return folder_path + SNAPSHOT_SUFFIX
+    return os.path.join(str(directory), os.path.basename(folder_path) + SNAPSHOT_SUFFIX)
+
+
+def source_key(json_files: List[str], scale_factor: float, extra: str = "") -> str:
+    """Hash of every source file's path, mtime and size, plus the load settings"""
+    digest = hashlib.sha1(f"{SNAPSHOT_FORMAT}:{scale_factor}:{extra}".encode())
+    for file_path in sorted(json_files):
+        stat = os.stat(file_path)
+        digest.update(f"{os.path.basename(file_path)}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+    return digest.hexdigest()
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save_snapshot(path: str, key: str, arrays: Dict[str, np.ndarray]):
+    """
+    Publish atomically: the file is written aside and renamed over `path`,
+    so readers attach to either the old or the new version, and mappings
+    of the old one stay valid. A read-only data directory only costs the cache.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _aligned(offset)
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+    header = json.dumps({"key": key, "arrays": layout}).encode()
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    directory = os.path.dirname(path) or "."
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name]["offset"])
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not write graph snapshot {path}: {e}")
+
+
+def load_snapshot(path: str, key: str) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Read-only arrays mapped from the snapshot (no copy), or None if it is
+    missing, stale or unreadable.
+    """
+    try:
+        mapped = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(mapped[:len(MAGIC)]) != MAGIC:
+            raise ValueError("not a graph snapshot")
+        (header_length,) = struct.unpack("<Q", bytes(mapped[len(MAGIC):len(MAGIC) + 8]))
+        header_end = len(MAGIC) + 8 + header_length
+        header = json.loads(bytes(mapped[len(MAGIC) + 8:header_end]))
+        if header["key"] != key:
+            return None
+        data_start = _aligned(header_end)
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            start = data_start + spec["offset"]
+            count = int(np.prod(spec["shape"], dtype=np.int64))
+            arrays[name] = mapped[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+        return arrays
+    except (OSError, KeyError, ValueError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.warning(f"Ignoring unreadable graph snapshot {path}: {e}")
+        return None
+
+
+@contextlib.contextmanager
+def publish_lock(path: str) -> Iterator[None]:
+    """
+    Exclusive lock across processes (e.g. pre-forked workers) held while a
+    snapshot is rebuilt, so one worker builds it and the others attach.
+    """
+    if fcntl is None:
+        yield
+        return
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        f = open(path + ".lock", "a")
+    except OSError:
+        yield
+        return
+    with f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,107 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .compiled import CompiledGraph
+
+# points per KD-tree leaf; leaves are scanned with one vectorized distance
+LEAF_SIZE = 16
+
+
+class KDTree:
+    """
+    Static 2-D KD-tree over a point array. Points are permuted so every leaf
+    is a contiguous slice, and internal nodes live in flat lists.
+    """
+
+    def __init__(self, points: np.ndarray):
+        self.order = np.arange(len(points))
+        self.points = np.asarray(points, dtype=np.float64)
+        self._axis = []
+        self._split = []
+        self._children = []
+        self._bounds = []
+        if len(points):
+            self._build(0, len(points))
+
+    def _build(self, start: int, end: int) -> int:
+        node = len(self._axis)
+        self._axis.append(-1)
+        self._split.append(0.0)
+        self._children.append((-1, -1))
+        self._bounds.append((start, end))
+        if end - start <= LEAF_SIZE:
+            return node
+
+        chunk = self.points[self.order[start:end]]
+        axis = int(np.argmax(chunk.max(axis=0) - chunk.min(axis=0)))
+        middle = (end - start) // 2
+        ranked = np.argpartition(chunk[:, axis], middle)
+        self.order[start:end] = self.order[start:end][ranked]
+
+        self._axis[node] = axis
+        self._split[node] = float(self.points[self.order[start + middle], axis])
+        left = self._build(start, start + middle)
+        right = self._build(start + middle, end)
+        self._children[node] = (left, right)
+        return node
+
+    def nearest(self, x: float, y: float) -> Tuple[int, float]:
+        """(index into the original points, euclidean distance)"""
+        if not self._axis:
+            return -1, float("inf")
+        query = np.array([x, y])
+        best, best_sq = -1, float("inf")
+        # (node, squared distance from the query to that node's half-plane)
+        stack = [(0, 0.0)]
+        while stack:
+            node, bound_sq = stack.pop()
+            if bound_sq >= best_sq:
+                continue
+            axis = self._axis[node]
+            if axis == -1:
+                start, end = self._bounds[node]
+                candidates = self.order[start:end]
+                squared = np.sum((self.points[candidates] - query) ** 2, axis=1)
+                i = int(np.argmin(squared))
+                if squared[i] < best_sq:
+                    best, best_sq = int(candidates[i]), float(squared[i])
+                continue
+
+            gap = query[axis] - self._split[node]
+            left, right = self._children[node]
+            near, far = (left, right) if gap < 0 else (right, left)
+            # the far side is pushed first so the near side is searched first
+            stack.append((far, max(bound_sq, gap * gap)))
+            stack.append((near, bound_sq))
+        return best, best_sq ** 0.5
+
+
+class FloorSpatialIndex:
+    """One KD-tree per floor over the nodes routable in the graph's profile"""
+
+    def __init__(self, compiled: CompiledGraph):
+        self.compiled = compiled
+        routable = compiled.is_routable()
+        self._trees: Dict[str, Tuple[KDTree, np.ndarray]] = {}
+        for floor_index, floor in enumerate(compiled.floors):
+            nodes = np.flatnonzero(routable & (compiled.floor_of == floor_index))
+            if len(nodes):
+                points = np.column_stack([compiled.xs[nodes], compiled.ys[nodes]])
+                self._trees[floor] = (KDTree(points), nodes)
+
+    @property
+    def floors(self) -> List[str]:
+        return list(self._trees)
+
+    def snap(self, x: float, y: float, floor: str) -> Optional[Dict[str, object]]:
+        """Nearest routable node to (x, y) on `floor`, in map units"""
+        entry = self._trees.get(str(floor))
+        if entry is None:
+            return None
+        tree, nodes = entry
+        i, gap = tree.nearest(x, y)
+        return {
+            "id": self.compiled.node_ids[nodes[i]],
+            "offset": gap * self.compiled.scale_factor
+        }
@@ -0,0 +1,112 @@
+import copy
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .buildings import building_of
+from .compiled import CompiledGraph
+
+# Seconds-based cost model. Walking speed is per routing profile. Stairs,
+# escalator and elevator rides cost a fixed time per floor travelled.
+# Boarding an elevator (stepping onto it from a non-elevator node) adds the
+# expected wait, given per building as [start_hour, end_hour, seconds] bands.
+DEFAULT_TIME_MODEL = {
+    "walking_speed": {
+        "default": 1.4,
+        "no_stairs": 1.4,
+        "no_escalator": 1.4,
+        "elevator_only": 1.1,
+    },
+    "seconds_per_floor": {
+        "stairs": 20.0,
+        "escalator": 15.0,
+        "elevator": 4.0,
+    },
+    "elevator_wait": {
+        "default": [[0, 24, 30.0]],
+        "hall": [[0, 8, 20.0], [8, 18, 60.0], [18, 24, 30.0]],
+        "mb": [[0, 8, 20.0], [8, 18, 45.0], [18, 24, 25.0]],
+    },
+}
+
+
+def floor_level(label: str) -> int:
+    """Numeric level of a floor label: "8" -> 8, "S2" -> -2 (sub-basement); unknown -> 0"""
+    label = str(label).strip().upper()
+    if label.lstrip("-").isdigit():
+        return int(label)
+    if label[:1] == "S" and label[1:].isdigit():
+        return -int(label[1:])
+    return 0
+
+
+class TimeModel:
+    """
+    Walking-time model (see DEFAULT_TIME_MODEL). Keys missing from `config`
+    fall back to the defaults, so a config only needs what it overrides.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = copy.deepcopy(DEFAULT_TIME_MODEL)
+        for key, value in (config or {}).items():
+            if isinstance(value, dict):
+                self.config.setdefault(key, {}).update(value)
+            else:
+                self.config[key] = value
+
+    @classmethod
+    def from_file(cls, path: str) -> "TimeModel":
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def walking_speed(self, profile: str = "default") -> float:
+        speeds = self.config["walking_speed"]
+        return float(speeds.get(profile, speeds["default"]))
+
+    def elevator_wait(self, building: Optional[str], hour: int) -> float:
+        for start, end, seconds in self._bands(building):
+            if start <= hour < end:
+                return float(seconds)
+        return 0.0
+
+    def band(self, hour: int) -> Tuple[float, ...]:
+        """Elevator waits of every configured building at `hour`; hours with equal bands share time arrays"""
+        return tuple(self.elevator_wait(building, hour) for building in sorted(self.config["elevator_wait"]))
+
+    def _bands(self, building: Optional[str]) -> List[List[float]]:
+        waits = self.config["elevator_wait"]
+        return waits.get(building, waits["default"])
+
+    def edge_seconds(self, compiled: CompiledGraph, profile: str, hour: int) -> np.ndarray:
+        """
+        Seconds to traverse every adjacency slot of `compiled` (float32, CSR
+        order): connector-to-connector slots of one type cost that type's
+        per-floor time, boarding an elevator adds the building's wait at
+        `hour`, and every other slot is its distance at the profile's speed.
+        """
+        sources = np.repeat(np.arange(compiled.num_nodes, dtype=np.int32), np.diff(compiled.offsets))
+        targets = compiled.neighbors
+        seconds = compiled.distances.astype(np.float64) / self.walking_speed(profile)
+
+        levels = np.array([floor_level(label) for label in compiled.floors])[compiled.floor_of]
+        floors_travelled = np.maximum(1, np.abs(levels[sources] - levels[targets]))
+        codes = {name: code for code, name in enumerate(compiled.poi_names)}
+        for connector, per_floor in self.config["seconds_per_floor"].items():
+            code = codes.get(connector)
+            if code is None:
+                continue
+            ride = (compiled.poi_of[sources] == code) & (compiled.poi_of[targets] == code)
+            seconds[ride] = floors_travelled[ride] * float(per_floor)
+
+        code = codes.get("elevator")
+        if code is not None:
+            boarding = np.flatnonzero((compiled.poi_of[sources] != code) & (compiled.poi_of[targets] == code))
+            if len(boarding):
+                wait = {}
+                for slot in boarding:
+                    building = building_of(compiled.node_ids[targets[slot]])
+                    if building not in wait:
+                        wait[building] = self.elevator_wait(building, hour)
+                    seconds[slot] += wait[building]
+        return seconds.astype(np.float32)
@@ -0,0 +1,95 @@
+from typing import List, Tuple
+
+import numpy as np
+
+# Held-Karp is O(2^k * k^2); above this many stops fall back to the heuristic
+EXACT_LIMIT = 10
+
+
+def path_cost(matrix: np.ndarray, order: List[int]) -> float:
+    """Cost of visiting `order` (indices into matrix, 0 = start) from the start"""
+    stops = [0] + list(order)
+    return float(sum(matrix[a, b] for a, b in zip(stops, stops[1:])))
+
+
+def held_karp(matrix: np.ndarray) -> Tuple[List[int], float]:
+    """
+    Exact open-path visiting order. Row/column 0 of `matrix` is the start,
+    1..k are the stops; returns (order of stop indices, cost).
+    """
+    k = len(matrix) - 1
+    if k == 0:
+        return [], 0.0
+
+    stops = matrix[1:, 1:]
+    full = (1 << k) - 1
+    dp = np.full((1 << k, k), np.inf)
+    parent = np.full((1 << k, k), -1, dtype=np.int32)
+    for i in range(k):
+        dp[1 << i, i] = matrix[0, i + 1]
+
+    bits = 1 << np.arange(k)
+    for mask in range(1, full + 1):
+        row = dp[mask]
+        if not np.isfinite(row).any():
+            continue
+        # candidates[j, m]: finish at j inside mask, then step to m
+        candidates = row[:, None] + stops
+        best_last = np.argmin(candidates, axis=0)
+        best_cost = candidates[best_last, np.arange(k)]
+        for m in np.flatnonzero((mask & bits) == 0):
+            nxt = mask | (1 << m)
+            if best_cost[m] < dp[nxt, m]:
+                dp[nxt, m] = best_cost[m]
+                parent[nxt, m] = best_last[m]
+
+    last = int(np.argmin(dp[full]))
+    cost = float(dp[full, last])
+    order = []
+    mask = full
+    while last != -1:
+        order.append(last + 1)
+        previous = int(parent[mask, last])
+        mask ^= 1 << last
+        last = previous
+    order.reverse()
+    return order, cost
+
+
+def nearest_neighbour_two_opt(matrix: np.ndarray) -> Tuple[List[int], float]:
+    """Greedy nearest-neighbour order from the start, improved by 2-opt moves"""
+    k = len(matrix) - 1
+    remaining = set(range(1, k + 1))
+    order = []
+    current = 0
+    while remaining:
+        current = min(remaining, key=lambda stop: matrix[current, stop])
+        order.append(current)
+        remaining.remove(current)
+
+    best = path_cost(matrix, order)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(k - 1):
+            for j in range(i + 1, k):
+                candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                cost = path_cost(matrix, candidate)
+                if cost < best - 1e-9:
+                    order, best = candidate, cost
+                    improved = True
+    return order, best
+
+
+def solve_visit_order(matrix: np.ndarray) -> Tuple[List[int], float]:
+    """Best visiting order for the stops in `matrix`; never worse than 1..k"""
+    k = len(matrix) - 1
+    if k <= EXACT_LIMIT:
+        return held_karp(matrix)
+
+    order, cost = nearest_neighbour_two_opt(matrix)
+    given = list(range(1, k + 1))
+    given_cost = path_cost(matrix, given)
+    if given_cost <= cost:
+        return given, given_cost
+    return order, cost
@@ -0,0 +1,326 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from .graph.Graph2 import Graph
+from .graph.compiled import ROUTING_PROFILES
+from .graph.snapshot import publish_lock
+
+logger = logging.getLogger("navigation")
+
+# shared closure list per campus, stored in the closures folder: <closures>/hall.closures.json
+CLOSURES_SUFFIX = ".closures.json"
+
+
+def campus_base_path() -> Path:
+    """The campus_jsons folder, from either the repo root or the api directory"""
+    current_directory = Path(os.getcwd())
+
+    #    If we're not in the 'api' directory, prepend it to the path
+    if 'api' not in current_directory.parts:
+        current_directory = current_directory / 'api'
+
+    return current_directory / 'app/data/campus_jsons'
+
+
+def campus_state_path(base_path: Path, env: str, kind: str) -> Path:
+    """
+    Folder for files written about the campuses under base_path (closures,
+    snapshots): $<env> if set, otherwise one folder per data folder in the
+    system temp directory, so nothing is written into the source tree.
+    """
+    configured = os.getenv(env)
+    if configured:
+        return Path(configured)
+    return _state_root(str(base_path)) / kind
+
+
+@functools.lru_cache(maxsize=None)
+def _state_root(base_path: str) -> Path:
+    digest = hashlib.sha1(str(Path(base_path).resolve()).encode()).hexdigest()[:12]
+    return Path(tempfile.gettempdir()) / f"findmyclass-{digest}"
+
+
+def build_campus_graph(folder: Path, previous: Optional[Graph] = None, snapshot_dir: Optional[Path] = None) -> Graph:
+    """
+    Load a campus graph with its default tables; closures carry over from
+    `previous`. The compiled arrays and every routing profile's facility
+    index, plus its all-pairs tables when the campus is small enough for
+    them (Graph.tables_fit), come from the campus snapshot in snapshot_dir,
+    mapped read-only and shared with every other worker process on the
+    host; the first process to find the snapshot stale rebuilds and
+    publishes it. Time views and spatial indexes are cheap per-edge or
+    per-node arrays, built per process.
+    """
+    graph = Graph()
+    graph.load_from_json_folder(folder, snapshot=True, tables=tuple(ROUTING_PROFILES),
+                                snapshot_dir=str(snapshot_dir) if snapshot_dir is not None else None)
+    if previous is not None:
+        for node_id in previous.closed_nodes:
+            if node_id in graph.graph_var:
+                graph.close_node(node_id)
+        for node1_id, node2_id in previous.closed_edges:
+            if graph.graph_var.has_edge(node1_id, node2_id):
+                graph.close_edge(node1_id, node2_id)
+    prepare_profile(graph)
+    graph.freeze()
+    return graph
+
+
+def prepare_profile(graph: Graph, profile: str = "default"):
+    """
+    Precompute a profile's tables (all-pairs only if the campus is small
+    enough); the spatial index goes last as it marks the profile ready
+    """
+    if profile not in graph.all_pairs and graph.tables_fit():
+        graph.precompute_all_pairs(profile)
+    graph.build_facility_index(profile)
+    graph.time_graph(profile)
+    graph.build_spatial_index(profile)
+
+
+class GraphRegistry:
+    """
+    The process-wide campus -> Graph map, shared by the navigation and chat
+    blueprints so each campus is loaded once per worker.
+
+    Graphs load on first use and are frozen: their nodes and edges never
+    change, and a reload builds a new graph and swaps it in whole. A request
+    holding a graph keeps using it while a newer one is swapped in.
+    Listeners registered with on_swap() hear about every graph put in
+    place, e.g. to drop route caches of older versions.
+
+    Closures are shared by every worker process through a closures file
+    per campus in closures_dir (see set_closure): each get() picks up changes made by other
+    workers, and listeners registered with on_closure() hear about every
+    element closed or reopened, e.g. to drop the cached routes it affects.
+    """
+
+    def __init__(self, base_path: Optional[Path] = None, closures_dir: Optional[Path] = None,
+                 snapshot_dir: Optional[Path] = None):
+        self._base_path = base_path
+        self._closures_dir = closures_dir
+        self._snapshot_dir = snapshot_dir
+        self._graphs: Dict[str, Graph] = {}
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[str, Graph], None]] = []
+        self._closure_listeners: List[Callable[[str, Any, bool], int]] = []
+        # campus -> (mtime_ns, size) of the closures file last applied
+        self._closure_stamps: Dict[str, Optional[tuple]] = {}
+        # (base path, campus folder names) as last listed
+        self._campus_listing: Optional[Tuple[Path, FrozenSet[str]]] = None
+
+    @property
+    def base_path(self) -> Path:
+        return self._base_path if self._base_path is not None else campus_base_path()
+
+    @property
+    def closures_dir(self) -> Path:
+        """Where the closures files go: the constructor's closures_dir, else $CAMPUS_CLOSURES_DIR or a temp folder"""
+        if self._closures_dir is not None:
+            return Path(self._closures_dir)
+        return campus_state_path(self.base_path, "CAMPUS_CLOSURES_DIR", "closures")
+
+    @property
+    def snapshot_dir(self) -> Path:
+        """Where the graph snapshots go: the constructor's snapshot_dir, else $CAMPUS_SNAPSHOT_DIR or a temp folder"""
+        if self._snapshot_dir is not None:
+            return Path(self._snapshot_dir)
+        return campus_state_path(self.base_path, "CAMPUS_SNAPSHOT_DIR", "snapshots")
+
+    def campus_folder(self, campus: str) -> Path:
+        """Folder of a known campus; ValueError for anything else (e.g. "", "..", an absolute path)"""
+        if not self.has_campus(campus):
+            raise ValueError(f"Unknown campus: {campus!r}")
+        return self.base_path / campus
+
+    def campuses(self) -> List[str]:
+        """Every campus folder under the base path"""
+        return sorted(self._campus_names())
+
+    def has_campus(self, campus: Any) -> bool:
+        """True for the name of a campus folder, checked before any path is built from it"""
+        return isinstance(campus, str) and campus in self._campus_names()
+
+    def refresh_campuses(self):
+        """Forget the listed campus folders; the next check lists the base path again"""
+        self._campus_listing = None
+
+    def _campus_names(self) -> FrozenSet[str]:
+        # listed once per base path, not per request; reload() lists again
+        base_path = self.base_path
+        listing = self._campus_listing
+        if listing is None or listing[0] != base_path:
+            listing = (base_path, frozenset(entry.name for entry in base_path.iterdir() if entry.is_dir()))
+            self._campus_listing = listing
+        return listing[1]
+
+    def get(self, campus: str, profile: str = "default") -> Optional[Graph]:
+        """
+        The campus graph with its tables precomputed for `profile`, loaded
+        on first use; None for an unknown campus.
+        """
+        graph = self._graphs.get(campus)
+        if graph is None:
+            if not self.has_campus(campus):
+                return None
+            folder = self.campus_folder(campus)
+            with self._lock:
+                graph = self._graphs.get(campus)
+                if graph is None:
+                    logger.info(f"Loading campus graph: {campus}")
+                    graph = build_campus_graph(folder, snapshot_dir=self.snapshot_dir)
+                    self._graphs[campus] = graph
+                    self._notify(campus, graph)
+
+        self._sync_closures(campus, graph)
+        if profile not in graph.spatial_indexes:
+            with self._lock:
+                if profile not in graph.spatial_indexes:
+                    prepare_profile(graph, profile)
+        return graph
+
+    def peek(self, campus: str) -> Optional[Graph]:
+        """The campus graph if it is loaded, without loading it"""
+        return self._graphs.get(campus)
+
+    def __contains__(self, campus: str) -> bool:
+        return campus in self._graphs
+
+    def reload(self, campus: str) -> Optional[Graph]:
+        """
+        Rebuild a loaded campus from its files, keeping its closures, and
+        swap it in. None if the campus was never loaded: its first request
+        reads the current files anyway. The campus folders are listed again,
+        so a campus added since the last listing is found.
+        """
+        self.refresh_campuses()
+        previous = self._graphs.get(campus)
+        if previous is None or not self.has_campus(campus):
+            return None
+        graph = build_campus_graph(self.campus_folder(campus), previous, self.snapshot_dir)
+        self.swap(campus, graph)
+        return graph
+
+    def swap(self, campus: str, graph: Graph):
+        """Put `graph` in place for `campus` (frozen first)"""
+        graph.freeze()
+        with self._lock:
+            self._graphs[campus] = graph
+            self._notify(campus, graph)
+
+    def on_swap(self, listener: Callable[[str, Graph], None]):
+        self._listeners.append(listener)
+
+    def _notify(self, campus: str, graph: Graph):
+        for listener in self._listeners:
+            listener(campus, graph)
+
+    def closures_path(self, campus: str) -> Path:
+        if not self.has_campus(campus):
+            raise ValueError(f"Unknown campus: {campus!r}")
+        return self.closures_dir / f"{campus}{CLOSURES_SUFFIX}"
+
+    def on_closure(self, listener: Callable[[str, Any, bool], int]):
+        """listener(campus, node id or edge key, closed) -> number of cached entries it dropped"""
+        self._closure_listeners.append(listener)
+
+    def set_closure(self, campus: str, element: Any, closed: bool) -> Tuple[bool, int]:
+        """
+        Close or reopen a node id or edge key on a campus for every worker:
+        applied here, then published in the campus closures file, which the
+        other workers apply on their next request. Raises ValueError for an
+        unknown campus or element. Returns (changed, cached entries dropped here).
+        """
+        graph = self.get(campus)
+        if graph is None:
+            raise ValueError(f"Unknown campus: {campus!r}")
+        path = self.closures_path(campus)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with publish_lock(str(path)):
+            # start from the other workers' latest changes
+            self._sync_closures(campus, graph)
+            if not _set_closed(graph, element, closed):
+                return False, 0
+            self._write_closures(path, graph)
+            self._closure_stamps[campus] = _stamp(path)
+        return True, self._notify_closure(campus, element, closed)
+
+    def _sync_closures(self, campus: str, graph: Graph):
+        """Apply the campus closures file if another worker changed it since it was last applied"""
+        path = self.closures_path(campus)
+        stamp = _stamp(path)
+        if self._closure_stamps.get(campus) == stamp:
+            return
+        with self._lock:
+            if self._closure_stamps.get(campus) == stamp:
+                return
+            try:
+                shared = {}
+                if stamp is not None:
+                    with open(path) as f:
+                        shared = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable closures file {path}: {e}")
+                self._closure_stamps[campus] = stamp
+                return
+            nodes = set(shared.get("nodes", []))
+            edges = {Graph.edge_key(*edge) for edge in shared.get("edges", []) if len(edge) == 2}
+            changes = [(element, False) for element in (graph.closed_nodes - nodes) | (graph.closed_edges - edges)]
+            changes += [(element, True) for element in (nodes - graph.closed_nodes) | (edges - graph.closed_edges)]
+            for element, closed in changes:
+                try:
+                    changed = _set_closed(graph, element, closed)
+                except ValueError:
+                    # e.g. a node removed from the maps since it was closed
+                    continue
+                if changed:
+                    self._notify_closure(campus, element, closed)
+            self._closure_stamps[campus] = stamp
+
+    def _notify_closure(self, campus: str, element: Any, closed: bool) -> int:
+        return sum(listener(campus, element, closed) for listener in self._closure_listeners)
+
+    @staticmethod
+    def _write_closures(path: Path, graph: Graph):
+        """Write the closure list aside and rename it over `path`, so readers never see half of it"""
+        content = {"nodes": sorted(graph.closed_nodes), "edges": [list(edge) for edge in sorted(graph.closed_edges)]}
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(content, f)
+        os.replace(tmp_path, path)
+
+    def memory_footprint(self) -> Dict[str, object]:
+        """Per loaded campus: version, node/edge counts, private and mapped array bytes, plus the totals"""
+        campuses = {}
+        for campus, graph in sorted(self._graphs.items()):
+            campuses[campus] = {"version": graph.version, **graph.memory_footprint()}
+        return {
+            "campuses": campuses,
+            "total_array_bytes": sum(entry["array_bytes"] for entry in campuses.values()),
+            "total_mapped_bytes": sum(entry["mapped_bytes"] for entry in campuses.values())
+        }
+
+
+def _set_closed(graph: Graph, element: Any, closed: bool) -> bool:
+    if isinstance(element, tuple):
+        return graph.close_edge(*element) if closed else graph.reopen_edge(*element)
+    return graph.close_node(element) if closed else graph.reopen_node(element)
+
+
+def _stamp(path: Path) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+# shared by every blueprint and the chat path
+registry = GraphRegistry()
@@ -0,0 +1,185 @@
+"""
+Request and stage metrics, served at /metrics in the Prometheus text
+format (version 0.0.4).
+
+Every request is counted and timed per endpoint and status (see
+instrument_app), and the chat and navigation handlers time their stages
+with `with stage(endpoint, "graph_search"):` blocks, giving a latency
+breakdown per stage. Route caches registered with track_cache() report
+their hits, misses, hit ratio and size at scrape time.
+
+Metrics are kept per process: with several workers, scrape each one.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from .route_cache import RouteCache
+
+# seconds; stage timings go from sub-millisecond (intent detection) to an LLM call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+
+class Histogram:
+    """Observations counted into cumulative buckets per label set, with their sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> [per-bucket counts (not cumulative), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(tuple(str(labels[name]) for name in self.labelnames))
+        return entry[2] if entry else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+REQUESTS = Counter("fmc_requests_total", "HTTP requests handled", ("endpoint", "method", "status"))
+REQUEST_SECONDS = Histogram("fmc_request_duration_seconds", "HTTP request latency", ("endpoint", "method"))
+STAGE_SECONDS = Histogram("fmc_stage_duration_seconds", "Time spent in one stage of a request", ("endpoint", "stage"))
+STAGE_ERRORS = Counter("fmc_stage_errors_total", "Stages that raised", ("endpoint", "stage"))
+
+METRICS = [REQUESTS, REQUEST_SECONDS, STAGE_SECONDS, STAGE_ERRORS]
+
+# name -> route cache reported at scrape time
+_caches: Dict[str, RouteCache] = {}
+
+
+@contextmanager
+def stage(endpoint: str, name: str) -> Iterator[None]:
+    """Time the enclosed block as stage `name` of `endpoint`; counts it as an error if it raises"""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(endpoint=endpoint, stage=name)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, stage=name)
+
+
+def track_cache(name: str, cache: RouteCache):
+    """Report `cache`'s hits, misses, hit ratio and size under cache="name" """
+    _caches[name] = cache
+
+
+def _cache_samples() -> List[str]:
+    stats = {name: cache.stats() for name, cache in sorted(_caches.items())}
+    families = [
+        ("fmc_cache_hits_total", "counter", "Route cache lookups that hit", "hits"),
+        ("fmc_cache_misses_total", "counter", "Route cache lookups that missed", "misses"),
+        ("fmc_cache_hit_ratio", "gauge", "Route cache hits over lookups since start", "hit_rate"),
+        ("fmc_cache_entries", "gauge", "Entries held by a route cache", "size"),
+    ]
+    lines = []
+    for metric, kind, documentation, field in families:
+        lines.append(f"# HELP {metric} {documentation}")
+        lines.append(f"# TYPE {metric} {kind}")
+        lines.extend(f'{metric}{{cache="{_escape(name)}"}} {_number(entry[field])}' for name, entry in stats.items())
+    return lines
+
+
+def render() -> str:
+    """Every metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    lines.extend(_cache_samples())
+    return "\n".join(lines) + "\n"
+
+
+def instrument_app(app):
+    """Count and time every request of a Flask app per endpoint, method and status"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            endpoint = request.endpoint or "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method)
+            REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        return response
@@ -1,12 +1,25 @@
+import hmac
 import os
-from flask import Blueprint, request, jsonify
+import re
+import logging
+import threading
+import time
+from datetime import datetime
+from flask import Blueprint, request, jsonify, current_app
 from flask_cors import CORS, cross_origin
 from .graph.Graph2 import Graph
-from pathlib import Path
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from .chat import handle_task_query, is_task_query, extract_rooms, interpret_path
 from .aiapi import AINavigationAPI
+from .route_cache import RouteCache, route_tags
+from .graph.facilities import FACILITY_TYPES
+from .graph.compiled import ROUTING_PROFILES
+from .graph.buildings import BuildingNetwork, building_of, load_connectors
+from .graph.compact import compact_cross_building, compact_payload
+from .graph_registry import registry
+from . import metrics
+from .metrics import stage
 
 # import app.graph.Graph as Graph
 # from collections import defaultdict
@@ -15,8 +28,22 @@ navigation_routes = Blueprint('navigation', __name__)
 CORS(navigation_routes)  # Enable CORS for all routes in this blueprint
 ai_nav = AINavigationAPI()
 
-g = {}
-accessibility_graph = {}
+logger = logging.getLogger("navigation")
+
+# cross-building router over the registry's graphs, created on first use
+building_network = None
+# campus -> {"ready", "load_seconds" | "error"}, filled by warm_up and reported by /ready
+warmup_status = {}
+
+# Serialized /indoorNavigation responses keyed by
+# (campus, start, end, profile, compact, rank, elevator wait band, graph_version)
+route_cache = RouteCache(maxsize=2048, ttl=600)
+registry.on_swap(lambda campus, graph: route_cache.invalidate_campus(campus, keep_version=graph.version))
+metrics.track_cache("indoor_navigation", route_cache)
+
+INDOOR_NAVIGATION = "navigation.indoor_navigation"
+TASK_CHAT = "navigation.process_task_chat"
+NAVIGATION_CHAT = "navigation.process_navigation_chat"
 
 def validate_query(data):
     """
@@ -45,161 +72,517 @@ def indoor_navigation():
     start_id = request.args.get('startId')
     end_id = request.args.get('endId')
     destinations = request.args.getlist('destinations[]')
-    campus = request.args.get('campus')
-    accessibility = request.args.get('accessibility')
-    current_directory = Path(os.getcwd())
-
-    #    If we're not in the 'api' directory, prepend it to the path
-    if 'api' not in current_directory.parts:
-        current_directory = current_directory / 'api'
-
-    file_path = current_directory / f'app/data/campus_jsons/{campus}'
-
-    if os.path.exists(file_path) is False:
+    # the campus can be left out when it follows from the start node's id
+    campus = request.args.get('campus') or building_of(start_id or '')
+    method = 'astar' if request.args.get('algorithm') == 'astar' else 'dijkstra'
+    optimize_order = request.args.get('optimize_order', '').lower() == 'true'
+    compact = request.args.get('format') == 'compact'
+    rank = request.args.get('rank', 'weight')
+    if not registry.has_campus(campus):
         return jsonify({"error": "Campus not found"}), 400
 
-    if not start_id:
+    start_point, error_response = _start_point(request.args)
+    if error_response:
+        return error_response
+
+    if not start_id and not start_point:
         return jsonify({"error": "Missing required parameter 'startId'"}), 400
 
     if not end_id and not destinations:
         return jsonify({"error": "Must provide either 'endId' or 'destinations[]'"}), 400
 
-    if campus not in g:
-        g[campus] = Graph()
-        g[campus].load_from_json_folder(file_path)
+    if rank not in ('weight', 'time'):
+        return jsonify({"error": "'rank' must be 'weight' or 'time'"}), 400
 
-    if accessibility and accessibility.lower() == 'true':
-        if campus not in accessibility_graph:
-            accessibility_graph[campus] = Graph()
-            accessibility_graph[campus].graph_var = get_sub_graph(g[campus])
-        graph_to_use = accessibility_graph[campus]
+    hour, error_response = _hour(request.args.get('hour'))
+    if error_response:
+        return error_response
 
-    else:
-        graph_to_use = g[campus]
+    profile, error_response = _routing_profile(request.args.get('profile'), request.args.get('accessibility'))
+    if error_response:
+        return error_response
 
+    with stage(INDOOR_NAVIGATION, "graph_load"):
+        graph_to_use = registry.get(campus, profile)
+
+    if not start_id:
+        snapped = graph_to_use.snap_to_node(*start_point, profile=profile)
+        if not snapped:
+            return jsonify({"error": f"No routable location on floor '{start_point[2]}'"}), 404
+        start_id = snapped["id"]
+
+    if rank == 'time':
+        method = 'time'
+
+    end_campus = building_of(end_id) if end_id else None
+    if end_campus not in (None, building_of(start_id) or campus) and registry.has_campus(end_campus):
+        return _cross_building_route(start_id, end_id, method, profile, hour, compact)
+
+    # ETAs depend on the hour only through the elevator wait band
+    cache_key = (campus, start_id, end_id or (tuple(destinations), optimize_order), profile, compact,
+                 rank, graph_to_use.time_model.band(hour), graph_to_use.version)
+    cached = route_cache.get(cache_key)
+    if cached is not None:
+        body, status = cached
+        return current_app.response_class(body, status=status, mimetype='application/json')
+
+    with stage(INDOOR_NAVIGATION, "graph_search"):
+        payload, status = _route_payload(graph_to_use, start_id, end_id, destinations, method, optimize_order,
+                                         profile, hour)
+    if status == 200:
+        with stage(INDOOR_NAVIGATION, "eta"):
+            _add_eta(graph_to_use, payload, profile, hour)
+    tags = route_tags(campus, _payload_paths(payload), graph_to_use.closures())
+    with stage(INDOOR_NAVIGATION, "serialization"):
+        if compact and status == 200:
+            payload = compact_payload(graph_to_use.routing_graph(profile), graph_to_use.version, payload)
+        body = current_app.json.dumps(payload)
+    route_cache.put(cache_key, (body, status), tags)
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+
+def _start_point(args):
+    """
+    Parse the optional startX/startY/startFloor map point.
+    Returns ((x, y, floor) or None, error_response).
+    """
+    raw = [args.get('startX'), args.get('startY'), args.get('startFloor')]
+    if not any(raw):
+        return None, None
+    if not all(raw):
+        return None, (jsonify({"error": "'startX', 'startY' and 'startFloor' must be given together"}), 400)
+    try:
+        return (float(raw[0]), float(raw[1]), raw[2]), None
+    except ValueError:
+        return None, (jsonify({"error": "'startX' and 'startY' must be numbers"}), 400)
+
+
+def _hour(raw):
+    """Hour of day (0-23) the route is for; defaults to now. Returns (hour, error_response)."""
+    if raw is None or raw == '':
+        return datetime.now().hour, None
+    try:
+        hour = int(raw)
+    except ValueError:
+        hour = -1
+    if not 0 <= hour <= 23:
+        return None, (jsonify({"error": "'hour' must be an integer from 0 to 23"}), 400)
+    return hour, None
+
+
+def _routing_profile(profile, accessibility):
+    """
+    Routing profile for a request: an explicit 'profile' wins, otherwise
+    accessibility=true means elevator_only. Returns (profile, error_response).
+    """
+    if profile:
+        if profile not in ROUTING_PROFILES:
+            return None, (jsonify({"error": f"'profile' must be one of: {', '.join(ROUTING_PROFILES)}"}), 400)
+        return profile, None
+    if str(accessibility).lower() == 'true':
+        return "elevator_only", None
+    return "default", None
+
+
+def _building_network():
+    """Every campus graph joined by the connectors in campus_jsons/connectors.json"""
+    global building_network
+    if building_network is None:
+        building_network = BuildingNetwork(registry.get, load_connectors(registry.base_path))
+    return building_network
+
+
+def start_warm_up(campuses=None, profiles=tuple(ROUTING_PROFILES)):
+    """
+    Mark `campuses` (all by default) as not ready, then load them with every
+    profile in a daemon thread so requests don't pay for cold graphs.
+    """
+    campuses = registry.campuses() if campuses is None else list(campuses)
+    for campus in campuses:
+        warmup_status[campus] = {"ready": False}
+    thread = threading.Thread(target=warm_up, args=(campuses, profiles), name="graph-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def warm_up(campuses, profiles=tuple(ROUTING_PROFILES)):
+    """Load each campus graph with its tables for `profiles`, recording how long it took"""
+    for campus in campuses:
+        started = time.perf_counter()
+        try:
+            for profile in profiles:
+                if registry.get(campus, profile) is None:
+                    raise ValueError("Campus not found")
+        except Exception as e:
+            logger.exception(f"Warm-up failed for campus {campus}")
+            warmup_status[campus] = {"ready": False, "error": str(e)}
+            continue
+        warmup_status[campus] = {"ready": True, "load_seconds": round(time.perf_counter() - started, 3)}
+        logger.info(f"Warmed up campus {campus} in {warmup_status[campus]['load_seconds']}s")
+
+
+def reload_campus(campus):
+    """
+    Rebuild a campus graph from its JSON files (called off the request path,
+    e.g. by the CampusWatcher) and swap it in for navigation and chat at once.
+    Requests already holding the old graph finish on it; cached routes of
+    the old version are dropped.
+    """
+    graph = registry.reload(campus)
+    if graph is not None:
+        logger.info(f"Reloaded campus {campus} (graph version {graph.version})")
+    return graph
+
+
+def _cross_building_route(start_id, end_id, method, profile, hour, compact):
+    """/indoorNavigation response for a route between two buildings, with its ETA"""
+    network = _building_network()
+    with stage(INDOOR_NAVIGATION, "graph_search"):
+        path = network.find_shortest_path(start_id, end_id, method, profile, hour)
+    if not path:
+        return jsonify({"error": "Destination inaccessible from Start location"}), 404
+    if "eta_seconds" not in path:
+        with stage(INDOOR_NAVIGATION, "eta"):
+            path["eta_seconds"] = network.eta(path["path"], profile, hour)
+    with stage(INDOOR_NAVIGATION, "serialization"):
+        if not compact:
+            return jsonify({"path": path}), 200
+        parts = []
+        for building, node_ids in network.split(path["path"]):
+            graph = registry.get(building, profile)
+            parts.append((building, graph.routing_graph(profile), graph.version, node_ids))
+        return jsonify(compact_cross_building(parts, path)), 200
+
+
+def _route_payload(graph_to_use, start_id, end_id, destinations, method, optimize_order=False, profile="default",
+                   hour=None):
+    """Run the route search and return (response payload, status code)"""
     if end_id:
-        path = graph_to_use.find_shortest_path(start_id, end_id)
+        path = graph_to_use.find_shortest_path(start_id, end_id, method, profile, hour)
         if not path:
-            return jsonify({"error": "Destination inaccessible from Start location"}), 404
-        return jsonify({"path": path}), 200
+            return {"error": "Destination inaccessible from Start location"}, 404
+        return {"path": path}, 200
 
-    result = graph_to_use.find_paths_to_multiple_destinations(start_id, destinations)
+    result = graph_to_use.find_paths_to_multiple_destinations(start_id, destinations, method, optimize_order, profile,
+                                                              hour)
     if not result["paths"]:
-        return jsonify({"error": "No valid paths found"}), 404
+        return {"error": "No valid paths found"}, 404
+
+    return result, 200
+
+
+def _add_eta(graph_to_use, payload, profile, hour):
+    """Estimated walking seconds at `hour` for the payload's route (per leg and in total)"""
+    if "path" in payload:
+        route = payload["path"]
+        if "eta_seconds" not in route:
+            payload["path"] = {**route, "eta_seconds": graph_to_use.eta(route["path"], profile, hour)}
+        return
+
+    total = 0.0
+    for leg in payload["paths"]:
+        if "path" in leg:
+            leg["eta_seconds"] = graph_to_use.eta(leg["path"], profile, hour)
+            total += leg["eta_seconds"]
+    payload["total_eta_seconds"] = total
+
+
+def _payload_paths(payload):
+    """Node paths contained in an /indoorNavigation payload"""
+    if "path" in payload:
+        return [payload["path"]["path"]]
+    return [leg["path"] for leg in payload.get("paths", []) if "path" in leg]
+
+
+@navigation_routes.route('/admin/closures', methods=['GET', 'POST', 'DELETE'])
+@cross_origin()
+def closures():
+    """
+    GET lists a campus's closures. POST closes and DELETE reopens a node
+    ({"campus", "nodeId"}) or an edge ({"campus", "edge": [a, b]}) without
+    reloading the campus, for every worker (see GraphRegistry.set_closure).
+    Only cached routes the change can affect are dropped. The X-Admin-Token
+    header must match ADMIN_TOKEN; without ADMIN_TOKEN every call is refused.
+    """
+    admin_token = os.getenv('ADMIN_TOKEN')
+    if not admin_token or not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), admin_token):
+        return jsonify({"error": "Forbidden"}), 403
+
+    data = request.args if request.method == 'GET' else (request.get_json(silent=True) or {})
+    campus = data.get('campus')
+    if not registry.has_campus(campus):
+        return jsonify({"error": "Campus not found"}), 400
+
+    graph = registry.get(campus)
+    if request.method == 'GET':
+        return jsonify({"campus": campus, "closures": _closure_listing(graph)}), 200
+
+    edge = data.get('edge')
+    if data.get('nodeId'):
+        element = data['nodeId']
+    elif isinstance(edge, list) and len(edge) == 2 and all(edge):
+        element = Graph.edge_key(*edge)
+    else:
+        return jsonify({"error": "Provide either 'nodeId' or 'edge': [startId, endId]"}), 400
+
+    try:
+        changed, invalidated = registry.set_closure(campus, element, request.method == 'POST')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+
+    return jsonify({
+        "campus": campus,
+        "changed": changed,
+        "invalidated": invalidated,
+        "closures": _closure_listing(graph)
+    }), 200
+
+
+def _drop_closure_routes(campus, element, closed):
+    """
+    Closing an element drops the cached routes that use it; reopening drops
+    the ones computed while it was closed. Returns how many were dropped.
+    """
+    return route_cache.invalidate_tag(("route" if closed else "closed", campus, element))
+
+
+registry.on_closure(_drop_closure_routes)
+
+
+def _closure_listing(graph):
+    return {"nodes": sorted(graph.closed_nodes), "edges": [list(edge) for edge in sorted(graph.closed_edges)]}
+
+
+@navigation_routes.route('/nearestFacility', methods=['GET'])
+@cross_origin()
+def nearest_facility():
+    start_id = request.args.get('startId')
+    poi_type = request.args.get('poi_type')
+    campus = request.args.get('campus')
+
+    if not registry.has_campus(campus):
+        return jsonify({"error": "Campus not found"}), 400
+
+    if not start_id:
+        return jsonify({"error": "Missing required parameter 'startId'"}), 400
+
+    if poi_type not in FACILITY_TYPES:
+        return jsonify({"error": f"'poi_type' must be one of: {', '.join(FACILITY_TYPES)}"}), 400
 
+    profile, error_response = _routing_profile(request.args.get('profile'), request.args.get('accessibility'))
+    if error_response:
+        return error_response
+
+    graph_to_use = registry.get(campus, profile)
+
+    result = graph_to_use.find_nearest_facility(start_id, poi_type, profile)
+    if not result:
+        return jsonify({"error": f"No reachable {poi_type} from Start location"}), 404
     return jsonify(result), 200
 
 
-def get_sub_graph(g):
-    nx_graph = g.graph
-    allowed_edges = set(nx_graph.edges())
+@navigation_routes.route('/reachable', methods=['GET'])
+@cross_origin()
+def reachable():
+    """
+    Every node reachable from startId within maxDistance meters walked, or
+    within maxMinutes by the time model (elevator waits at 'hour' included),
+    grouped by floor. poi_type optionally keeps only one kind of node, e.g. room.
+    """
+    start_id = request.args.get('startId')
+    campus = request.args.get('campus') or building_of(start_id or '')
+    poi_type = request.args.get('poi_type')
+
+    if not registry.has_campus(campus):
+        return jsonify({"error": "Campus not found"}), 400
+
+    if not start_id:
+        return jsonify({"error": "Missing required parameter 'startId'"}), 400
+
+    try:
+        if request.args.get('maxMinutes'):
+            minutes = float(request.args['maxMinutes'])
+            budget, by = minutes * 60, "time"
+        else:
+            budget, by = float(request.args['maxDistance']), "distance"
+    except (KeyError, ValueError):
+        return jsonify({"error": "Provide a numeric 'maxDistance' or 'maxMinutes'"}), 400
+    if budget < 0:
+        return jsonify({"error": "The budget must not be negative"}), 400
+
+    hour, error_response = _hour(request.args.get('hour'))
+    if error_response:
+        return error_response
+
+    profile, error_response = _routing_profile(request.args.get('profile'), request.args.get('accessibility'))
+    if error_response:
+        return error_response
+
+    graph_to_use = registry.get(campus, profile)
+    floors = graph_to_use.reachable_within(start_id, budget, profile, by, hour)
+    if floors is None:
+        return jsonify({"error": "Start location not found"}), 404
+
+    if poi_type:
+        floors = {floor: [node for node in nodes if node["poi_type"] == poi_type] for floor, nodes in floors.items()}
+        floors = {floor: nodes for floor, nodes in floors.items() if nodes}
+    return jsonify({"startId": start_id, "campus": campus, "budget": budget, "by": by, "floors": floors}), 200
+
+
+MAX_BATCH_PAIRS = 1000
+
+
+@navigation_routes.route('/indoorNavigation/batch', methods=['POST'])
+@cross_origin()
+def indoor_navigation_batch():
+    """
+    Route many (startId, endId) pairs on one campus in a single request.
+    Pairs sharing a start are answered from one shortest-path tree.
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+
+    campus = data.get('campus')
+    pairs = data.get('pairs')
+
+    if not registry.has_campus(campus):
+        return jsonify({"error": "Campus not found"}), 400
+
+    if not isinstance(pairs, list) or not pairs:
+        return jsonify({"error": "Missing required field 'pairs'"}), 400
+
+    if len(pairs) > MAX_BATCH_PAIRS:
+        return jsonify({"error": f"At most {MAX_BATCH_PAIRS} pairs per batch"}), 400
+
+    if not all(isinstance(pair, dict) and pair.get('startId') and pair.get('endId') for pair in pairs):
+        return jsonify({"error": "Each pair needs 'startId' and 'endId'"}), 400
+
+    profile, error_response = _routing_profile(data.get('profile'), data.get('accessibility'))
+    if error_response:
+        return error_response
+
+    graph_to_use = registry.get(campus, profile)
+    routes = graph_to_use.find_paths_batch([(pair['startId'], pair['endId']) for pair in pairs], profile)
+
+    results = []
+    for pair, path in zip(pairs, routes):
+        entry = {"startId": pair['startId'], "endId": pair['endId']}
+        if path:
+            entry["path"] = path
+        else:
+            entry["error"] = "Destination inaccessible from Start location"
+        results.append(entry)
 
-    # Remove escalator and stairs edges
-    for edge in nx_graph.edges():
-        if "escalator" in edge[0] or "stairs" in edge[0] or "escalator" in edge[1] or "stairs" in edge[1]:
-            allowed_edges.remove(edge)
+    return jsonify({"campus": campus, "results": results}), 200
+
+
+TASK_CHAT_HINT = "I can help you with your tasks! Try asking about deadlines, priorities, or specific tasks."
 
-    # Create a subgraph with allowed edges only
-    return nx_graph.edge_subgraph(allowed_edges).copy()
 
 @navigation_routes.route('/chat/tasks', methods=['POST'])
 @cross_origin()
 def process_task_chat():
     try:
         data = request.get_json()
-        print('Received request data:', data)  # Debug log
         
         query, error_response = validate_query(data)
         if error_response:
             return error_response
             
         tasks = data.get('tasks', [])
+        logger.debug("Task chat query: %s (%d tasks)", query, len(tasks))
         
-        print('Processing query:', query)  # Debug log
-        print('With tasks:', tasks)  # Debug log
-        
-        if not is_task_query(query):
-            return jsonify({
-                "response": "I can help you with your tasks! Try asking about deadlines, priorities, or specific tasks."
-            })
+        with stage(TASK_CHAT, "intent_detection"):
+            task_query = is_task_query(query)
+        if not task_query:
+            return jsonify({"response": TASK_CHAT_HINT})
             
-        response = handle_task_query(query, tasks)
-        print('Generated response:', response)  # Debug log
+        with stage(TASK_CHAT, "llm_call"):
+            response = handle_task_query(query, tasks)
         
-        return jsonify({"response": response})
+        with stage(TASK_CHAT, "serialization"):
+            return jsonify({"response": response})
         
-    except Exception as e:
-        print(f"Error in process_task_chat: {str(e)}")  # Debug log
+    except Exception:
+        logger.exception("Error in process_task_chat")
         return jsonify({"error": "Failed to process chat request"}), 500
 
+NAVIGATION_CHAT_NO_ROOMS = ("I couldn't identify the rooms in your query. "
+                            "Please specify them clearly (e.g., 'How do I get from H-109 to H-110?')")
+
+
+def navigation_chat_rooms(query):
+    """
+    (start_room, end_room) node ids named in a navigation chat query: the
+    direct "how to go from H 109 to H 110" form, otherwise extract_rooms.
+    """
+    go_match = re.search(r'how to go from h\s*(\d{3})\s+to\s+h\s*(\d{3})', query.lower())
+    if go_match:
+        start_num, end_num = go_match.groups()
+        # the first digit of a Hall room number is its floor
+        return f"h{start_num[0]}_{start_num}", f"h{end_num[0]}_{end_num}"
+    return extract_rooms(query)
+
+
 @navigation_routes.route('/chat/navigation', methods=['POST'])
 @cross_origin()
 def process_navigation_chat():
     try:
         data = request.get_json()
-        print('NAVIGATION ROUTE: Received request data:', data)
         
         query, error_response = validate_query(data)
         if error_response:
             return error_response
-            
-        print('NAVIGATION ROUTE: Processing navigation query:', query)
-        
-        # Special handling for "How to go from H 109 to H 110" format
-        import re
-        go_pattern = r'how to go from h\s*(\d{3})\s+to\s+h\s*(\d{3})'
-        go_match = re.search(go_pattern, query.lower())
-        
-        if go_match:
-            print('NAVIGATION ROUTE: Detected direct "how to go from" pattern')
-            start_num = go_match.group(1)
-            end_num = go_match.group(2)
-            
-            # Get floor numbers
-            start_floor = start_num[0]
-            end_floor = end_num[0]
-            
-            # Format for the navigation system
-            start_room = f"h{start_floor}_{start_num}"
-            end_room = f"h{end_floor}_{end_num}"
-            
-            print(f'NAVIGATION ROUTE: Directly extracted: {start_room} to {end_room}')
-            
-            # Find the shortest path
-            path_info = ai_nav.find_shortest_path(start_room, end_room)
-            print(f'NAVIGATION ROUTE: Path info: {path_info}')
-            
-            # Interpret the path
-            response = interpret_path(path_info)
-            print(f'NAVIGATION ROUTE: Generated response: {response}')
-            
-            return jsonify({"response": response})
-        
-        # Fall back to regular extraction
-        start_room, end_room = extract_rooms(query)
-        print(f'NAVIGATION ROUTE: Extracted rooms: {start_room}, {end_room}')
+
+        with stage(NAVIGATION_CHAT, "extract_rooms"):
+            start_room, end_room = navigation_chat_rooms(query)
+        logger.debug("Navigation chat query: %s -> rooms %s, %s", query, start_room, end_room)
         
         if not start_room or not end_room:
-            return jsonify({
-                "response": "I couldn't identify the rooms in your query. Please specify them clearly (e.g., 'How do I get from H-109 to H-110?')"
-            })
+            return jsonify({"response": NAVIGATION_CHAT_NO_ROOMS})
         
         # Find the shortest path
-        path_info = ai_nav.find_shortest_path(start_room, end_room)
-        print(f'NAVIGATION ROUTE: Path info: {path_info}')
+        with stage(NAVIGATION_CHAT, "graph_search"):
+            path_info = ai_nav.find_shortest_path(start_room, end_room)
         
         # Interpret the path
-        response = interpret_path(path_info)
-        print(f'NAVIGATION ROUTE: Generated response: {response}')
+        with stage(NAVIGATION_CHAT, "interpret_path"):
+            response = interpret_path(path_info)
         
-        return jsonify({"response": response})
+        with stage(NAVIGATION_CHAT, "serialization"):
+            return jsonify({"response": response})
         
     except Exception as e:
-        print(f"NAVIGATION ROUTE: Error in process_navigation_chat: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in process_navigation_chat")
         return jsonify({"error": "Failed to process navigation request", "details": str(e)}), 500
 
+@navigation_routes.route('/ready', methods=['GET'])
+@cross_origin()
+def ready():
+    """
+    Readiness probe: 200 once every campus being warmed up is loaded, 503
+    while any is still loading or failed. Per campus it reports readiness
+    and load time (or the error).
+    """
+    campuses = {campus: dict(status) for campus, status in warmup_status.items()}
+    is_ready = all(status["ready"] for status in campuses.values())
+    return jsonify({"ready": is_ready, "campuses": campuses}), 200 if is_ready else 503
+
+
+@navigation_routes.route('/graphs', methods=['GET'])
+@cross_origin()
+def loaded_graphs():
+    """Memory footprint of the campus graphs this worker has loaded (shared with chat)"""
+    return jsonify(registry.memory_footprint()), 200
+
+
+@navigation_routes.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request, stage and route cache metrics of this worker in the Prometheus text format"""
+    return current_app.response_class(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
 @navigation_routes.route('/health', methods=['GET'])
 @cross_origin()
 def health_check():
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+
+class RouteCache:
+    """
+    Bounded LRU cache with a per-entry TTL for route results.
+
+    Keys are expected to end with the graph version the route was computed
+    on, e.g. (campus, start, end, profile, graph_version), so a reload
+    makes old entries unreachable; invalidate() frees them eagerly.
+
+    Entries can also carry tags (see route_tags); invalidate_tag() drops
+    exactly the entries carrying a tag, through a tag -> keys index.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._tagged: Dict[Hashable, set] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value, _ = entry
+            if expires_at <= self._clock():
+                self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, tags: Iterable[Hashable] = (), ttl: Optional[float] = None):
+        """Store a value for `ttl` seconds (the cache's ttl by default)"""
+        with self._lock:
+            self._discard(key)
+            tags = frozenset(tags)
+            self._entries[key] = (self._clock() + (self.ttl if ttl is None else ttl), value, tags)
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+
+    def discard(self, key: Hashable):
+        """Drop one entry if present"""
+        with self._lock:
+            self._discard(key)
+
+    def _discard(self, key: Hashable):
+        """Remove one entry and its tag index references; caller holds the lock"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches `predicate`; returns how many"""
+        with self._lock:
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                self._discard(key)
+            return len(stale)
+
+    def invalidate_tag(self, tag: Hashable) -> int:
+        """Drop every entry carrying `tag`; returns how many"""
+        with self._lock:
+            stale = list(self._tagged.get(tag, ()))
+            for key in stale:
+                self._discard(key)
+            return len(stale)
+
+    def invalidate_campus(self, campus: str, keep_version: Any = None) -> int:
+        """Drop a campus's entries not computed on `keep_version` (all of them by default)"""
+        return self.invalidate(lambda key: key[0] == campus and key[-1] != keep_version)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tagged.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize
+            }
+
+
+def route_tags(campus: str, paths: Iterable[List[str]], closures: Iterable[Hashable] = ()) -> List[tuple]:
+    """
+    Tags for a cached route: ("route", campus, element) for every node and
+    edge key (sorted id pair) the paths use, and ("closed", campus, element)
+    for every closure in force when it was computed. Closing an element
+    invalidates its "route" tag; reopening it invalidates its "closed" tag.
+    """
+    tags = [("closed", campus, element) for element in closures]
+    for path in paths:
+        tags.extend(("route", campus, node_id) for node_id in path)
+        tags.extend(("route", campus, tuple(sorted(pair))) for pair in zip(path, path[1:]))
+    return tags
@@ -0,0 +1,245 @@
+import secrets
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from .route_cache import RouteCache
+
+# in-process backend bound; the least recently used sessions go first
+MEMORY_SESSION_LIMIT = 10000
+SESSION_KEY_PREFIX = "session:"
+
+
+class SessionStore(ABC):
+    """Where server-side sessions live: serialized session bytes per session id"""
+
+    @abstractmethod
+    def get(self, sid: str) -> Optional[bytes]:
+        """The stored session, or None if missing or expired"""
+
+    @abstractmethod
+    def set(self, sid: str, value: bytes, ttl: int):
+        """Store a session for `ttl` seconds"""
+
+    @abstractmethod
+    def delete(self, sid: str):
+        """Drop a session if present"""
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Sessions in this process: an LRU bounded to `maxsize` entries, each
+    expiring the `ttl` given to set() after its last write (the
+    constructor's `ttl` is only the default). Sessions are not shared
+    between worker processes; use RedisSessionStore for that.
+    """
+
+    def __init__(self, maxsize: int = MEMORY_SESSION_LIMIT, ttl: float = 31 * 24 * 3600,
+                 clock: Callable[[], float] = time.monotonic):
+        self._cache = RouteCache(maxsize=maxsize, ttl=ttl, clock=clock)
+
+    def get(self, sid: str) -> Optional[bytes]:
+        return self._cache.get(sid)
+
+    def set(self, sid: str, value: bytes, ttl: int):
+        self._cache.put(sid, value, ttl=ttl)
+
+    def delete(self, sid: str):
+        self._cache.discard(sid)
+
+    def __len__(self) -> int:
+        return self._cache.stats()["size"]
+
+
+class RedisError(Exception):
+    """An error reply from the server"""
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Sessions in any server speaking the Redis protocol (RESP), through one
+    lazily opened connection guarded by a lock and reopened after an error.
+    Expiry is left to the server (SET ... EX ttl).
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0, password: Optional[str] = None,
+                 prefix: str = SESSION_KEY_PREFIX, timeout: float = 2.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.prefix = prefix
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisSessionStore":
+        """redis://[:password@]host[:port][/db]"""
+        parsed = urlparse(url)
+        db = parsed.path.lstrip("/")
+        return cls(parsed.hostname or "localhost", parsed.port or 6379, int(db) if db else 0,
+                   parsed.password, **kwargs)
+
+    def get(self, sid: str) -> Optional[bytes]:
+        return self.execute("GET", self.prefix + sid)
+
+    def set(self, sid: str, value: bytes, ttl: int):
+        self.execute("SET", self.prefix + sid, value, "EX", max(1, int(ttl)))
+
+    def delete(self, sid: str):
+        self.execute("DEL", self.prefix + sid)
+
+    def execute(self, *args) -> Any:
+        """Send one command and return its decoded reply; retried once on a broken connection"""
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._sock.sendall(self._encode(args))
+                    return self._read_reply()
+                except (OSError, ConnectionError):
+                    self._close()
+                    if attempt:
+                        raise
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._reader = self._sock.makefile("rb")
+        if self.password:
+            self._sock.sendall(self._encode(("AUTH", self.password)))
+            self._read_reply()
+        if self.db:
+            self._sock.sendall(self._encode(("SELECT", self.db)))
+            self._read_reply()
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        """A command as a RESP array of bulk strings"""
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode()
+            elif isinstance(arg, int):
+                arg = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by the session server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            count = int(payload)
+            return None if count == -1 else [self._read_reply() for _ in range(count)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session dict that remembers its id and whether it changed"""
+
+    def __init__(self, initial: Optional[Dict[str, Any]] = None, sid: Optional[str] = None, new: bool = False):
+        def on_update(session):
+            session.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid or secrets.token_urlsafe(32)
+        self.new = new
+        self.modified = False
+
+
+class StoreSessionInterface(SessionInterface):
+    """
+    Flask sessions kept in a SessionStore; the cookie only carries the
+    random session id. Nothing is written for requests that leave the
+    session unchanged.
+    """
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store: SessionStore):
+        self.store = store
+
+    def open_session(self, app, request) -> ServerSession:
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data = self.store.get(sid)
+            if data is not None:
+                try:
+                    return ServerSession(self.serializer.loads(data), sid)
+                except ValueError:
+                    pass
+        return ServerSession(new=True)
+
+    def save_session(self, app, session: ServerSession, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            if session.modified:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if not self.should_set_cookie(app, session):
+            return
+
+        ttl = app.permanent_session_lifetime
+        if isinstance(ttl, timedelta):
+            ttl = ttl.total_seconds()
+        self.store.set(session.sid, self.serializer.dumps(dict(session)).encode(), int(ttl))
+        response.set_cookie(
+            name, session.sid, expires=self.get_expiration_time(app, session), domain=domain, path=path,
+            secure=self.get_cookie_secure(app), httponly=self.get_cookie_httponly(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+
+def create_session_interface(config: Dict[str, Any]) -> StoreSessionInterface:
+    """
+    The session interface for SESSION_BACKEND: "memory" (default) or
+    "redis", which connects to SESSION_REDIS_URL.
+    """
+    backend = config.get("SESSION_BACKEND", "memory")
+    lifetime = config.get("PERMANENT_SESSION_LIFETIME", timedelta(days=31))
+    if isinstance(lifetime, timedelta):
+        lifetime = lifetime.total_seconds()
+    if backend == "memory":
+        store = MemorySessionStore(int(config.get("SESSION_MEMORY_LIMIT", MEMORY_SESSION_LIMIT)), lifetime)
+    elif backend == "redis":
+        store = RedisSessionStore.from_url(config.get("SESSION_REDIS_URL", "redis://localhost:6379/0"))
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+    return StoreSessionInterface(store)
@@ -0,0 +1,8 @@
+"""
+Scaling benchmarks for the indoor navigation graph.
+
+    python -m api.benchmarks --sizes 100 1000 10000 100000
+
+generates synthetic buildings (see synthetic.py) and times Graph2.Graph on
+each size; see suite.py for what is measured.
+"""
@@ -0,0 +1,26 @@
+import argparse
+import json
+
+from .suite import DEFAULT_SIZES, format_report, run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling benchmarks on synthetic campus graphs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="approximate node counts to generate")
+    parser.add_argument("--queries", type=int, default=100, help="timed queries per operation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip", nargs="+", default=[], metavar="OPERATION",
+                        help="operations not to time, e.g. yen_k_shortest_paths")
+    parser.add_argument("--json", help="also write the raw results to this file")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.queries, args.seed, args.skip)
+    print(format_report(results))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import gc
+import os
+import random
+import resource
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from ..app.graph.Graph2 import Graph
+from .synthetic import write_building
+
+DEFAULT_SIZES = (100, 1_000, 10_000, 100_000)
+PERCENTILES = (50, 90, 99)
+
+
+def latency(fn: Callable[[], Any], repeats: int) -> Dict[str, float]:
+    """Run fn `repeats` times; percentiles and max of the wall time in ms"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    stats = {f"p{p}": float(np.percentile(samples, p)) for p in PERCENTILES}
+    stats["max"] = max(samples)
+    stats["runs"] = repeats
+    return stats
+
+
+def peak_memory(fn: Callable[[], Any]) -> float:
+    """Peak Python heap (MiB) allocated while fn runs, traced separately from the timings"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def bench_size(folder: str, num_nodes: int, queries: int, seed: int = 0, skip=()) -> Dict[str, Any]:
+    """Time each Graph entry point on one synthetic building, except those named in skip"""
+    files = write_building(folder, num_nodes, seed=seed)
+    rng = random.Random(seed)
+
+    def load() -> Graph:
+        graph = Graph()
+        graph.load_from_json_folder(folder)
+        return graph
+
+    # fewer repeats on the large sizes, where a single load takes seconds
+    load_runs = max(1, min(10, 20_000 // num_nodes))
+    result = {"nodes": None, "floors": len(files), "load": latency(load, load_runs)}
+
+    graph = load()
+    graph.compile()
+    node_ids = list(graph.graph_var.nodes)
+    result["nodes"] = len(node_ids)
+    result["edges"] = graph.graph_var.number_of_edges()
+
+    pairs = [(rng.choice(node_ids), rng.choice(node_ids)) for _ in range(queries)]
+    tours = [(rng.choice(node_ids), rng.sample(node_ids, 5)) for _ in range(queries)]
+    # Yen runs on networkx and is by far the slowest; keep its run count bounded
+    yen_runs = max(1, min(queries, 20_000 // len(node_ids)))
+    operations = {
+        "find_shortest_path": (lambda pair: graph.find_shortest_path(*pair), pairs),
+        "find_shortest_path_astar": (lambda pair: graph.find_shortest_path(*pair, method="astar"), pairs),
+        "yen_k_shortest_paths": (lambda pair: graph.yen_k_shortest_paths(*pair), pairs[:yen_runs]),
+        "find_paths_to_multiple_destinations": (lambda tour: graph.find_paths_to_multiple_destinations(*tour), tours),
+    }
+    for name, (operation, inputs) in operations.items():
+        if name not in skip:
+            arguments = iter(inputs)
+            result[name] = latency(lambda: operation(next(arguments)), len(inputs))
+
+    result["peak_memory_mib"] = {
+        "load": peak_memory(load),
+        "compile": peak_memory(graph.compile),
+    }
+    result["compiled_mib"] = graph.compiled.nbytes() / 2 ** 20
+    return result
+
+
+def run(sizes: List[int] = DEFAULT_SIZES, queries: int = 100, seed: int = 0, skip=()) -> List[Dict[str, Any]]:
+    """Benchmark every size in a scratch directory; one result dict per size"""
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for num_nodes in sizes:
+            folder = os.path.join(scratch, f"synthetic_{num_nodes}")
+            results.append(bench_size(folder, num_nodes, queries, seed, skip))
+    return results
+
+
+def max_rss_mib() -> float:
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2 ** 20 if os.uname().sysname == "Darwin" else rss / 2 ** 10
+
+
+def format_report(results: List[Dict[str, Any]]) -> str:
+    """Plain-text table: one block per size, one line per operation"""
+    lines = []
+    for result in results:
+        memory = result["peak_memory_mib"]
+        lines.append(
+            f"{result['nodes']} nodes, {result['edges']} edges, {result['floors']} floors | "
+            f"peak heap load {memory['load']:.1f} MiB, compile {memory['compile']:.1f} MiB, "
+            f"CSR arrays {result['compiled_mib']:.2f} MiB"
+        )
+        for name, stats in result.items():
+            if isinstance(stats, dict) and "runs" in stats:
+                percentiles = "  ".join(f"p{p} {stats[f'p{p}']:9.3f}" for p in PERCENTILES)
+                lines.append(f"  {name:<38} {percentiles}  max {stats['max']:9.3f} ms  ({stats['runs']} runs)")
+    lines.append(f"max RSS {max_rss_mib():.1f} MiB")
+    return "\n".join(lines)
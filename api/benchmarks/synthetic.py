@@ -0,0 +1,84 @@
+import json
+import os
+import random
+from typing import Any, Dict, List
+
+# map units between neighbouring hallway nodes, as on the real floor plans
+HALL_SPACING = 40.0
+ROOMS_PER_HALL = 2
+CONNECTORS = ("elevator", "stairs", "escalator")
+# nodes per floor the generator aims for when picking the floor count
+NODES_PER_FLOOR = 500
+MAX_FLOORS = 20
+
+
+def floor_count(num_nodes: int) -> int:
+    return max(2, min(MAX_FLOORS, num_nodes // NODES_PER_FLOOR))
+
+
+def generate_building(num_nodes: int, prefix: str = "s", floors: int = None, seed: int = 0) -> Dict[str, Dict[str, Any]]:
+    """
+    A synthetic building of about num_nodes nodes, in the campus_jsons
+    schema: {file name: {"nodes", "edges", "scale_factor"}}, one file per floor.
+
+    Each floor is a grid of hallway nodes. Every row is a corridor, and rows
+    are joined at the first column and at random columns elsewhere. Rooms
+    hang off the hallway nodes. An elevator, stairs and an escalator sit on
+    each floor and link to the same connector on the floor below. Node ids
+    look like s3_hw12, s3_305 and s3_elevator.
+    """
+    rng = random.Random(seed)
+    floors = floors or floor_count(num_nodes)
+    halls = max(1, (num_nodes // floors - len(CONNECTORS)) // (1 + ROOMS_PER_HALL))
+    columns = max(1, int(halls ** 0.5))
+    rows = -(-halls // columns)
+
+    files = {}
+    for floor in range(1, floors + 1):
+        nodes: List[Dict[str, Any]] = []
+        edges: List[List[str]] = []
+
+        def add_node(node_id: str, x: float, y: float, poi_type: str):
+            nodes.append({"id": node_id, "x": round(x, 2), "y": round(y, 2),
+                          "floor_number": str(floor), "poi_type": poi_type})
+
+        def hall(i: int) -> str:
+            return f"{prefix}{floor}_hw{i}"
+
+        for i in range(halls):
+            row, column = divmod(i, columns)
+            x, y = column * HALL_SPACING, row * HALL_SPACING
+            add_node(hall(i), x, y, "hallway")
+            if column > 0:
+                edges.append([hall(i - 1), hall(i)])
+            if row > 0 and (column == 0 or rng.random() < 0.5):
+                edges.append([hall(i - columns), hall(i)])
+            for r in range(ROOMS_PER_HALL):
+                room = f"{prefix}{floor}_{floor}{i * ROOMS_PER_HALL + r:04d}"
+                offset = HALL_SPACING / 3 * (1 if r % 2 else -1)
+                add_node(room, x + HALL_SPACING / 4, y + offset, "room")
+                edges.append([hall(i), room])
+
+        for k, connector in enumerate(CONNECTORS):
+            node_id = f"{prefix}{floor}_{connector}"
+            anchor = rng.randrange(halls) if k else 0
+            row, column = divmod(anchor, columns)
+            add_node(node_id, column * HALL_SPACING - HALL_SPACING / 4, row * HALL_SPACING, connector)
+            edges.append([hall(anchor), node_id])
+            if floor > 1:
+                edges.append([f"{prefix}{floor - 1}_{connector}", node_id])
+
+        files[f"map_{prefix}_{floor}.json"] = {"nodes": nodes, "edges": edges, "scale_factor": 0.05}
+    return files
+
+
+def write_building(folder: str, num_nodes: int, prefix: str = "s", floors: int = None, seed: int = 0) -> List[str]:
+    """Write generate_building's floors into folder; returns the file paths"""
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for name, data in generate_building(num_nodes, prefix, floors, seed).items():
+        path = os.path.join(folder, name)
+        with open(path, "w") as f:
+            json.dump(data, f)
+        paths.append(path)
+    return paths
@@ -0,0 +1,4 @@
+# Asyncio serving mode: uvicorn run_asgi:app --port 5001
+from app.asgi import create_asgi_app
+
+app = create_asgi_app()
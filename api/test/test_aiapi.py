@@ -1,27 +1,57 @@
 import pytest
 from unittest.mock import MagicMock, patch
 from api.app.aiapi import AINavigationAPI, NavigationDetails
+from api.app.graph_registry import GraphRegistry
+from api.app.route_cache import RouteCache
 
 
-@patch("api.app.aiapi.Graph")  # Patches Graph in aiapi.py
+@patch("api.app.aiapi.route_cache", new_callable=RouteCache)  # a fresh shared cache per test
 class TestAINavigationAPI:
 
-    def test_initialize_graphs_sets_up_graphs(self, mock_graph_class):
+    def test_initialize_graphs_loads_lazily(self, route_cache):
         mock_instance = MagicMock()
-        mock_graph_class.return_value = mock_instance
-
-        api = AINavigationAPI()
-
-        # Check that some graphs were created
-        assert any(campus in api.graphs for campus in ['hall', 'mb', 'cc'])
-
-    def test_get_path_details_when_empty(self, mock_graph_class):
-        api = AINavigationAPI()
+        api = AINavigationAPI(GraphRegistry())
+
+        # Campuses are only loaded on first use
+        assert 'hall' not in api.graphs
+        with patch("api.app.graph_registry.build_campus_graph", return_value=mock_instance) as build:
+            assert api._graph('hall') is mock_instance
+            assert api._graph('hall') is mock_instance
+        build.assert_called_once()
+        assert 'hall' in api.graphs and 'mb' not in api.graphs
+        assert api._graph('unknown') is None
+
+    def test_apis_share_the_registry(self, route_cache):
+        first, second = AINavigationAPI(), AINavigationAPI()
+        assert first.graphs is second.graphs
+        assert first.route_cache is second.route_cache is route_cache
+
+    def test_find_shortest_path_infers_campus(self, route_cache):
+        api = AINavigationAPI(GraphRegistry())
+        mb_graph = MagicMock()
+        mb_graph.find_shortest_path.return_value = {"path": ["mb_1_338", "mb_1_301"], "distance": 3}
+        api.graphs.swap("mb", mb_graph)
+
+        result = api.find_shortest_path("mb_1_338", "mb_1_301")
+        assert result["path"] == ["mb_1_338", "mb_1_301"]
+        assert api._navigation_details[NavigationDetails.CAMPUS] == "mb"
+
+    def test_find_shortest_path_across_buildings(self, route_cache):
+        api = AINavigationAPI(GraphRegistry())
+        api.network = MagicMock()
+        api.network.find_shortest_path.return_value = {"path": ["h1_hw2", "mb_s2_metro"], "distance": 110}
+
+        result = api.find_shortest_path("h1_hw2", "mb_s2_metro")
+        assert result["distance"] == 110
+        api.network.find_shortest_path.assert_called_with("h1_hw2", "mb_s2_metro", profile="default")
+
+    def test_get_path_details_when_empty(self, route_cache):
+        api = AINavigationAPI(GraphRegistry())
         result = api.get_path_details()
         assert result == "No path currently set"
 
-    def test_get_path_details_with_data(self, mock_graph_class):
-        api = AINavigationAPI()
+    def test_get_path_details_with_data(self, route_cache):
+        api = AINavigationAPI(GraphRegistry())
         api._navigation_details[NavigationDetails.PATH] = ["h-102_1", "h-110_1"]
         api._navigation_details[NavigationDetails.START_ID] = "h-102_1"
         api._navigation_details[NavigationDetails.END_ID] = "h-110_1"
@@ -33,125 +63,112 @@ class TestAINavigationAPI:
         assert "To: H-110 (Floor 1)" in result
         assert "Distance: 42.0 meters" in result
 
-    def test_format_room_id_variants(self, mock_graph_class):
-        api = AINavigationAPI()
+    def test_format_room_id_variants(self, route_cache):
+        api = AINavigationAPI(GraphRegistry())
         assert api._format_room_id("elevator_up") == "Elevator"
         assert api._format_room_id("stairs_down") == "Stairs"
         assert api._format_room_id("escalator1") == "Escalator"
         assert api._format_room_id("h-101_3") == "H-101 (Floor 3)"
         assert api._format_room_id("h110") == "H110"
 
-    def test_normalize_room_id_patterns(self, mock_graph_class):
-        api = AINavigationAPI()
+    def test_normalize_room_id_patterns(self, route_cache):
+        api = AINavigationAPI(GraphRegistry())
         assert api._normalize_room_id("H-110") == "h-110_1"
         assert api._normalize_room_id("H-110_2") == "h-110_2"
         assert api._normalize_room_id("randomtext") == "randomtext"
 
-    def test_find_shortest_path_success(self, mock_graph_class):
+    def test_find_shortest_path_success(self, route_cache):
         mock_graph = MagicMock()
         mock_graph.find_shortest_path.return_value = {
             "path": ["a", "b", "c"],
             "distance": 99
         }
-        mock_graph_class.return_value = mock_graph
 
-        api = AINavigationAPI()
-        api.graphs["hall"] = mock_graph
+        api = AINavigationAPI(GraphRegistry())
+        api.graphs.swap("hall", mock_graph)
 
         result = api.find_shortest_path("a", "c", "hall")
         assert result["path"] == ["a", "b", "c"]
         assert result["distance"] == 99
         assert api.has_active_navigation()
 
-    def test_find_shortest_path_no_graph(self, mock_graph_class):
-        api = AINavigationAPI()
+    def test_find_shortest_path_uses_route_cache(self, route_cache):
+        mock_graph = MagicMock()
+        mock_graph.version = 1
+        mock_graph.find_shortest_path.return_value = {"path": ["a", "b"], "distance": 5}
+
+        api = AINavigationAPI(GraphRegistry())
+        api.graphs.swap("hall", mock_graph)
+
+        api.find_shortest_path("a", "b", "hall")
+        result = api.find_shortest_path("a", "b", "hall")
+        assert result["path"] == ["a", "b"]
+        assert mock_graph.find_shortest_path.call_count == 1
+        assert api.route_cache.stats()["hits"] == 1
+
+        mock_graph.version = 2
+        api.find_shortest_path("a", "b", "hall")
+        assert mock_graph.find_shortest_path.call_count == 2
+
+    def test_find_shortest_path_no_graph(self, route_cache):
+        api = AINavigationAPI(GraphRegistry())
         result = api.find_shortest_path("a", "b", "unknown")
         assert "error" in result
         assert "Campus unknown not found" in result["error"]
 
-    def test_find_shortest_path_not_found(self, mock_graph_class):
+    def test_find_shortest_path_not_found(self, route_cache):
         mock_graph = MagicMock()
         mock_graph.find_shortest_path.return_value = None
-        mock_graph_class.return_value = mock_graph
 
-        api = AINavigationAPI()
-        api.graphs["hall"] = mock_graph
+        api = AINavigationAPI(GraphRegistry())
+        api.graphs.swap("hall", mock_graph)
 
         result = api.find_shortest_path("a", "b", "hall")
         assert result["error"] == "No path found between the specified rooms"
 
-    def test_find_multiple_destinations_success(self, mock_graph_class):
+    def test_find_multiple_destinations_success(self, route_cache):
         mock_graph = MagicMock()
         mock_graph.find_paths_to_multiple_destinations.return_value = {
             "paths": [["a", "b", "c"]]
         }
-        mock_graph_class.return_value = mock_graph
 
-        api = AINavigationAPI()
-        api.graphs["hall"] = mock_graph
+        api = AINavigationAPI(GraphRegistry())
+        api.graphs.swap("hall", mock_graph)
 
         result = api.find_multiple_destinations("a", ["b", "c"])
         assert "paths" in result
 
-    def test_find_multiple_destinations_error(self, mock_graph_class):
+    def test_find_multiple_destinations_error(self, route_cache):
         mock_graph = MagicMock()
         mock_graph.find_paths_to_multiple_destinations.side_effect = Exception("Simulated failure")
-        mock_graph_class.return_value = mock_graph
 
-        api = AINavigationAPI()
-        api.graphs["hall"] = mock_graph
+        api = AINavigationAPI(GraphRegistry())
+        api.graphs.swap("hall", mock_graph)
 
         result = api.find_multiple_destinations("a", ["b"])
         assert "error" in result
         assert "Simulated failure" in result["error"]
 
-    def test_normalize_room_id_invalid_format(self, mock_graph_class):
-        api = AINavigationAPI()
+    def test_normalize_room_id_invalid_format(self, route_cache):
+        api = AINavigationAPI(GraphRegistry())
         result = api._normalize_room_id("this_is_not_a_room")
         assert result == "this_is_not_a_room"  # falls back to input
 
-    def test_get_sub_graph_removes_stairs_escalators(self, mock_graph_class):
-        import networkx as nx
-
-        api = AINavigationAPI()
-
-        # Create a dummy graph with stairs/escalator edges
-        G = nx.DiGraph()
-        G.add_edges_from([
-            ("a", "b"),
-            ("b", "stairs_up"),
-            ("stairs_up", "c"),
-            ("c", "escalator_down"),
-            ("escalator_down", "d")
-        ])
-
-        graph_mock = MagicMock()
-        graph_mock.graph = G
-
-        sub_graph = api._get_sub_graph(graph_mock)
-
-        # Check that the stair/escalator edges are removed
-        assert ("b", "stairs_up") not in sub_graph.edges
-        assert ("c", "escalator_down") not in sub_graph.edges
-        assert ("a", "b") in sub_graph.edges  # valid edge remains
-
-    def test_find_shortest_path_accessibility_enabled(self, mock_graph_class):
+    def test_find_shortest_path_accessibility_enabled(self, route_cache):
         # Simulate a campus and accessibility logic path
         path_data = {"path": ["x", "y", "z"], "distance": 123.4}
 
         # Mock Graph and its graph structure
         graph_mock = MagicMock()
         graph_mock.find_shortest_path.return_value = path_data
-        graph_mock.graph.edges.return_value = [("x", "stairs_y"), ("y", "z")]
-
-        mock_graph_class.return_value = graph_mock
 
-        api = AINavigationAPI()
-        api.graphs["hall"] = graph_mock
+        api = AINavigationAPI(GraphRegistry())
+        api.graphs.swap("hall", graph_mock)
 
         # Call with accessibility=True
         result = api.find_shortest_path("x", "z", campus="hall", accessibility=True)
 
         assert result["path"] == ["x", "y", "z"]
         assert api._navigation_details[NavigationDetails.ACCESSIBILITY] is True
+        graph_mock.find_shortest_path.assert_called_with("x", "z", profile="elevator_only")
 
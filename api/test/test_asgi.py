@@ -0,0 +1,167 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+from flask import Flask, jsonify
+from unittest.mock import AsyncMock, MagicMock, patch
+from api.app.asgi import AsyncApp
+from api.app.navigation import navigation_routes
+
+
+def _llm_client(content="You have a test at 5 PM", delay=0.0):
+    async def create(**kwargs):
+        await asyncio.sleep(delay)
+        return MagicMock(choices=[MagicMock(message=MagicMock(content=content))])
+    client = MagicMock()
+    client.chat.completions.create = create
+    return client
+
+
+@pytest.fixture
+def flask_app():
+    app = Flask(__name__)
+    app.register_blueprint(navigation_routes)
+    return app
+
+
+async def _request(app, method, path, body=b"", query_string=b""):
+    scope = {"type": "http", "http_version": "1.1", "method": method, "path": path, "query_string": query_string,
+             "headers": [(b"content-type", b"application/json")]}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    payload = sent[1]["body"]
+    return sent[0]["status"], json.loads(payload) if payload else None
+
+
+def _post(app, path, data):
+    return _request(app, "POST", path, json.dumps(data).encode())
+
+
+def test_task_chat_awaits_async_client(flask_app):
+    app = AsyncApp(flask_app, llm_client=_llm_client())
+    status, data = asyncio.run(_post(app, '/chat/tasks', {'query': 'When is my task due?', 'tasks': []}))
+    assert status == 200 and data['response'] == 'You have a test at 5 PM'
+
+    status, data = asyncio.run(_post(app, '/chat/tasks', {'query': 'Hello there'}))
+    assert 'I can help you with your tasks' in data['response']
+    assert asyncio.run(_post(app, '/chat/tasks', {}))[0] == 400
+
+
+def test_task_chat_llm_failure(flask_app):
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(side_effect=TimeoutError("timed out"))
+    app = AsyncApp(flask_app, llm_client=client)
+    status, data = asyncio.run(_post(app, '/chat/tasks', {'query': 'What is my next deadline?'}))
+    assert status == 200 and 'encountered an error' in data['response']
+
+
+def test_navigation_chat_runs_graph_query_in_executor(flask_app):
+    app = AsyncApp(flask_app, graph_workers=1)
+    threads = []
+
+    def find_shortest_path(start_room, end_room):
+        threads.append(threading.current_thread().name)
+        return {"path": ["h1_109", "h1_110"], "distance": 3}
+
+    with patch('api.app.asgi.ai_nav') as ai_nav:
+        ai_nav.find_shortest_path.side_effect = find_shortest_path
+        status, data = asyncio.run(_post(app, '/chat/navigation', {'query': 'How to go from H 109 to H 110'}))
+    assert status == 200 and 'Total distance: 3.0 meters' in data['response']
+    ai_nav.find_shortest_path.assert_called_with('h1_109', 'h1_110')
+    assert threads[0].startswith('graph')
+
+    status, data = asyncio.run(_post(app, '/chat/navigation', {'query': 'Where should I eat?'}))
+    assert "couldn't identify the rooms" in data['response']
+
+
+def test_navigation_chat_interpret_failure(flask_app):
+    app = AsyncApp(flask_app)
+    with patch('api.app.asgi.ai_nav') as ai_nav, \
+            patch('api.app.asgi.interpret_path', side_effect=ValueError('bad path')):
+        ai_nav.find_shortest_path.return_value = {"path": ["h1_109", "h1_110"], "distance": 3}
+        status, data = asyncio.run(_post(app, '/chat/navigation', {'query': 'How to go from H 109 to H 110'}))
+    assert status == 500
+    assert data == {"error": "Failed to process navigation request", "details": "bad path"}
+
+
+async def _lifespan(app):
+    messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message["type"])
+
+    await app({"type": "lifespan"}, receive, send)
+    return sent
+
+
+def test_task_chat_shares_one_client_closed_at_shutdown(flask_app):
+    client = _llm_client()
+    client.close = AsyncMock()
+    app = AsyncApp(flask_app)
+
+    async def scenario():
+        with patch('api.app.asgi.async_openai_client', return_value=client) as make_client:
+            for _ in range(3):
+                status, data = await _post(app, '/chat/tasks', {'query': 'When is my task due?'})
+                assert status == 200 and data['response'] == 'You have a test at 5 PM'
+        make_client.assert_called_once()
+        return await _lifespan(app)
+
+    assert asyncio.run(scenario()) == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    client.close.assert_awaited_once()
+    assert app.llm_client is None
+
+
+def test_other_routes_go_to_flask(flask_app):
+    app = AsyncApp(flask_app)
+    status, data = asyncio.run(_request(app, "GET", '/health'))
+    assert status == 200 and data['service'] == 'navigation'
+    status, data = asyncio.run(_request(app, "GET", '/indoorNavigation',
+                                        query_string=b'startId=h2_209&endId=h8_803&campus=hall'))
+    assert status == 200 and data['path']['path'][-1] == 'h8_803'
+
+
+def test_slow_llm_calls_do_not_stall_navigation(flask_app):
+    app = AsyncApp(flask_app, wsgi_workers=2, llm_client=_llm_client(delay=0.5))
+
+    async def scenario():
+        chats = [asyncio.create_task(_post(app, '/chat/tasks', {'query': 'Any deadline today?'})) for _ in range(8)]
+        await asyncio.sleep(0.05)
+        health = await asyncio.wait_for(_request(app, "GET", '/health'), timeout=0.3)
+        assert not any(chat.done() for chat in chats)
+        return health, await asyncio.gather(*chats)
+
+    health, chats = asyncio.run(scenario())
+    assert health[0] == 200
+    assert all(status == 200 for status, _ in chats)
+
+
+def test_flask_requests_run_in_parallel_up_to_the_limit(flask_app):
+    @flask_app.route('/slow')
+    def slow():
+        time.sleep(0.2)
+        return jsonify({"thread": threading.current_thread().name})
+
+    app = AsyncApp(flask_app, wsgi_workers=2)
+
+    async def scenario():
+        started = time.perf_counter()
+        results = await asyncio.gather(*[_request(app, "GET", '/slow') for _ in range(4)])
+        return time.perf_counter() - started, results
+
+    elapsed, results = asyncio.run(scenario())
+    assert all(status == 200 for status, _ in results)
+    # two at a time: two rounds of 0.2 s, not one and not four
+    assert 0.35 < elapsed < 0.7
@@ -0,0 +1,31 @@
+import networkx as nx
+from api.app.graph.Graph2 import Graph
+from api.benchmarks.synthetic import generate_building, write_building, CONNECTORS
+from api.benchmarks.suite import bench_size, format_report
+
+
+def test_generated_building_matches_campus_schema(tmp_path):
+    files = generate_building(300, floors=3, seed=1)
+    assert sorted(files) == ["map_s_1.json", "map_s_2.json", "map_s_3.json"]
+    for data in files.values():
+        assert data["scale_factor"] == 0.05
+        assert all(set(node) == {"id", "x", "y", "floor_number", "poi_type"} for node in data["nodes"])
+        assert all(len(edge) == 2 for edge in data["edges"])
+
+    write_building(tmp_path, 300, floors=3, seed=1)
+    graph = Graph()
+    graph.load_from_json_folder(tmp_path)
+    assert 250 <= graph.graph_var.number_of_nodes() <= 300
+    assert nx.is_connected(graph.graph_var)
+    for connector in CONNECTORS:
+        assert graph.graph_var.has_edge(f"s1_{connector}", f"s2_{connector}")
+    assert generate_building(300, floors=3, seed=1) == files
+
+
+def test_bench_size_reports_every_operation(tmp_path):
+    result = bench_size(tmp_path / "synthetic", 100, queries=3, skip=("yen_k_shortest_paths",))
+    assert result["find_shortest_path"]["runs"] == 3
+    assert "yen_k_shortest_paths" not in result
+    assert result["peak_memory_mib"]["load"] > 0
+    assert result["find_paths_to_multiple_destinations"]["p50"] <= result["find_paths_to_multiple_destinations"]["max"]
+    assert "find_shortest_path_astar" in format_report([result])
@@ -0,0 +1,84 @@
+import pytest
+from pathlib import Path
+from api.app.graph.Graph2 import Graph
+from api.app.graph.buildings import BuildingNetwork, building_of, connector_costs, connector_seconds, load_connectors
+from api.app.graph.timing import TimeModel
+
+CAMPUS_PATH = Path(__file__).resolve().parent.parent / 'app/data/campus_jsons'
+
+
+@pytest.fixture
+def network():
+    loaded = {}
+
+    def graph_for(building):
+        if building not in loaded:
+            if not (CAMPUS_PATH / building).exists():
+                return None
+            loaded[building] = Graph()
+            loaded[building].load_from_json_folder(CAMPUS_PATH / building)
+        return loaded[building]
+
+    return BuildingNetwork(graph_for, load_connectors(CAMPUS_PATH)), loaded
+
+
+@pytest.mark.parametrize("node_id, building", [
+    ("h8_803", "hall"), ("h1_escalator_to_tunnel", "hall"), ("mb_s2_metro", "mb"),
+    ("cc_119", "cc"), ("x_101", None), ("", None)
+])
+def test_building_of(node_id, building):
+    assert building_of(node_id) == building
+
+
+def test_same_building_loads_only_that_building(network):
+    buildings, loaded = network
+    result = buildings.find_shortest_path("h2_209", "h8_803")
+    assert result == loaded["hall"].find_shortest_path("h2_209", "h8_803")
+    assert list(loaded) == ["hall"]
+
+
+def test_cross_building_route_uses_tunnel(network):
+    buildings, loaded = network
+    result = buildings.find_shortest_path("h8_803", "mb_1_338")
+    path = result["path"]
+    assert path[0] == "h8_803" and path[-1] == "mb_1_338"
+    tunnel = path.index("h1_escalator_to_tunnel")
+    assert path[tunnel + 1] == "mb_s2_metro"
+
+    hall_leg = loaded["hall"].find_shortest_path("h8_803", "h1_escalator_to_tunnel")
+    mb_leg = loaded["mb"].find_shortest_path("mb_s2_metro", "mb_1_338")
+    assert result["weight"] == pytest.approx(hall_leg["weight"] + 115 + mb_leg["weight"])
+    assert result["distance"] == pytest.approx(hall_leg["distance"] + 105 + mb_leg["distance"])
+
+
+def test_unconnected_building_is_never_loaded(network):
+    buildings, loaded = network
+    assert buildings.find_shortest_path("h8_803", "cc_119") is None
+    assert "cc" not in loaded
+    assert buildings.find_shortest_path("h8_803", "x_101") is None
+
+
+def test_cross_building_respects_profile(network):
+    buildings, _ = network
+    # the only connector starts at an escalator
+    assert buildings.find_shortest_path("h8_803", "mb_1_338", profile="elevator_only") is None
+
+
+def test_connector_costs_from_segments():
+    connector = {"from": "a", "to": "b",
+                 "segments": [{"type": "escalator", "floors": 1}, {"type": "walk", "length_m": 100}]}
+    assert connector_costs(connector) == (115.0, 105.0)
+    assert connector_costs({"from": "a", "to": "b", "weight": 7, "distance": 3}) == (7.0, 3.0)
+
+    model = TimeModel()
+    assert connector_seconds(connector, model) == pytest.approx(15 + 100 / model.walking_speed())
+
+
+def test_cross_building_rank_by_time(network):
+    buildings, loaded = network
+    by_weight = buildings.find_shortest_path("h8_803", "mb_1_338", hour=7)
+    fastest = buildings.find_shortest_path("h8_803", "mb_1_338", "time", hour=7)
+    assert fastest["path"][-1] == "mb_1_338"
+    assert fastest["eta_seconds"] == pytest.approx(buildings.eta(fastest["path"], hour=7))
+    assert fastest["eta_seconds"] <= buildings.eta(by_weight["path"], hour=7)
+    assert [building for building, _ in buildings.split(fastest["path"])] == ["hall", "mb"]
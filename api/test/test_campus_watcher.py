@@ -0,0 +1,79 @@
+import os
+import shutil
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+from api.app.campus_watcher import CampusWatcher
+
+HALL_PATH = Path(__file__).resolve().parent.parent / 'app/data/campus_jsons/hall'
+
+
+def _touch(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_poll_reports_only_changed_campuses(tmp_path):
+    shutil.copytree(HALL_PATH, tmp_path / 'hall')
+    (tmp_path / 'mb').mkdir()
+    (tmp_path / 'mb' / 'map_mb_1.json').write_text('{"nodes": [], "edges": []}')
+    on_change = MagicMock()
+    watcher = CampusWatcher(tmp_path, on_change)
+
+    assert watcher.poll() == []
+    _touch(tmp_path / 'hall' / 'map_hall_8.json')
+    assert watcher.poll() == ['hall']
+    on_change.assert_called_once_with('hall')
+
+    (tmp_path / 'mb' / 'map_mb_s2.json').write_text('{"nodes": [], "edges": []}')
+    (tmp_path / 'notes.txt').write_text('ignored')
+    assert watcher.poll() == ['mb']
+    assert watcher.poll() == []
+
+
+def test_failed_reload_is_logged_not_raised(tmp_path):
+    shutil.copytree(HALL_PATH, tmp_path / 'hall')
+    watcher = CampusWatcher(tmp_path, MagicMock(side_effect=ValueError("bad map")))
+    _touch(tmp_path / 'hall' / 'map_hall_1.json')
+    with patch('api.app.campus_watcher.logger') as mock_logger:
+        assert watcher.poll() == ['hall']
+    mock_logger.error.assert_called_once()
+
+
+def test_reload_swaps_graph_and_keeps_old_one_usable(tmp_path):
+    from api.app import navigation
+    shutil.copytree(HALL_PATH, tmp_path / 'hall')
+    registry = navigation.registry
+    with patch.object(registry, '_base_path', tmp_path), patch.dict(registry._graphs, clear=True):
+        old = registry.get('hall')
+        old.close_node('h8_elevator')
+        navigation.route_cache.put(('hall', 'h2_209', 'h8_803', 'default', old.version), ('{}', 200))
+
+        new = navigation.reload_campus('hall')
+        assert registry.peek('hall') is new and new is not old
+        assert navigation.ai_nav._graph('hall') is new
+        assert new.version != old.version
+        assert new.closed_nodes == {'h8_elevator'}
+        assert navigation.route_cache.get(('hall', 'h2_209', 'h8_803', 'default', old.version)) is None
+        # a request that picked up the old graph can still finish on it
+        assert old.find_shortest_path('h2_209', 'h8_803')['path'][-1] == 'h8_803'
+
+        assert navigation.reload_campus('mb') is None
+
+
+def test_create_app_starts_the_watcher_once():
+    import api.app as app_module
+    from api.app.graph_registry import registry
+    with patch.dict(app_module._background, clear=True), \
+            patch('api.app.campus_watcher.CampusWatcher.start') as start, \
+            patch('api.app.navigation.start_warm_up') as warm_up:
+        assert 'campus_watcher' not in app_module.create_app({'TESTING': True, 'CAMPUS_HOT_RELOAD': True}).extensions
+        start.assert_not_called()
+        warm_up.assert_not_called()
+
+        helpers = {'CAMPUS_WARM_UP': True, 'CAMPUS_HOT_RELOAD': True}
+        first = app_module.create_app(helpers).extensions['campus_watcher']
+        second = app_module.create_app(helpers).extensions['campus_watcher']
+        assert first is second
+        assert first.base_path == str(registry.base_path)
+        start.assert_called_once()
+        warm_up.assert_called_once()
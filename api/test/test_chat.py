@@ -33,6 +33,13 @@ def test_extract_rooms_found():
     assert end == "h2_205"
 
 
+def test_extract_rooms_across_buildings():
+    assert extract_rooms("How do I get from H-820 to MB 1.338?") == ("h8_820", "mb_1_338")
+    assert extract_rooms("from MB S2.273 to CC-119") == ("mb_s2_273", "cc_119")
+    assert extract_rooms("cc 119 to h 920") == ("cc_119", "h9_920")
+    assert is_navigation_query("Directions from MB 1.338 to CC-119")
+
+
 def test_extract_rooms_not_found():
     query = "Where’s the cafeteria?"
     start, end = extract_rooms(query)
@@ -144,6 +151,13 @@ def test_handle_follow_up_with_distance():
     assert "minutes" in result
 
 
+def test_handle_follow_up_uses_eta():
+    context = NavigationContext()
+    context.last_navigation = {"distance": 84, "eta_seconds": 120}
+    result = handle_follow_up("how long does it take", context)
+    assert "2.0 minutes" in result
+
+
 def test_handle_follow_up_no_context():
     context = NavigationContext()
     result = handle_follow_up("how long does it take", context)
@@ -0,0 +1,48 @@
+import pytest
+from pathlib import Path
+from api.app.graph.Graph2 import Graph
+from api.app.graph.compact import encode_polyline, decode_polyline, compact_payload
+
+HALL_PATH = Path(__file__).resolve().parent.parent / 'app/data/campus_jsons/hall'
+
+
+@pytest.fixture(scope="module")
+def hall():
+    graph = Graph()
+    graph.load_from_json_folder(HALL_PATH)
+    graph.compile()
+    return graph
+
+
+def test_polyline_round_trip():
+    points = [(775.2, 92.38, 0), (775.25, 100.0, 0), (12.0, 3.5, 2)]
+    encoded = encode_polyline(points)
+    assert encoded[:3] == [77520, 9238, 0]
+    assert encoded[3:6] == [5, 762, 0]
+    assert decode_polyline(encoded) == points
+    assert encode_polyline([]) == []
+
+
+def test_compact_single_path(hall):
+    route = hall.find_shortest_path("h2_209", "h8_803")
+    compact = compact_payload(hall.compiled, hall.version, {"path": route})
+    compiled = hall.compiled
+
+    assert [compiled.node_ids[i] for i in compact["nodes"]] == route["path"]
+    floors = [compact["floors"][f] for _, _, f in decode_polyline(compact["polyline"])]
+    assert floors == [hall.graph_var.nodes[node_id]["floor_number"] for node_id in route["path"]]
+    assert compact["legs"] == [{"destination": "h8_803", "distance": route["distance"], "end": len(route["path"]) - 1}]
+    assert compact["total_distance"] == route["distance"]
+    assert compact["layout"] == compiled.profile("elevator_only").layout_tag()
+
+
+def test_compact_multiple_destinations(hall):
+    result = hall.find_paths_to_multiple_destinations("h2_209", ["h8_803", "invalid", "h9_907"])
+    compact = compact_payload(hall.compiled, hall.version, result)
+    node_ids = [hall.compiled.node_ids[i] for i in compact["nodes"]]
+
+    first, missing, second = compact["legs"]
+    assert missing == {"destination": "invalid", "error": "No path found or invalid destination"}
+    assert node_ids[:first["end"] + 1] == result["paths"][0]["path"]
+    assert node_ids[first["end"]:second["end"] + 1] == result["paths"][2]["path"]
+    assert compact["total_distance"] == result["total_distance"]
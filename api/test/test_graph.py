@@ -0,0 +1,488 @@
+import numpy as np
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+from api.app.graph import Graph2
+from api.app.graph.Graph2 import Graph
+from api.app.graph.all_pairs import AllPairsTable
+
+HALL_PATH = Path(__file__).resolve().parent.parent / 'app/data/campus_jsons/hall'
+
+
+@pytest.fixture(scope="module")
+def hall_graph():
+    graph = Graph()
+    graph.load_from_json_folder(HALL_PATH)
+    return graph
+
+
+@pytest.fixture(scope="module")
+def compiled_hall_graph():
+    graph = Graph()
+    graph.load_from_json_folder(HALL_PATH)
+    graph.compile()
+    return graph
+
+
+# ------------------ Compiled (CSR) mode ------------------
+
+def test_compile_builds_csr_arrays(compiled_hall_graph):
+    compiled = compiled_hall_graph.compiled
+    assert compiled.num_nodes == compiled_hall_graph.graph_var.number_of_nodes()
+    assert compiled.num_edges == compiled_hall_graph.graph_var.number_of_edges()
+    assert compiled.offsets[-1] == len(compiled.neighbors)
+    assert compiled.weights.dtype.name == 'float32'
+    assert compiled.distances.dtype.name == 'float32'
+
+
+@pytest.mark.parametrize("start, end", [
+    ("h2_209", "h2_260"),
+    ("h2_209", "h8_803"),
+    ("h1_elevator", "h9_elevator"),
+    ("h8_860_01", "h8_803"),
+])
+def test_compiled_matches_networkx(hall_graph, compiled_hall_graph, start, end):
+    expected = hall_graph.find_shortest_path(start, end)
+    result = compiled_hall_graph.find_shortest_path(start, end)
+
+    assert result["path"] == expected["path"]
+    assert result["distance"] == pytest.approx(expected["distance"], rel=1e-4)
+    assert result["weight"] == pytest.approx(expected["weight"], rel=1e-4)
+
+
+def test_compiled_unknown_node(compiled_hall_graph):
+    assert compiled_hall_graph.find_shortest_path("invalid_start", "h2_209") is None
+
+
+def test_load_parses_each_file_once():
+    graph = Graph()
+    with patch.object(Graph, '_parse_file', wraps=graph._parse_file) as spy:
+        graph.load_from_json_folder(HALL_PATH)
+
+    assert spy.call_count == 4
+    assert "h2_stairs_to_h1" in graph.get_neighbors("h1_stairs_up_2")
+    assert graph.graph_var.number_of_nodes() == 300
+
+
+def test_add_edge_drops_compiled_snapshot():
+    graph = Graph()
+    graph.add_node({"id": "a", "x": 0, "y": 0, "floor_number": "1", "poi_type": "room"})
+    graph.add_node({"id": "b", "x": 10, "y": 0, "floor_number": "1", "poi_type": "room"})
+    graph.compile()
+    assert graph.find_shortest_path("a", "b") is None
+
+    graph.add_edge("a", "b")
+    assert graph.compiled is None
+    assert graph.find_shortest_path("a", "b")["path"] == ["a", "b"]
+
+
+# ------------------ A* ------------------
+
+@pytest.mark.parametrize("start, end", [
+    ("h8_860_01", "h8_803"),
+    ("h2_209", "h8_803"),
+    ("h9_elevator", "h1_elevator"),
+    ("h1_stairs_up_2", "h9_stairs_up_3"),
+])
+def test_astar_matches_dijkstra_cost(compiled_hall_graph, start, end):
+    dijkstra = compiled_hall_graph.find_shortest_path(start, end)
+    astar = compiled_hall_graph.find_shortest_path(start, end, method="astar")
+
+    assert astar["path"][0] == start and astar["path"][-1] == end
+    assert astar["weight"] == pytest.approx(dijkstra["weight"], rel=1e-5)
+
+
+def test_floor_heuristic_is_admissible(compiled_hall_graph):
+    compiled = compiled_hall_graph.compiled
+    target = compiled.index["h8_803"]
+    bound = compiled.floor_heuristic(target)
+
+    for node_id in ["h8_860_01", "h9_elevator", "h2_209", "h1_hw1"]:
+        exact = compiled_hall_graph.find_shortest_path(node_id, "h8_803")["weight"]
+        assert bound[compiled.index[node_id]] <= exact
+
+
+def test_astar_compiles_on_demand():
+    graph = Graph()
+    graph.load_from_json_folder(HALL_PATH)
+    result = graph.find_paths_to_multiple_destinations("h2_209", ["h8_803", "h8_860_01"], method="astar")
+
+    assert graph.compiled is not None
+    assert [leg["destination"] for leg in result["paths"]] == ["h8_803", "h8_860_01"]
+
+
+# ------------------ All-pairs tables ------------------
+
+@pytest.fixture(scope="module")
+def tabled_hall_graph():
+    graph = Graph()
+    graph.load_from_json_folder(HALL_PATH)
+    graph.precompute_all_pairs()
+    return graph
+
+
+@pytest.mark.parametrize("start, end", [
+    ("h2_209", "h2_260"),
+    ("h2_209", "h8_803"),
+    ("h9_elevator", "h1_hw1"),
+])
+def test_all_pairs_matches_search(compiled_hall_graph, tabled_hall_graph, start, end):
+    expected = compiled_hall_graph.find_shortest_path(start, end)
+    result = tabled_hall_graph.find_shortest_path(start, end)
+
+    assert result["path"][0] == start and result["path"][-1] == end
+    assert result["weight"] == pytest.approx(expected["weight"], rel=1e-5)
+    assert result["distance"] == pytest.approx(expected["distance"], rel=1e-5)
+
+    graph = tabled_hall_graph.graph_var
+    walked = sum(graph[u][v]["distance"] for u, v in zip(result["path"], result["path"][1:]))
+    assert walked == pytest.approx(result["distance"], rel=1e-4)
+
+
+def test_shortest_distance_skips_path_reconstruction(tabled_hall_graph):
+    with patch.object(tabled_hall_graph.all_pairs["default"], "path") as mock_path:
+        costs = tabled_hall_graph.shortest_distance("h2_209", "h8_803")
+    mock_path.assert_not_called()
+    assert costs["distance"] > 0
+    assert tabled_hall_graph.shortest_distance("h2_209", "invalid_end") is None
+
+
+@pytest.mark.parametrize("method", ["astar", "portals"])
+def test_tables_do_not_override_requested_method(tabled_hall_graph, method):
+    expected = tabled_hall_graph.find_shortest_path("h2_209", "h8_803")
+    with patch.object(tabled_hall_graph.all_pairs["default"], "find_shortest_path") as from_table:
+        result = tabled_hall_graph.find_shortest_path("h2_209", "h8_803", method=method)
+        legs = tabled_hall_graph.find_paths_to_multiple_destinations("h2_209", ["h8_803", "h1_hw1"], method,
+                                                                     optimize_order=True)
+    from_table.assert_not_called()
+    assert result["weight"] == pytest.approx(expected["weight"], rel=1e-5)
+    assert all("path" in leg for leg in legs["paths"])
+
+
+# ------------------ Floor/portal hierarchy ------------------
+
+@pytest.fixture(scope="module")
+def portal_hall_graph():
+    graph = Graph()
+    graph.load_from_json_folder(HALL_PATH)
+    graph.build_portal_router()
+    return graph
+
+
+def test_portal_router_collects_connectors(portal_hall_graph):
+    router = portal_hall_graph.portal_routers["default"]
+    compiled = portal_hall_graph.compiled
+    portal_ids = {compiled.node_ids[p] for p in router.portals}
+
+    assert {"h8_escalator_to_h9", "h1_stairs_up_2", "h9_elevator"} <= portal_ids
+    assert "h8_803" not in portal_ids
+    assert set(router.floor_graphs) == set(range(len(compiled.floors)))
+
+
+@pytest.mark.parametrize("start, end", [
+    ("h2_209", "h8_803"),
+    ("h8_860_01", "h8_803"),
+    ("h1_hw1", "h9_elevator"),
+    ("h9_stairs_up_3", "h2_209"),
+])
+def test_portal_router_matches_dijkstra(compiled_hall_graph, portal_hall_graph, start, end):
+    expected = compiled_hall_graph.find_shortest_path(start, end)
+    result = portal_hall_graph.find_shortest_path(start, end, method="portals")
+
+    assert result["weight"] == pytest.approx(expected["weight"], rel=1e-5)
+    assert result["path"][0] == start and result["path"][-1] == end
+    graph = portal_hall_graph.graph_var
+    assert all(graph.has_edge(u, v) for u, v in zip(result["path"], result["path"][1:]))
+
+
+def test_portal_router_unknown_node(portal_hall_graph):
+    assert portal_hall_graph.find_shortest_path("h2_209", "invalid_end", method="portals") is None
+
+
+# ------------------ Visit order optimization ------------------
+
+def test_optimize_order_saves_distance(compiled_hall_graph):
+    destinations = ["h8_803", "h2_260", "h9_elevator", "h2_209"]
+    given = compiled_hall_graph.find_paths_to_multiple_destinations("h1_hw1", destinations)
+    result = compiled_hall_graph.find_paths_to_multiple_destinations("h1_hw1", destinations, optimize_order=True)
+
+    assert result["given_order"] == destinations
+    assert result["given_distance"] == pytest.approx(given["total_distance"], rel=1e-5)
+    assert result["total_distance"] == pytest.approx(result["optimized_distance"], rel=1e-5)
+    assert result["distance_saved"] == pytest.approx(given["total_distance"] - result["total_distance"], rel=1e-4)
+    assert result["distance_saved"] > 0
+
+
+def test_optimize_order_by_time_minimises_seconds(compiled_hall_graph):
+    destinations = ["h8_803", "h2_260", "h9_elevator", "h2_209"]
+    result = compiled_hall_graph.find_paths_to_multiple_destinations("h1_hw1", destinations, method="time",
+                                                                     optimize_order=True, hour=12)
+    given = compiled_hall_graph.find_paths_to_multiple_destinations("h1_hw1", destinations, method="time", hour=12)
+    eta = lambda payload: sum(compiled_hall_graph.eta(leg["path"], hour=12) for leg in payload["paths"])
+
+    assert "given_distance" not in result
+    assert result["given_seconds"] == pytest.approx(eta(given), rel=1e-5)
+    assert result["optimized_seconds"] == pytest.approx(eta(result), rel=1e-5)
+    assert result["seconds_saved"] >= 0
+
+
+def test_optimize_order_keeps_unreachable_last(compiled_hall_graph):
+    result = compiled_hall_graph.find_paths_to_multiple_destinations(
+        "h2_209", ["invalid_dest", "h8_803", "h2_260"], optimize_order=True)
+
+    assert result["optimized_order"][-1] == "invalid_dest"
+    assert "error" in result["paths"][-1]
+
+
+# ------------------ Batch queries ------------------
+
+def test_find_paths_batch_groups_by_start(compiled_hall_graph):
+    pairs = [("h2_209", "h8_803"), ("h9_elevator", "h2_260"), ("h2_209", "h2_260"), ("invalid", "h2_260")]
+    with patch.object(compiled_hall_graph.compiled, "single_source",
+                      wraps=compiled_hall_graph.compiled.single_source) as spy:
+        results = compiled_hall_graph.find_paths_batch(pairs)
+
+    assert spy.call_count == 2
+    for (start, end), result in zip(pairs[:3], results):
+        expected = compiled_hall_graph.find_shortest_path(start, end)
+        assert result["weight"] == pytest.approx(expected["weight"], rel=1e-5)
+        assert result["path"][0] == start and result["path"][-1] == end
+    assert results[3] is None
+
+
+# ------------------ Nearest facility ------------------
+
+@pytest.mark.parametrize("poi_type", ["bathroom", "water", "elevator", "stairs"])
+def test_nearest_facility_matches_exhaustive_search(compiled_hall_graph, poi_type):
+    from api.app.graph.facilities import FACILITY_TYPES
+    graph = compiled_hall_graph.graph_var
+    facilities = [n for n, data in graph.nodes(data=True) if data["poi_type"] in FACILITY_TYPES[poi_type]]
+
+    result = compiled_hall_graph.find_nearest_facility("h2_209", poi_type)
+    best = min(compiled_hall_graph.find_shortest_path("h2_209", f)["weight"] for f in facilities)
+
+    assert result["weight"] == pytest.approx(best, rel=1e-5)
+    assert result["path"][0] == "h2_209"
+    assert result["path"][-1] == result["facility"]
+
+
+def test_nearest_facility_unknown(compiled_hall_graph):
+    assert compiled_hall_graph.find_nearest_facility("invalid", "water") is None
+    assert compiled_hall_graph.find_nearest_facility("h2_209", "cafeteria") is None
+
+
+# ------------------ Spatial snapping ------------------
+
+def test_snap_to_node_stays_on_floor(compiled_hall_graph):
+    snapped = compiled_hall_graph.snap_to_node(745.8, 504.0, "8")
+    assert snapped["id"] == "h8_860_01"
+    assert snapped["offset"] < 0.01
+
+    other_floor = compiled_hall_graph.snap_to_node(745.8, 504.0, "9")
+    assert other_floor["id"].startswith("h9_")
+    assert compiled_hall_graph.snap_to_node(0, 0, "42") is None
+
+
+# ------------------ Routing profiles ------------------
+
+@pytest.mark.parametrize("start, end", [("h2_209", "h8_803"), ("h1_escalator_to_h2", "h9_907"), ("h8_803", "h2_209")])
+def test_elevator_only_matches_filtered_networkx(compiled_hall_graph, start, end):
+    import networkx as nx
+    nx_graph = compiled_hall_graph.graph_var
+    blocked = {n for n, data in nx_graph.nodes(data=True) if data["poi_type"] in ("stairs", "escalator")}
+    allowed = nx_graph.edge_subgraph((u, v) for u, v in nx_graph.edges if u not in blocked and v not in blocked)
+
+    result = compiled_hall_graph.find_shortest_path(start, end, profile="elevator_only")
+    if start in blocked:
+        assert result is None
+        return
+    expected = nx.shortest_path_length(allowed, start, end, weight="weight")
+    assert result["weight"] == pytest.approx(expected, rel=1e-5)
+    assert not blocked.intersection(result["path"])
+
+
+def test_profile_view_shares_arrays(compiled_hall_graph):
+    compiled = compiled_hall_graph.compiled
+    view = compiled.profile("no_stairs")
+    assert view is compiled.profile("no_stairs")
+    assert view.profile("default") is compiled
+    assert view.neighbors is compiled.neighbors and view.distances is compiled.distances
+    assert not view.edge_mask.all()
+    assert (view.weights[view.edge_mask] == compiled.weights[view.edge_mask]).all()
+    with pytest.raises(ValueError):
+        compiled.profile("teleport_only")
+
+
+def test_profile_tables_are_separate(tabled_hall_graph):
+    default = tabled_hall_graph.shortest_distance("h2_209", "h8_803")
+    accessible = tabled_hall_graph.shortest_distance("h2_209", "h8_803", profile="elevator_only")
+    assert "elevator_only" not in tabled_hall_graph.all_pairs
+    assert accessible["weight"] >= default["weight"]
+
+
+# ------------------ Reachability ------------------
+
+@pytest.mark.parametrize("budget", [0, 12.5, 30, 80])
+def test_reachable_within_matches_networkx_cutoff(compiled_hall_graph, budget):
+    import networkx as nx
+    expected = nx.single_source_dijkstra_path_length(
+        compiled_hall_graph.graph_var, "h8_803", cutoff=budget, weight="distance")
+    floors = compiled_hall_graph.reachable_within("h8_803", budget)
+    reached = {node["id"]: node["distance"] for nodes in floors.values() for node in nodes}
+    assert set(reached) == set(expected)
+    for node_id, distance in reached.items():
+        assert distance == pytest.approx(expected[node_id], abs=1e-3)
+        assert compiled_hall_graph.graph_var.nodes[node_id]["floor_number"] in floors
+
+
+def test_reachable_within_by_weight_and_profile(compiled_hall_graph):
+    floors = compiled_hall_graph.reachable_within("h8_803", 60, by="weight")
+    costs = [node["weight"] for node in floors["8"]]
+    assert costs == sorted(costs) and costs[-1] <= 60
+
+    accessible = compiled_hall_graph.reachable_within("h8_803", 200, profile="elevator_only", by="weight")
+    assert not any(node["poi_type"] in ("stairs", "escalator") for nodes in accessible.values() for node in nodes)
+    assert compiled_hall_graph.reachable_within("invalid", 10) is None
+
+
+# ------------------ Runtime closures ------------------
+
+def test_close_and_reopen_node(hall_copy):
+    graph = Graph()
+    graph.load_from_json_folder(hall_copy)
+    graph.precompute_all_pairs()
+    version = graph.version
+    before = graph.find_shortest_path("h2_209", "h8_803")
+
+    assert graph.close_node("h8_escalator_from_h7")
+    assert not graph.close_node("h8_escalator_from_h7")
+    assert "default" in graph.all_pairs
+    detour = graph.find_shortest_path("h2_209", "h8_803")
+    assert "h8_escalator_from_h7" not in detour["path"]
+    assert detour["weight"] > before["weight"]
+    assert graph.version == version
+
+    assert graph.reopen_node("h8_escalator_from_h7")
+    assert graph.find_shortest_path("h2_209", "h8_803")["path"] == before["path"]
+
+
+def _assert_matches_fresh_tables(graph, profile):
+    """Patched tables answer every pair like tables built from scratch on the current closures"""
+    patched = graph.all_pairs[profile]
+    fresh = AllPairsTable(graph.routing_graph(profile))
+    np.testing.assert_allclose(patched.weights, fresh.weights, rtol=1e-5)
+    np.testing.assert_allclose(patched.distances, fresh.distances, rtol=1e-5)
+    compiled = patched.compiled
+    for target in range(0, compiled.num_nodes, 29):
+        for source in range(0, compiled.num_nodes, 13):
+            path = patched.path(source, target)
+            if path is not None:
+                assert compiled.path_weight(path) == pytest.approx(float(patched.weights[target, source]), rel=1e-4)
+
+
+@pytest.mark.parametrize("close, reopen, element", [
+    ("close_node", "reopen_node", ("h8_escalator_from_h7",)),
+    ("close_node", "reopen_node", ("h8_elevator",)),
+    ("close_edge", "reopen_edge", ("h8_hw17", "h8_hw16")),
+])
+def test_closures_patch_all_pairs_tables(compiled_hall_graph, close, reopen, element):
+    graph = Graph()
+    graph.graph_var = compiled_hall_graph.graph_var
+    for profile in ("default", "no_stairs"):
+        graph.precompute_all_pairs(profile)
+
+    getattr(graph, close)(*element)
+    for profile in ("default", "no_stairs"):
+        _assert_matches_fresh_tables(graph, profile)
+    getattr(graph, reopen)(*element)
+    for profile in ("default", "no_stairs"):
+        _assert_matches_fresh_tables(graph, profile)
+
+
+def test_closure_keeps_tables_of_profiles_it_does_not_touch(compiled_hall_graph):
+    graph = Graph()
+    graph.graph_var = compiled_hall_graph.graph_var
+    accessible = graph.precompute_all_pairs("elevator_only")
+    index = graph.build_spatial_index("elevator_only")
+    stairs = next(node for node, data in graph.graph_var.nodes(data=True) if data["poi_type"] == "stairs")
+
+    assert graph.close_node(stairs)
+    assert graph.all_pairs["elevator_only"] is accessible
+    assert graph.spatial_indexes["elevator_only"] is index
+
+
+def test_closure_during_table_build_is_not_lost(compiled_hall_graph, monkeypatch):
+    graph = Graph()
+    graph.graph_var = compiled_hall_graph.graph_var
+    graph.compile()
+    build = Graph2.AllPairsTable
+
+    def build_while_closing(view):
+        table = build(view)
+        # an admin closes the elevator while the pre-closure table is being built
+        graph.close_node("h8_elevator")
+        return table
+
+    monkeypatch.setattr(Graph2, "AllPairsTable", build_while_closing)
+    graph.precompute_all_pairs("no_stairs")
+
+    assert "no_stairs" not in graph.all_pairs
+    assert "h8_elevator" not in graph.find_shortest_path("h8_803", "h1_hw1", profile="no_stairs")["path"]
+
+
+def test_close_edge_applies_to_profiles(compiled_hall_graph):
+    graph = Graph()
+    graph.graph_var = compiled_hall_graph.graph_var
+    graph.close_edge("h8_hw17", "h8_hw16")
+    assert graph.closures() == [("h8_hw16", "h8_hw17")]
+    for profile in ("default", "elevator_only"):
+        path = graph.find_shortest_path("h2_209", "h8_803", profile=profile)["path"]
+        assert ("h8_hw16", "h8_hw17") not in zip(path, path[1:])
+    assert all(["h8_hw16", "h8_hw17"] != sorted(pair) for result in graph.yen_k_shortest_paths("h2_209", "h8_803")
+               for pair in zip(result["path"], result["path"][1:]))
+
+    with pytest.raises(ValueError):
+        graph.close_edge("h8_hw17", "h2_209")
+    with pytest.raises(ValueError):
+        graph.close_node("invalid")
+
+
+# ------------------ Compiled snapshots ------------------
+
+@pytest.fixture
+def hall_copy(tmp_path):
+    import shutil
+    folder = tmp_path / 'hall'
+    shutil.copytree(HALL_PATH, folder)
+    return folder
+
+
+def test_snapshot_round_trip(hall_copy, compiled_hall_graph):
+    first = Graph()
+    first.load_from_json_folder(hall_copy, snapshot=True)
+    assert (hall_copy.parent / 'hall.snapshot.graph').exists()
+
+    restored = Graph()
+    with patch.object(Graph, '_parse_file') as mock_parse:
+        restored.load_from_json_folder(hall_copy, snapshot=True)
+    mock_parse.assert_not_called()
+
+    assert restored.compiled.node_ids == compiled_hall_graph.compiled.node_ids
+    assert restored.graph_var.number_of_edges() == compiled_hall_graph.graph_var.number_of_edges()
+    assert restored.find_shortest_path("h2_209", "h8_803") == compiled_hall_graph.find_shortest_path("h2_209", "h8_803")
+    assert restored.graph_var.nodes["h8_803"]["poi_type"] == "room"
+    assert restored.find_shortest_path("h2_209", "h8_803", profile="elevator_only") == \
+        compiled_hall_graph.find_shortest_path("h2_209", "h8_803", profile="elevator_only")
+
+
+def test_snapshot_invalidated_by_source_change(hall_copy):
+    import os
+    Graph().load_from_json_folder(hall_copy, snapshot=True)
+    source = hall_copy / 'map_hall_8.json'
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    reloaded = Graph()
+    with patch.object(Graph, '_parse_file', wraps=reloaded._parse_file) as spy:
+        reloaded.load_from_json_folder(hall_copy, snapshot=True)
+    assert spy.call_count == 4
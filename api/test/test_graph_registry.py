@@ -0,0 +1,157 @@
+import shutil
+import threading
+import numpy as np
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+from api.app.graph_registry import GraphRegistry, build_campus_graph
+
+CAMPUS_JSONS = Path(__file__).resolve().parent.parent / 'app/data/campus_jsons'
+
+
+@pytest.fixture
+def registry(tmp_path):
+    shutil.copytree(CAMPUS_JSONS / 'cc', tmp_path / 'campus_jsons' / 'cc')
+    return GraphRegistry(tmp_path / 'campus_jsons', tmp_path / 'closures', tmp_path / 'snapshots')
+
+
+def test_concurrent_first_requests_load_once(registry):
+    with patch('api.app.graph_registry.build_campus_graph', wraps=build_campus_graph) as build:
+        graphs = []
+        threads = [threading.Thread(target=lambda: graphs.append(registry.get('cc'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert build.call_count == 1
+    assert len(graphs) == 8 and all(graph is graphs[0] for graph in graphs)
+    assert registry.campuses() == ['cc']
+    assert registry.get('hall') is None
+
+
+@pytest.mark.parametrize("campus", [None, "", "..", "/tmp", "cc/..", "cc.closures.json"])
+def test_unknown_campus_builds_no_path(registry, campus):
+    assert not registry.has_campus(campus)
+    assert registry.get(campus) is None
+    with pytest.raises(ValueError):
+        registry.campus_folder(campus)
+    with pytest.raises(ValueError):
+        registry.set_closure(campus, 'cc_119', True)
+
+
+def test_campus_folders_are_listed_once_until_reload(registry):
+    listings = []
+    iterdir = Path.iterdir
+    with patch.object(Path, 'iterdir', lambda path: listings.append(path) or iterdir(path)):
+        for _ in range(5):
+            assert registry.has_campus('cc') and registry.get('cc') is not None
+    assert listings == [registry.base_path]
+
+    shutil.copytree(CAMPUS_JSONS / 'cc', registry.base_path / 'annex')
+    assert not registry.has_campus('annex')
+    registry.reload('annex')
+    assert registry.campuses() == ['annex', 'cc']
+
+
+def test_graphs_are_frozen(registry):
+    graph = registry.get('cc', 'elevator_only')
+    assert graph.frozen and 'elevator_only' in graph.all_pairs
+    with pytest.raises(RuntimeError):
+        graph.add_node({"id": "cc1_new", "x": 0, "y": 0, "floor_number": "1"})
+    # closures only swap routing views
+    node_id = next(iter(graph.graph_var))
+    assert graph.close_node(node_id)
+
+
+def test_reload_swaps_and_notifies(registry):
+    swapped = []
+    registry.on_swap(lambda campus, graph: swapped.append((campus, graph.version)))
+    assert registry.reload('cc') is None
+
+    old = registry.get('cc')
+    new = registry.reload('cc')
+    assert registry.peek('cc') is new and new is not old
+    assert swapped == [('cc', old.version), ('cc', new.version)]
+
+
+def test_memory_footprint(registry):
+    assert registry.memory_footprint() == {"campuses": {}, "total_array_bytes": 0, "total_mapped_bytes": 0}
+    graph = registry.get('cc')
+    footprint = registry.memory_footprint()
+    entry = footprint["campuses"]["cc"]
+    assert entry["version"] == graph.version
+    assert entry["nodes"] == graph.graph_var.number_of_nodes()
+    # the default tables are mapped from the snapshot, shared between workers
+    assert entry["mapped_bytes"] >= graph.all_pairs["default"].nbytes()
+    assert footprint["total_array_bytes"] == entry["array_bytes"] < entry["mapped_bytes"]
+
+    graph.precompute_all_pairs("no_stairs")
+    assert registry.memory_footprint()["total_array_bytes"] >= entry["array_bytes"] + graph.all_pairs["no_stairs"].nbytes()
+
+
+def test_workers_attach_to_the_published_snapshot(registry, tmp_path):
+    first = registry.get('cc')
+    with patch('api.app.graph.Graph2.Graph._parse_file') as parse:
+        second = GraphRegistry(registry.base_path, snapshot_dir=tmp_path / 'snapshots').get('cc')
+    parse.assert_not_called()
+
+    assert isinstance(second.compiled.offsets, np.memmap) and isinstance(second.all_pairs["default"].weights, np.memmap)
+    assert not second.compiled.weights.flags.writeable
+    assert second._pending_snapshot is not None  # networkx graph not built until needed
+    assert second.find_shortest_path('cc_119', 'cc_122') == first.find_shortest_path('cc_119', 'cc_122')
+
+    # every profile's tables and facility index are shared too
+    for profile in ('no_stairs', 'elevator_only'):
+        assert isinstance(second.all_pairs[profile].next_hop, np.memmap)
+        assert isinstance(second.facility_indexes[profile]._by_type['bathroom'][0], np.memmap)
+        assert second.find_shortest_path('cc_119', 'cc_122', profile=profile) == \
+            first.find_shortest_path('cc_119', 'cc_122', profile=profile)
+        assert second.find_nearest_facility('cc_119', 'bathroom', profile) == \
+            first.find_nearest_facility('cc_119', 'bathroom', profile)
+
+
+def test_snapshots_and_closures_stay_out_of_the_data_folder(registry, tmp_path):
+    registry.set_closure('cc', 'cc_119', True)
+    assert [entry.name for entry in registry.base_path.iterdir()] == ['cc']
+    assert (tmp_path / 'snapshots' / 'cc.snapshot.graph').exists()
+    assert registry.closures_path('cc').exists()
+
+    with patch.dict('os.environ', {'CAMPUS_CLOSURES_DIR': str(tmp_path / 'state'),
+                                   'CAMPUS_SNAPSHOT_DIR': str(tmp_path / 'cache')}):
+        other = GraphRegistry(registry.base_path)
+        assert other.closures_path('cc') == tmp_path / 'state' / 'cc.closures.json'
+        assert other.snapshot_dir == tmp_path / 'cache'
+
+
+def test_large_campus_is_routed_without_tables(registry):
+    with patch('api.app.graph.Graph2.ALL_PAIRS_MAX_NODES', 10):
+        graph = registry.get('cc', 'elevator_only')
+        assert not graph.tables_fit()
+    assert graph.all_pairs == {}
+    assert 'elevator_only' in graph.facility_indexes
+    route = graph.find_shortest_path('cc_119', 'cc_122')
+    assert route['path'][0] == 'cc_119' and route['path'][-1] == 'cc_122'
+    assert graph.shortest_distance('cc_119', 'cc_122')['weight'] == pytest.approx(route['weight'])
+
+
+def test_closures_are_shared_between_workers(registry):
+    # two registries on one data folder stand for two worker processes
+    other = GraphRegistry(registry.base_path, registry.closures_dir)
+    heard = []
+    other.on_closure(lambda campus, element, closed: heard.append((campus, element, closed)) or 1)
+    graph, other_graph = registry.get('cc'), other.get('cc')
+    node_id = next(iter(graph.graph_var))
+
+    assert registry.set_closure('cc', node_id, True) == (True, 0)
+    assert registry.set_closure('cc', node_id, True) == (False, 0)
+    assert node_id not in other_graph.closed_nodes
+    other.get('cc')
+    assert other_graph.closed_nodes == {node_id}
+    assert heard == [('cc', node_id, True)]
+
+    assert other.set_closure('cc', node_id, False) == (True, 1)
+    registry.get('cc')
+    assert graph.closed_nodes == set()
+    # a worker starting later picks the closures up too
+    registry.set_closure('cc', node_id, True)
+    assert GraphRegistry(registry.base_path, registry.closures_dir).get('cc').closed_nodes == {node_id}
@@ -0,0 +1,69 @@
+import pytest
+from flask import Flask, jsonify
+
+from api.app import metrics
+from api.app.metrics import Counter, Histogram, instrument_app, stage
+from api.app.route_cache import RouteCache
+
+
+def test_counter_samples_per_label_set():
+    counter = Counter("fmc_test_total", "test", ("endpoint",))
+    counter.inc(endpoint="a")
+    counter.inc(2, endpoint="a")
+    counter.inc(endpoint='b"c')
+
+    assert counter.value(endpoint="a") == 3
+    assert counter.samples() == ['fmc_test_total{endpoint="a"} 3', 'fmc_test_total{endpoint="b\\"c"} 1']
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("fmc_test_seconds", "test", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, stage="search")
+
+    assert histogram.samples() == [
+        'fmc_test_seconds_bucket{stage="search",le="0.1"} 1',
+        'fmc_test_seconds_bucket{stage="search",le="1.0"} 3',
+        'fmc_test_seconds_bucket{stage="search",le="+Inf"} 4',
+        'fmc_test_seconds_sum{stage="search"} 4.05',
+        'fmc_test_seconds_count{stage="search"} 4',
+    ]
+
+
+def test_stage_times_block_and_counts_errors():
+    before = metrics.STAGE_SECONDS.count(endpoint="test", stage="boom")
+    with pytest.raises(ValueError):
+        with stage("test", "boom"):
+            raise ValueError
+
+    assert metrics.STAGE_SECONDS.count(endpoint="test", stage="boom") == before + 1
+    assert metrics.STAGE_ERRORS.value(endpoint="test", stage="boom") >= 1
+
+
+def test_render_reports_tracked_caches():
+    cache = RouteCache()
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("b")
+    metrics.track_cache("test_cache", cache)
+
+    text = metrics.render()
+    assert "# TYPE fmc_stage_duration_seconds histogram" in text
+    assert 'fmc_cache_hits_total{cache="test_cache"} 1' in text
+    assert 'fmc_cache_hit_ratio{cache="test_cache"} 0.5' in text
+    assert 'fmc_cache_entries{cache="test_cache"} 1' in text
+
+
+def test_instrumented_app_counts_requests():
+    app = Flask(__name__)
+    instrument_app(app)
+
+    @app.route('/ping')
+    def ping():
+        return jsonify({"ok": True})
+
+    before = metrics.REQUESTS.value(endpoint="ping", method="GET", status=200)
+    app.test_client().get('/ping')
+
+    assert metrics.REQUESTS.value(endpoint="ping", method="GET", status=200) == before + 1
+    assert metrics.REQUEST_SECONDS.count(endpoint="ping", method="GET") >= 1
@@ -1,6 +1,7 @@
 import pytest
 from flask import Flask, jsonify
 from unittest.mock import patch, MagicMock
+from api.app.graph_registry import GraphRegistry
 from api.app.navigation import navigation_routes
 import json
 
@@ -29,6 +30,19 @@ def test_invalid_campus(client):
     assert response.status_code == 400
     assert b"Campus not found" in response.data
 
+@pytest.mark.parametrize("campus", [None, "..", "/tmp", "hall/../.."])
+def test_missing_or_unsafe_campus_is_rejected(admin, campus):
+    query = f'&campus={campus}' if campus is not None else ''
+    for url in ['/indoorNavigation?startId=start1&endId=end1', '/nearestFacility?startId=start1&poi_type=bathroom',
+                '/reachable?startId=start1&maxDistance=60', '/admin/closures?nodeId=h8_elevator']:
+        response = admin.get(url + query)
+        assert response.status_code == 400, url
+        assert b"Campus not found" in response.data
+
+    response = admin.post('/indoorNavigation/batch', json={'campus': campus, 'pairs': [['h2_209', 'h8_803']]})
+    assert response.status_code == 400
+
+
 # Test for valid campus but no path found
 def test_no_path_found(client):
     response = client.get('/indoorNavigation?startId=start1&endId=end1&campus=hall')
@@ -58,6 +72,44 @@ def test_no_valid_paths_multiple_destinations(client):
     response = client.get('/indoorNavigation?startId=invalid_start&destinations[]=invalid_dest1&destinations[]=invalid_dest2&campus=hall')
     assert b"No path found or invalid destination" in response.data
 
+def test_ready_probe(client):
+    from api.app import navigation
+    with patch.dict(navigation.warmup_status, {'hall': {'ready': False}}, clear=True):
+        response = client.get('/ready')
+        assert response.status_code == 503
+        assert json.loads(response.data) == {'ready': False, 'campuses': {'hall': {'ready': False}}}
+
+        navigation.warm_up(['hall'], profiles=('default', 'elevator_only'))
+        response = client.get('/ready')
+        assert response.status_code == 200
+        status = json.loads(response.data)['campuses']['hall']
+        assert status['ready'] and status['load_seconds'] >= 0
+        assert 'elevator_only' in navigation.registry.peek('hall').all_pairs
+
+        navigation.warm_up(['atrium'])
+        response = client.get('/ready')
+        assert response.status_code == 503
+        assert 'error' in json.loads(response.data)['campuses']['atrium']
+
+
+def test_start_warm_up_loads_every_campus():
+    from api.app import navigation
+    with patch.dict(navigation.warmup_status, clear=True):
+        thread = navigation.start_warm_up(profiles=('default',))
+        assert set(navigation.warmup_status) == {'cc', 'hall', 'mb'}
+        thread.join(timeout=30)
+        assert all(status['ready'] for status in navigation.warmup_status.values())
+
+
+def test_loaded_graphs_footprint(client):
+    client.get('/indoorNavigation?startId=h2_209&endId=h8_803&campus=hall')
+    response = client.get('/graphs')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['campuses']['hall']['array_bytes'] > 0
+    assert data['total_array_bytes'] >= data['campuses']['hall']['array_bytes']
+
+
 # Test health check endpoint
 def test_health_check(client):
     response = client.get('/health')
@@ -135,3 +187,261 @@ def test_different_campuses(client, campus):
 def test_invalid_accessibility_parameter(client):
     response = client.get('/indoorNavigation?startId=h2_209&endId=h8_803&campus=hall&accessibility=invalid')
     assert response.status_code == 200
+
+
+# Test A* option on the navigation route
+def test_astar_navigation(client):
+    response = client.get('/indoorNavigation?startId=h8_860_01&endId=h8_803&campus=hall&algorithm=astar')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['path']['path'][0] == 'h8_860_01'
+    assert data['path']['path'][-1] == 'h8_803'
+
+
+# Test that repeated routes are served from the serialized route cache
+def test_route_cache_hit_skips_search(client):
+    from api.app.navigation import route_cache
+    url = '/indoorNavigation?startId=h2_209&endId=h2_260&campus=hall'
+    first = client.get(url)
+    hits = route_cache.hits
+
+    with patch('api.app.navigation._route_payload') as mock_payload:
+        second = client.get(url)
+    mock_payload.assert_not_called()
+    assert route_cache.hits == hits + 1
+    assert second.status_code == 200
+    assert second.data == first.data
+
+
+# Test optimized visit order for multiple destinations
+def test_multiple_destinations_optimize_order(client):
+    response = client.get('/indoorNavigation?startId=h2_209&destinations[]=h8_803&destinations[]=h2_260'
+                          '&destinations[]=h8_860_01&campus=hall&optimize_order=true')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['given_order'] == ['h8_803', 'h2_260', 'h8_860_01']
+    assert sorted(data['optimized_order']) == sorted(data['given_order'])
+    assert data['distance_saved'] >= 0
+    assert [leg['destination'] for leg in data['paths']] == data['optimized_order']
+
+
+# Test batch route endpoint
+def test_batch_navigation(client):
+    payload = {
+        'campus': 'hall',
+        'pairs': [
+            {'startId': 'h2_209', 'endId': 'h8_803'},
+            {'startId': 'h2_209', 'endId': 'h2_260'},
+            {'startId': 'h8_803', 'endId': 'invalid_end'},
+        ]
+    }
+    response = client.post('/indoorNavigation/batch', json=payload)
+    assert response.status_code == 200
+    results = json.loads(response.data)['results']
+    assert [r['endId'] for r in results] == ['h8_803', 'h2_260', 'invalid_end']
+    assert results[0]['path']['path'][-1] == 'h8_803'
+    assert results[1]['path']['path'][0] == 'h2_209'
+    assert 'error' in results[2]
+
+
+def test_batch_navigation_validation(client):
+    assert client.post('/indoorNavigation/batch', json={'campus': 'hall'}).status_code == 400
+    response = client.post('/indoorNavigation/batch', json={'campus': 'hall', 'pairs': [{'startId': 'h2_209'}]})
+    assert response.status_code == 400
+    with patch('os.path.exists', return_value=False):
+        response = client.post('/indoorNavigation/batch', json={'campus': 'nowhere', 'pairs': [{}]})
+    assert b"Campus not found" in response.data
+
+
+# Test nearest facility lookup
+def test_nearest_facility(client):
+    response = client.get('/nearestFacility?startId=h8_803&poi_type=bathroom&campus=hall')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['facility'] == 'h8_women_bathroom'
+    assert data['path'][0] == 'h8_803'
+    assert data['path'][-1] == 'h8_women_bathroom'
+
+
+def test_nearest_facility_accessibility(client):
+    response = client.get('/nearestFacility?startId=h2_209&poi_type=elevator&campus=hall&accessibility=true')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert not any('stairs' in node or 'escalator' in node for node in data['path'])
+
+
+def test_navigation_profile(client):
+    response = client.get('/indoorNavigation?startId=h2_209&endId=h8_803&campus=hall&profile=no_escalator')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert not any('escalator' in node for node in data['path']['path'])
+
+    response = client.get('/indoorNavigation?startId=h2_209&endId=h8_803&campus=hall&profile=teleport')
+    assert response.status_code == 400
+
+
+@pytest.fixture
+def admin(client, tmp_path):
+    # closures go to a registry of its own, writing its closures files under tmp_path
+    from api.app import navigation
+    graphs = GraphRegistry(navigation.registry.base_path, closures_dir=tmp_path)
+    graphs.on_closure(navigation._drop_closure_routes)
+    with patch.dict('os.environ', {'ADMIN_TOKEN': 'secret'}), patch.object(navigation, 'registry', graphs):
+        client.environ_base['HTTP_X_ADMIN_TOKEN'] = 'secret'
+        yield client
+        client.environ_base.pop('HTTP_X_ADMIN_TOKEN')
+
+
+def test_closures_invalidate_affected_routes(admin, tmp_path):
+    client = admin
+    from api.app import navigation
+    from api.app.navigation import route_cache
+    route = '/indoorNavigation?startId=h2_209&endId=h8_803&campus=hall'
+    before = json.loads(client.get(route).data)['path']
+    client.get('/indoorNavigation?startId=h8_803&endId=h8_860_01&campus=hall')
+    assert 'h8_escalator_from_h7' in before['path']
+
+    response = client.post('/admin/closures', json={'campus': 'hall', 'nodeId': 'h8_escalator_from_h7'})
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['changed'] and data['invalidated'] >= 1
+    assert data['closures']['nodes'] == ['h8_escalator_from_h7']
+
+    hits = route_cache.hits
+    client.get('/indoorNavigation?startId=h8_803&endId=h8_860_01&campus=hall')
+    assert route_cache.hits == hits + 1
+    detour = json.loads(client.get(route).data)['path']
+    assert 'h8_escalator_from_h7' not in detour['path']
+
+    assert list(tmp_path.iterdir()) and not (navigation.registry.base_path / 'hall.closures.json').exists()
+    response = client.delete('/admin/closures', json={'campus': 'hall', 'nodeId': 'h8_escalator_from_h7'})
+    assert json.loads(response.data)['closures']['nodes'] == []
+    assert json.loads(client.get(route).data)['path'] == before
+
+
+def test_closures_invalid_requests(admin):
+    assert admin.post('/admin/closures', json={'campus': 'hall'}).status_code == 400
+    assert admin.post('/admin/closures', json={'campus': 'hall', 'nodeId': 'nope'}).status_code == 404
+    assert admin.post('/admin/closures', json={'campus': 'hall', 'edge': ['h2_209', 'h8_803']}).status_code == 404
+    assert admin.get('/admin/closures?campus=hall', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+    assert admin.get('/admin/closures?campus=hall').status_code == 200
+
+
+def test_closures_refused_without_admin_token(client):
+    with patch.dict('os.environ', {}, clear=True):
+        assert client.get('/admin/closures?campus=hall').status_code == 403
+        response = client.post('/admin/closures', json={'campus': 'hall', 'nodeId': 'h8_elevator'},
+                               headers={'X-Admin-Token': ''})
+        assert response.status_code == 403
+
+
+def test_navigation_infers_campus(client):
+    response = client.get('/indoorNavigation?startId=h2_209&endId=h8_803')
+    assert response.status_code == 200
+    assert json.loads(response.data)['path']['path'][-1] == 'h8_803'
+
+
+def test_navigation_across_buildings(client):
+    response = client.get('/indoorNavigation?startId=h8_803&endId=mb_1_338')
+    assert response.status_code == 200
+    path = json.loads(response.data)['path']['path']
+    assert 'h1_escalator_to_tunnel' in path and 'mb_s2_metro' in path
+
+    response = client.get('/indoorNavigation?startId=h8_803&endId=cc_119')
+    assert response.status_code == 404
+
+
+def test_navigation_across_buildings_time_and_compact(client):
+    full = json.loads(client.get('/indoorNavigation?startId=h8_803&endId=mb_1_338&hour=7').data)['path']
+    assert full['eta_seconds'] > 0
+
+    fastest = json.loads(client.get('/indoorNavigation?startId=h8_803&endId=mb_1_338&hour=7&rank=time').data)
+    assert fastest['path']['eta_seconds'] <= full['eta_seconds']
+
+    response = client.get('/indoorNavigation?startId=h8_803&endId=mb_1_338&hour=7&format=compact')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['format'] == 'compact'
+    assert [segment['building'] for segment in data['segments']] == ['hall', 'mb']
+    assert sum(len(segment['nodes']) for segment in data['segments']) == len(full['path'])
+    assert data['total_eta_seconds'] == pytest.approx(full['eta_seconds'])
+
+
+def test_navigation_chat_across_buildings(client):
+    response = client.post('/chat/navigation', json={'query': 'How do I get from H-820 to MB 1.338?'})
+    assert response.status_code == 200
+    assert 'Follow the connection to the MB building' in json.loads(response.data)['response']
+
+
+def test_compact_format(client):
+    full = json.loads(client.get('/indoorNavigation?startId=h2_209&endId=h8_803&campus=hall').data)
+    response = client.get('/indoorNavigation?startId=h2_209&endId=h8_803&campus=hall&format=compact')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['format'] == 'compact'
+    assert len(data['nodes']) == len(full['path']['path'])
+    assert len(data['polyline']) == 3 * len(data['nodes'])
+    assert data['legs'][0]['distance'] == pytest.approx(full['path']['distance'])
+
+
+def test_navigation_rank_by_time(client):
+    by_weight = json.loads(client.get('/indoorNavigation?startId=h2_209&endId=h8_803&campus=hall&hour=7').data)
+    response = client.get('/indoorNavigation?startId=h2_209&endId=h8_803&campus=hall&hour=7&rank=time')
+    assert response.status_code == 200
+    fastest = json.loads(response.data)['path']
+    # the early-morning elevator wait is short enough to beat the escalators
+    assert 'h2_elevator' in fastest['path'] and 'h2_elevator' not in by_weight['path']['path']
+    assert fastest['eta_seconds'] < by_weight['path']['eta_seconds']
+
+    multi = json.loads(client.get('/indoorNavigation?startId=h2_209&destinations[]=h8_803&destinations[]=h9_907'
+                                  '&campus=hall&rank=time').data)
+    assert multi['total_eta_seconds'] == pytest.approx(sum(leg['eta_seconds'] for leg in multi['paths']))
+
+    assert client.get('/indoorNavigation?startId=h2_209&endId=h8_803&campus=hall&rank=fast').status_code == 400
+    assert client.get('/indoorNavigation?startId=h2_209&endId=h8_803&campus=hall&hour=24').status_code == 400
+
+
+def test_reachable(client):
+    response = client.get('/reachable?startId=h8_803&maxMinutes=1&poi_type=room')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['campus'] == 'hall' and data['by'] == 'time'
+    rooms = [node for nodes in data['floors'].values() for node in nodes]
+    assert rooms and all(node['poi_type'] == 'room' and node['seconds'] <= 60 for node in rooms)
+
+    assert client.get('/reachable?startId=h8_803&campus=hall').status_code == 400
+    assert client.get('/reachable?startId=h8_803&campus=hall&maxDistance=-1').status_code == 400
+    assert client.get('/reachable?startId=h8_nope&campus=hall&maxDistance=10').status_code == 404
+
+
+def test_nearest_facility_invalid_type(client):
+    response = client.get('/nearestFacility?startId=h8_803&poi_type=cafeteria&campus=hall')
+    assert response.status_code == 400
+
+
+# Test starting from a raw map point instead of a node id
+def test_navigation_from_map_point(client):
+    response = client.get('/indoorNavigation?startX=745&startY=505&startFloor=8&endId=h8_803&campus=hall')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['path']['path'][0] == 'h8_860_01'
+
+
+def test_navigation_from_map_point_invalid(client):
+    response = client.get('/indoorNavigation?startX=abc&startY=505&startFloor=8&endId=h8_803&campus=hall')
+    assert response.status_code == 400
+    response = client.get('/indoorNavigation?startX=745&startFloor=8&endId=h8_803&campus=hall')
+    assert response.status_code == 400
+    response = client.get('/indoorNavigation?startX=745&startY=505&startFloor=42&endId=h8_803&campus=hall')
+    assert response.status_code == 404
+
+
+def test_metrics_endpoint_reports_stages(client):
+    client.get('/indoorNavigation?startId=h2_209&endId=h8_803&campus=hall')
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    text = response.get_data(as_text=True)
+    assert 'fmc_stage_duration_seconds_count{endpoint="navigation.indoor_navigation",stage="graph_search"}' in text
+    assert 'fmc_cache_hit_ratio{cache="indoor_navigation"}' in text
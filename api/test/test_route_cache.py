@@ -0,0 +1,79 @@
+from api.app.route_cache import RouteCache, route_tags
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_put_counts_hits_and_misses():
+    cache = RouteCache(maxsize=4)
+    key = ("hall", "h2_209", "h8_803", False, 1)
+
+    assert cache.get(key) is None
+    cache.put(key, "body")
+    assert cache.get(key) == "body"
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+    assert stats["size"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = RouteCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = RouteCache(ttl=10, clock=clock)
+    cache.put("a", 1)
+
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10.0
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_invalidate_campus_keeps_current_version():
+    cache = RouteCache()
+    cache.put(("hall", "a", "b", False, 1), "old")
+    cache.put(("hall", "a", "b", False, 2), "new")
+    cache.put(("mb", "a", "b", False, 1), "other campus")
+
+    assert cache.invalidate_campus("hall", keep_version=2) == 1
+    assert cache.get(("hall", "a", "b", False, 2)) == "new"
+    assert cache.get(("mb", "a", "b", False, 1)) == "other campus"
+
+
+def test_invalidate_tag_drops_only_tagged_entries():
+    cache = RouteCache(maxsize=2)
+    cache.put("via_elevator", 1, route_tags("hall", [["a", "h8_elevator", "b"]]))
+    cache.put("while_closed", 2, route_tags("hall", [["a", "c"]], closures=["h8_elevator"]))
+
+    assert cache.invalidate_tag(("route", "hall", "h8_elevator")) == 1
+    assert cache.get("via_elevator") is None
+    assert cache.invalidate_tag(("route", "mb", ("a", "c"))) == 0
+    assert cache.invalidate_tag(("closed", "hall", "h8_elevator")) == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_evicted_entries_leave_tag_index():
+    cache = RouteCache(maxsize=1)
+    cache.put("a", 1, [("route", "hall", "x")])
+    cache.put("b", 2, [("route", "hall", "y")])
+    assert cache.invalidate_tag(("route", "hall", "x")) == 0
+    assert cache._tagged == {("route", "hall", "y"): {"b"}}
@@ -0,0 +1,233 @@
+import socketserver
+import threading
+import time
+
+import pytest
+from flask import Flask, session
+
+from api.app.session_store import (MemorySessionStore, RedisError, RedisSessionStore, SessionStore,
+                                   StoreSessionInterface, create_session_interface)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    """Just enough of the Redis protocol for the session store: GET, SET [EX], DEL, AUTH, SELECT"""
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = [self._bulk() for _ in range(int(line[1:]))]
+            self.wfile.write(self.server.command(args))
+
+    def _bulk(self):
+        length = int(self.rfile.readline()[1:])
+        return self.rfile.read(length + 2)[:-2]
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), RespHandler)
+        self.data = {}
+        self.commands = []
+        self.lock = threading.Lock()
+
+    def command(self, args):
+        name = args[0].upper().decode()
+        with self.lock:
+            self.commands.append(name)
+            if name in ("AUTH", "SELECT"):
+                return b"+OK\r\n"
+            if name == "SET":
+                ttl = int(args[4]) if len(args) > 4 else None
+                self.data[args[1]] = (args[2], time.monotonic() + ttl if ttl else None)
+                return b"+OK\r\n"
+            if name == "GET":
+                value, expires_at = self.data.get(args[1], (None, None))
+                if value is None or (expires_at and expires_at <= time.monotonic()):
+                    return b"$-1\r\n"
+                return b"$%d\r\n%s\r\n" % (len(value), value)
+            if name == "DEL":
+                return b":%d\r\n" % (self.data.pop(args[1], None) is not None)
+        return b"-ERR unknown command\r\n"
+
+
+@pytest.fixture
+def resp_server():
+    server = RespServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def session_app(store):
+    app = Flask(__name__)
+    app.session_interface = StoreSessionInterface(store)
+
+    @app.route("/set/<value>")
+    def set_value(value):
+        session["value"] = value
+        return "ok"
+
+    @app.route("/get")
+    def get_value():
+        return session.get("value", "")
+
+    @app.route("/clear")
+    def clear():
+        session.clear()
+        return "ok"
+
+    return app
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemorySessionStore(maxsize=2)
+    store.set("a", b"1", 60)
+    store.set("b", b"2", 60)
+    store.get("a")
+    store.set("c", b"3", 60)
+
+    assert store.get("b") is None
+    assert store.get("a") == b"1"
+    assert len(store) == 2
+
+
+def test_memory_store_expires_sessions():
+    clock = FakeClock()
+    store = MemorySessionStore(ttl=10, clock=clock)
+    store.set("a", b"1", 10)
+    clock.now = 11
+
+    assert store.get("a") is None
+    assert len(store) == 0
+
+
+def test_memory_store_honors_each_sessions_ttl():
+    clock = FakeClock()
+    store = MemorySessionStore(ttl=10, clock=clock)
+    store.set("short", b"1", 5)
+    store.set("long", b"2", 60)
+    clock.now = 30
+
+    assert store.get("short") is None
+    assert store.get("long") == b"2"
+
+
+def test_session_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+    class Incomplete(SessionStore):
+        def get(self, sid):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_session_round_trip_in_memory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = MemorySessionStore()
+    client = session_app(store).test_client()
+
+    client.get("/set/h2_209")
+    assert client.get("/get").data == b"h2_209"
+    assert len(store) == 1
+
+    client.get("/clear")
+    assert len(store) == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_read_only_requests_do_not_write_sessions():
+    store = MemorySessionStore()
+    response = session_app(store).test_client().get("/get")
+
+    assert "Set-Cookie" not in response.headers
+    assert len(store) == 0
+
+
+def test_unknown_session_id_starts_a_new_session():
+    client = session_app(MemorySessionStore()).test_client()
+    client.set_cookie("session", "forged")
+
+    assert client.get("/get").data == b""
+
+
+def test_redis_store_set_get_delete(resp_server):
+    store = RedisSessionStore(*resp_server.server_address)
+    store.set("abc", b"payload", 60)
+
+    assert store.get("abc") == b"payload"
+    assert b"session:abc" in resp_server.data
+    store.delete("abc")
+    assert store.get("abc") is None
+
+
+def test_redis_store_leaves_expiry_to_the_server(resp_server):
+    store = RedisSessionStore(*resp_server.server_address)
+    store.set("abc", b"payload", 1)
+    resp_server.data[b"session:abc"] = (b"payload", time.monotonic() - 1)
+
+    assert store.get("abc") is None
+
+
+def test_redis_store_reconnects_after_a_dropped_connection(resp_server):
+    store = RedisSessionStore(*resp_server.server_address)
+    store.set("abc", b"payload", 60)
+    store._sock.close()
+
+    assert store.get("abc") == b"payload"
+
+
+def test_redis_store_raises_error_replies(resp_server):
+    store = RedisSessionStore(*resp_server.server_address)
+
+    with pytest.raises(RedisError):
+        store.execute("FLUSHALL")
+
+
+def test_redis_store_from_url_authenticates_and_selects_db(resp_server):
+    host, port = resp_server.server_address
+    store = RedisSessionStore.from_url(f"redis://:secret@{host}:{port}/2")
+    store.get("abc")
+
+    assert (store.password, store.db) == ("secret", 2)
+    assert resp_server.commands == ["AUTH", "SELECT", "GET"]
+
+
+def test_session_round_trip_through_redis(resp_server):
+    host, port = resp_server.server_address
+    app = session_app(RedisSessionStore(host, port))
+    client = app.test_client()
+
+    client.get("/set/h8_803")
+    assert client.get("/get").data == b"h8_803"
+    assert len(resp_server.data) == 1
+    # a second worker sees the same session
+    other = session_app(RedisSessionStore(host, port)).test_client()
+    other.set_cookie("session", client.get_cookie("session").value)
+    assert other.get("/get").data == b"h8_803"
+
+
+def test_create_session_interface_picks_backend():
+    assert isinstance(create_session_interface({}).store, MemorySessionStore)
+    redis = create_session_interface({"SESSION_BACKEND": "redis", "SESSION_REDIS_URL": "redis://cache:6380/1"})
+    assert (redis.store.host, redis.store.port, redis.store.db) == ("cache", 6380, 1)
+
+    with pytest.raises(ValueError):
+        create_session_interface({"SESSION_BACKEND": "filesystem"})
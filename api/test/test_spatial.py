@@ -0,0 +1,24 @@
+import numpy as np
+from api.app.graph.spatial import KDTree, LEAF_SIZE
+
+
+def brute_force(points, x, y):
+    squared = np.sum((points - [x, y]) ** 2, axis=1)
+    return int(np.argmin(squared)), float(np.sqrt(squared.min()))
+
+
+def test_kdtree_matches_brute_force():
+    rng = np.random.default_rng(11)
+    points = rng.random((LEAF_SIZE * 40, 2)) * 1000
+    tree = KDTree(points)
+
+    for x, y in rng.random((100, 2)) * 1200 - 100:
+        index, gap = tree.nearest(x, y)
+        expected_index, expected_gap = brute_force(points, x, y)
+        assert gap == expected_gap
+        assert np.isclose(np.linalg.norm(points[index] - [x, y]), expected_gap)
+
+
+def test_kdtree_small_and_empty():
+    assert KDTree(np.array([[5.0, 5.0]])).nearest(0, 0) == (0, np.hypot(5, 5))
+    assert KDTree(np.empty((0, 2))).nearest(0, 0)[0] == -1
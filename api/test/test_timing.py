@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from pathlib import Path
+from api.app.graph.Graph2 import Graph
+from api.app.graph.timing import TimeModel, floor_level
+
+HALL_PATH = Path(__file__).resolve().parent.parent / 'app/data/campus_jsons/hall'
+
+
+@pytest.fixture(scope="module")
+def hall():
+    graph = Graph()
+    graph.load_from_json_folder(HALL_PATH)
+    graph.compile()
+    return graph
+
+
+def test_floor_level():
+    assert floor_level("8") == 8
+    assert floor_level("S2") == -2
+    assert floor_level("lobby") == 0
+
+
+def test_time_model_overrides():
+    model = TimeModel({"walking_speed": {"default": 1.0}, "elevator_wait": {"hall": [[0, 24, 5]]}})
+    assert model.walking_speed() == 1.0
+    assert model.walking_speed("elevator_only") == 1.1
+    assert model.elevator_wait("hall", 12) == 5.0
+    assert model.elevator_wait("unknown", 12) == 30.0
+    assert model.band(3) != TimeModel().band(3)
+    assert TimeModel().band(9) == TimeModel().band(17)
+
+
+def test_edge_seconds(hall):
+    model = TimeModel()
+    compiled = hall.compiled
+    seconds = model.edge_seconds(compiled, "default", 12)
+    assert seconds.dtype == np.float32 and len(seconds) == len(compiled.weights)
+
+    def slot(source_id, target_id):
+        source, target = compiled.index[source_id], compiled.index[target_id]
+        start = compiled.offsets[source]
+        return start + int(np.flatnonzero(compiled.neighbors[start:compiled.offsets[source + 1]] == target)[0])
+
+    walk = slot("h8_hw1", "h8_hw2")
+    assert seconds[walk] == pytest.approx(compiled.distances[walk] / 1.4, rel=1e-5)
+    assert seconds[slot("h2_elevator", "h8_elevator")] == pytest.approx(6 * 4.0)
+    boarding = slot("h2_hw1", "h2_elevator")
+    assert seconds[boarding] == pytest.approx(compiled.distances[boarding] / 1.4 + 60.0, rel=1e-5)
+
+
+def test_fastest_path_depends_on_hour(hall):
+    early = hall.find_shortest_path("h2_209", "h8_803", method="time", hour=6)
+    noon = hall.find_shortest_path("h2_209", "h8_803", method="time", hour=12)
+    assert "h2_elevator" in early["path"] and "h2_elevator" not in noon["path"]
+    assert early["eta_seconds"] == pytest.approx(hall.eta(early["path"], hour=6), rel=1e-5)
+    assert noon["eta_seconds"] == pytest.approx(hall.eta(noon["path"], hour=12), rel=1e-5)
+    assert hall.eta(early["path"], hour=12) > noon["eta_seconds"]
+    assert noon["weight"] == pytest.approx(hall.find_shortest_path("h2_209", "h8_803")["weight"], rel=1e-5)
+
+
+def test_time_views_are_shared_per_band(hall):
+    assert hall.time_graph("default", 9) is hall.time_graph("default", 17)
+    assert hall.time_graph("default", 9) is not hall.time_graph("default", 6)
+
+
+def test_reachable_within_time(hall):
+    floors = hall.reachable_within("h8_803", 60, by="time", hour=12)
+    reached = [node for nodes in floors.values() for node in nodes]
+    assert reached and all(node["seconds"] <= 60 for node in reached)
+    assert reached[0]["id"] == "h8_803"
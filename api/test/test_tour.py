@@ -0,0 +1,38 @@
+import itertools
+import numpy as np
+from api.app.graph.tour import held_karp, nearest_neighbour_two_opt, solve_visit_order, path_cost, EXACT_LIMIT
+
+
+def brute_force(matrix):
+    stops = range(1, len(matrix))
+    return min(path_cost(matrix, list(order)) for order in itertools.permutations(stops))
+
+
+def test_held_karp_is_exact():
+    rng = np.random.default_rng(7)
+    for size in range(1, 7):
+        matrix = rng.random((size + 1, size + 1)) * 50
+        order, cost = held_karp(matrix)
+        assert sorted(order) == list(range(1, size + 1))
+        assert cost == path_cost(matrix, order)
+        assert abs(cost - brute_force(matrix)) < 1e-9
+
+
+def test_held_karp_no_stops():
+    assert held_karp(np.zeros((1, 1))) == ([], 0.0)
+
+
+def test_two_opt_visits_every_stop():
+    rng = np.random.default_rng(3)
+    matrix = rng.random((9, 9)) * 50
+    order, cost = nearest_neighbour_two_opt(matrix)
+    assert sorted(order) == list(range(1, 9))
+    assert cost >= brute_force(matrix) - 1e-9
+
+
+def test_large_sets_never_worse_than_given_order():
+    points = np.random.default_rng(5).random((EXACT_LIMIT + 4, 2))
+    matrix = np.linalg.norm(points[:, None] - points[None, :], axis=-1)
+    order, cost = solve_visit_order(matrix)
+    assert sorted(order) == list(range(1, len(matrix)))
+    assert cost <= path_cost(matrix, list(range(1, len(matrix))))